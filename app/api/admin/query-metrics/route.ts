@@ -0,0 +1,21 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { getQueryMetrics, getSlowQueries, resetQueryMetrics } from '@/lib/query-metrics';
+
+// Ensure this runs in Node.js runtime, not Edge Runtime
+export const runtime = 'nodejs';
+export const dynamic = 'force-dynamic';
+
+// Per-statement latency since the process started (or the last reset), slowest total
+// time first, with the most recent slow queries. Auth is enforced by the middleware.
+export async function GET() {
+  return NextResponse.json({
+    queries: getQueryMetrics(),
+    slowQueries: getSlowQueries()
+  });
+}
+
+// Start a fresh measurement window
+export async function DELETE(_request: NextRequest) {
+  resetQueryMetrics();
+  return NextResponse.json({ success: true });
+}
@@ -1,5 +1,7 @@
 import { NextResponse, NextRequest } from "next/server";
 import { query } from "@/lib/db";
+import { invalidateAvailability } from "@/lib/availability";
+import { cancelAppointmentWithNotice, isSlotTakenError } from "@/lib/booking";
 
 // Ensure this runs in Node.js runtime, not Edge Runtime
 export const runtime = 'nodejs';
@@ -78,7 +80,7 @@ export async function PUT(_request: NextRequest, { params }: { params: Promise<{
         }
 
         // Check if appointment exists
-        const appointmentExists = await query("SELECT id FROM appointments WHERE id = $1", [appointmentId]);
+        const appointmentExists = await query("SELECT id, appointment_date FROM appointments WHERE id = $1", [appointmentId]);
         if (appointmentExists.rows.length === 0) {
             return NextResponse.json({ error: "Appointment not found" }, { status: 404 });
         }
@@ -111,9 +113,15 @@ export async function PUT(_request: NextRequest, { params }: { params: Promise<{
         if (result.rowCount === 0) {
             return NextResponse.json({ error: "Appointment not found for update" }, { status: 404 });
         }
+
+        // Both the previous and the new date change their free slots
+        invalidateAvailability(appointmentExists.rows[0].appointment_date, appointment_date);
         
         return NextResponse.json({ message: "Appointment updated successfully" }, { status: 200 });
     } catch (error) {
+        if (isSlotTakenError(error)) {
+            return NextResponse.json({ error: "This time slot is already booked" }, { status: 409 });
+        }
         console.error("Database query error:", error);
         return NextResponse.json({ error: "Failed to update appointment" }, { status: 500 });
     }
@@ -130,7 +138,7 @@ export async function DELETE(_request: NextRequest, { params }: { params: Promis
         }
 
         // Check if appointment exists
-        const appointmentExists = await query("SELECT id, status FROM appointments WHERE id = $1", [appointmentId]);
+        const appointmentExists = await query("SELECT id, status, appointment_date FROM appointments WHERE id = $1", [appointmentId]);
         if (appointmentExists.rows.length === 0) {
             return NextResponse.json({ error: "Appointment not found" }, { status: 404 });
         }
@@ -139,18 +147,15 @@ export async function DELETE(_request: NextRequest, { params }: { params: Promis
             return NextResponse.json({ error: "Appointment is already cancelled" }, { status: 409 });
         }
 
-        const result = await query(
-            `UPDATE appointments SET status = 'cancelled', updated_at = NOW() WHERE id = $1 RETURNING id`,
-            [appointmentId]
-        );
-
-        if (result.rowCount === 0) {
+        // The patient's push notice is queued in the same transaction as the cancellation
+        const cancelled = await cancelAppointmentWithNotice(appointmentId);
+        if (!cancelled) {
             return NextResponse.json({ error: "Appointment not found for cancellation" }, { status: 404 });
         }
 
         return NextResponse.json({ 
             message: "Appointment cancelled successfully", 
-            cancelledId: result.rows[0].id 
+            cancelledId: cancelled.id 
         }, { status: 200 });
     } catch (error) {
         console.error("Database query error:", error);
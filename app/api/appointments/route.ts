@@ -1,32 +1,119 @@
 import { NextResponse, NextRequest } from "next/server";
 import { query } from "@/lib/db";
 import { generateCancellationToken } from "@/lib/cancellation-token";
+import { invalidateAvailability, toDateKey } from "@/lib/availability";
+import { cursorDate, cursorTime, cursorUuid, decodeCursor, encodeCursor, parsePageSize, wantsCount } from "@/lib/pagination";
+import { findLookupById, findLookupByName } from "@/lib/lookup-tables";
+import { isSlotTakenError, newAppointmentId } from "@/lib/booking";
 
 // Ensure this runs in Node.js runtime, not Edge Runtime
 export const runtime = 'nodejs';
 
-export async function GET() {
+const DATE_PATTERN = /^\d{4}-\d{2}-\d{2}$/;
+
+/**
+ * List appointments ordered by (appointment_date, appointment_time, id), one page at a time.
+ *
+ * Query params: from, to (YYYY-MM-DD), status (comma separated), patient_id,
+ * limit (default 50, max 200), cursor (next_cursor of the previous page) and
+ * count=true to also return the total number of matching appointments.
+ */
+export async function GET(request: NextRequest) {
     try {
-        const appointments = await query(
-            `
-            SELECT
-                a.*,
-                p.first_name as patient_first_name,
-                p.last_name as patient_last_name,
-                ct.name as consult_type_name,
-                vt.name as visit_type_name,
-                pt.name as practice_type_name
-            FROM appointments a
-            JOIN patients p ON a.patient_id = p.id
-            LEFT JOIN consult_types ct ON a.consult_type_id = ct.id
-            LEFT JOIN visit_types vt ON a.visit_type_id = vt.id
-            LEFT JOIN practice_types pt ON a.practice_type_id = pt.id
-            ORDER BY a.appointment_date, a.appointment_time
-        `
-        );
-        return NextResponse.json({ 
-            appointments: appointments.rows,
-            count: appointments.rows.length
+        const { searchParams } = new URL(request.url);
+        const from = searchParams.get('from');
+        const to = searchParams.get('to');
+        const status = searchParams.get('status');
+        const patientId = searchParams.get('patient_id');
+        const cursor = searchParams.get('cursor');
+
+        const limit = parsePageSize(searchParams.get('limit'));
+        if (limit === null) {
+            return NextResponse.json({ error: "limit must be a positive integer" }, { status: 400 });
+        }
+        if ((from && !DATE_PATTERN.test(from)) || (to && !DATE_PATTERN.test(to))) {
+            return NextResponse.json({ error: "from and to must be dates in YYYY-MM-DD format" }, { status: 400 });
+        }
+        if (patientId && !/^\d+$/.test(patientId)) {
+            return NextResponse.json({ error: "patient_id must be an integer" }, { status: 400 });
+        }
+
+        const conditions: string[] = [];
+        const params: any[] = [];
+
+        if (from) {
+            params.push(from);
+            conditions.push(`a.appointment_date >= $${params.length}`);
+        }
+        if (to) {
+            params.push(to);
+            conditions.push(`a.appointment_date <= $${params.length}`);
+        }
+        if (status) {
+            params.push(status.split(',').map((value) => value.trim()).filter(Boolean));
+            conditions.push(`a.status = ANY($${params.length})`);
+        }
+        if (patientId) {
+            params.push(Number(patientId));
+            conditions.push(`a.patient_id = $${params.length}`);
+        }
+
+        // The total ignores the cursor so it stays the same on every page
+        const filterSQL = conditions.length > 0 ? `WHERE ${conditions.join(' AND ')}` : '';
+        const countParams = [...params];
+
+        if (cursor) {
+            const after = decodeCursor(cursor, [cursorDate, cursorTime, cursorUuid]);
+            if (!after) {
+                return NextResponse.json({ error: "Invalid cursor" }, { status: 400 });
+            }
+            params.push(...after);
+            conditions.push(
+                `(a.appointment_date, a.appointment_time, a.id) > ($${params.length - 2}, $${params.length - 1}, $${params.length})`
+            );
+        }
+
+        const whereSQL = conditions.length > 0 ? `WHERE ${conditions.join(' AND ')}` : '';
+        params.push(limit + 1);
+
+        const [appointments, total] = await Promise.all([
+            query(
+                `
+                SELECT
+                    a.*,
+                    p.first_name as patient_first_name,
+                    p.last_name as patient_last_name,
+                    ct.name as consult_type_name,
+                    vt.name as visit_type_name,
+                    pt.name as practice_type_name
+                FROM appointments a
+                JOIN patients p ON a.patient_id = p.id
+                LEFT JOIN consult_types ct ON a.consult_type_id = ct.id
+                LEFT JOIN visit_types vt ON a.visit_type_id = vt.id
+                LEFT JOIN practice_types pt ON a.practice_type_id = pt.id
+                ${whereSQL}
+                ORDER BY a.appointment_date, a.appointment_time, a.id
+                LIMIT $${params.length}
+            `,
+                params
+            ),
+            wantsCount(searchParams.get('count'))
+                ? query(`SELECT COUNT(*)::int AS count FROM appointments a ${filterSQL}`, countParams)
+                : Promise.resolve(null)
+        ]);
+
+        // One extra row tells whether another page exists
+        const hasMore = appointments.rows.length > limit;
+        const rows = hasMore ? appointments.rows.slice(0, limit) : appointments.rows;
+        const last = rows[rows.length - 1];
+
+        return NextResponse.json({
+            appointments: rows,
+            ...(total ? { count: total.rows[0].count } : {}),
+            has_more: hasMore,
+            next_cursor: hasMore
+                ? encodeCursor([toDateKey(last.appointment_date) as string, String(last.appointment_time), String(last.id)])
+                : null
         }, { status: 200 });
     } catch (error) {
         console.error("Database query error:", error);
@@ -70,18 +157,18 @@ export async function POST(req: NextRequest) {
             return NextResponse.json({ error: "Invalid appointment time format. Use HH:MM format" }, { status: 400 });
         }
 
-        // Check if patient exists
-        const patientExists = await query("SELECT id FROM patients WHERE id = $1", [patient_id]);
-        if (patientExists.rows.length === 0) {
+        // Check if patient exists, fetching the phone number needed for the token
+        const patientInfo = await query("SELECT id, phone_number FROM patients WHERE id = $1", [patient_id]);
+        if (patientInfo.rows.length === 0) {
             return NextResponse.json({ error: "Patient not found" }, { status: 404 });
         }
 
         // Resolve visit_type_id from name if provided as string
         let final_visit_type_id = visit_type_id;
         if (visit_type_id && isNaN(Number(visit_type_id))) {
-            const visitTypeResult = await query("SELECT id FROM visit_types WHERE name = $1", [visit_type_id]);
-            if (visitTypeResult.rows.length > 0) {
-                final_visit_type_id = visitTypeResult.rows[0].id;
+            const visitType = await findLookupByName('visit_types', visit_type_id);
+            if (visitType) {
+                final_visit_type_id = visitType.id;
             } else {
                 return NextResponse.json({ error: `Visit type '${visit_type_id}' not found` }, { status: 404 });
             }
@@ -90,9 +177,9 @@ export async function POST(req: NextRequest) {
         // Resolve consult_type_id from name if provided as string
         let final_consult_type_id = consult_type_id;
         if (consult_type_id && isNaN(Number(consult_type_id))) {
-            const consultTypeResult = await query("SELECT id FROM consult_types WHERE name = $1", [consult_type_id]);
-            if (consultTypeResult.rows.length > 0) {
-                final_consult_type_id = consultTypeResult.rows[0].id;
+            const consultType = await findLookupByName('consult_types', consult_type_id);
+            if (consultType) {
+                final_consult_type_id = consultType.id;
             } else {
                 return NextResponse.json({ error: `Consult type '${consult_type_id}' not found` }, { status: 404 });
             }
@@ -101,13 +188,9 @@ export async function POST(req: NextRequest) {
         // Resolve practice_type_id from name if provided as string
         let final_practice_type_id = practice_type_id;
         if (practice_type_id && isNaN(Number(practice_type_id))) {
-            const practiceTypeResult = await query("SELECT id FROM practice_types WHERE name = $1", [practice_type_id]);
-            if (practiceTypeResult.rows.length > 0) {
-                final_practice_type_id = practiceTypeResult.rows[0].id;
-            } else {
-                // Practice type is optional, so set to null if not found
-                final_practice_type_id = null;
-            }
+            const practiceType = await findLookupByName('practice_types', practice_type_id);
+            // Practice type is optional, so set to null if not found
+            final_practice_type_id = practiceType ? practiceType.id : null;
         }
 
         // Check if appointment already exists for this patient, date, and time
@@ -123,82 +206,58 @@ export async function POST(req: NextRequest) {
             }, { status: 409 });
         }
 
-        // Get patient phone number for token generation
-        const patientInfo = await query(
-            "SELECT phone_number FROM patients WHERE id = $1",
-            [patient_id]
-        );
-
-        if (patientInfo.rows.length === 0) {
-            return NextResponse.json({ error: "Patient not found" }, { status: 404 });
-        }
-
         const patientPhone = patientInfo.rows[0].phone_number;
 
-        // Generate initial cancellation token
-        const initialToken = generateCancellationToken({
-            appointmentId: '', // Will be updated after creation
-            patientId: patient_id.toString(),
-            patientPhone: patientPhone,
-            appointmentDate: appointment_date,
-            appointmentTime: appointment_time,
-        });
-
-        const result = await query(
-            `INSERT INTO appointments (patient_id, appointment_date, appointment_time, consult_type_id, visit_type_id, practice_type_id, health_insurance, cancellation_token)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-            RETURNING 
-            id,
-            appointment_date,
-            appointment_time,
-            consult_type_id,
-            visit_type_id,
-            practice_type_id,
-            health_insurance;`,
-            [patient_id, appointment_date, appointment_time, final_consult_type_id || null, final_visit_type_id || null, final_practice_type_id || null, health_insurance || null, initialToken]
-        );
-
-        if (result.rowCount === 0) {
-            return NextResponse.json({ error: "Failed to create appointment" }, { status: 500 });
-        }
-
-        // Update the token with the actual appointment ID
-        const finalToken = generateCancellationToken({
-            appointmentId: result.rows[0].id.toString(),
+        // Allocate the id up front so the cancellation token is signed once
+        const appointmentId = newAppointmentId();
+        const cancellationToken = generateCancellationToken({
+            appointmentId,
             patientId: patient_id.toString(),
             patientPhone: patientPhone,
             appointmentDate: appointment_date,
             appointmentTime: appointment_time,
         });
 
-        // Update the appointment with the final token
-        await query(
-            `UPDATE appointments SET cancellation_token = $1 WHERE id = $2`,
-            [finalToken, result.rows[0].id]
-        );
-
         const newAppointmentInfo = await query(
-            `  SELECT 
+            `WITH inserted AS (
+                INSERT INTO appointments (id, patient_id, appointment_date, appointment_time, consult_type_id, visit_type_id, practice_type_id, health_insurance, cancellation_token)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                RETURNING *
+            )
+            SELECT 
                 a.id,
                 p.last_name || ', ' || p.first_name AS patient_name,
                 p.phone_number,
                 a.appointment_date,
                 a.appointment_time,
-                ct.name AS consult_type_name,
-                vt.name AS visit_type_name,
-                pt.name AS practice_type_name,
+                a.consult_type_id,
+                a.visit_type_id,
+                a.practice_type_id,
                 a.health_insurance,
                 a.cancellation_token
-                FROM appointments a
-                JOIN patients p ON a.patient_id = p.id
-                LEFT JOIN consult_types ct ON a.consult_type_id = ct.id
-                LEFT JOIN visit_types vt ON a.visit_type_id = vt.id
-                LEFT JOIN practice_types pt ON a.practice_type_id = pt.id
-                WHERE a.id = $1;`,
-            [result.rows[0].id]
+                FROM inserted a
+                JOIN patients p ON a.patient_id = p.id;`,
+            [appointmentId, patient_id, appointment_date, appointment_time, final_consult_type_id || null, final_visit_type_id || null, final_practice_type_id || null, health_insurance || null, cancellationToken]
         );
 
-        const appointmentData = newAppointmentInfo.rows[0];
+        if (newAppointmentInfo.rowCount === 0) {
+            return NextResponse.json({ error: "Failed to create appointment" }, { status: 500 });
+        }
+        invalidateAvailability(appointment_date);
+
+        // Type names come from the lookup cache instead of three more joins
+        const { consult_type_id: consultTypeId, visit_type_id: visitTypeId, practice_type_id: practiceTypeId, ...inserted } = newAppointmentInfo.rows[0];
+        const [consultType, visitType, practiceType] = await Promise.all([
+            findLookupById('consult_types', consultTypeId),
+            findLookupById('visit_types', visitTypeId),
+            findLookupById('practice_types', practiceTypeId)
+        ]);
+        const appointmentData = {
+            ...inserted,
+            consult_type_name: consultType?.name ?? null,
+            visit_type_name: visitType?.name ?? null,
+            practice_type_name: practiceType?.name ?? null
+        };
         
         return NextResponse.json({ 
             message: "Appointment created successfully", 
@@ -207,6 +266,9 @@ export async function POST(req: NextRequest) {
             appointment_info: appointmentData
         }, { status: 201 });
     } catch (error: any) {
+        if (isSlotTakenError(error)) {
+            return NextResponse.json({ error: "This time slot is already booked" }, { status: 409 });
+        }
         console.error("Database query error:", error);
         return NextResponse.json({ error: `Failed to create appointment: ${error.message}` }, { status: 500 });
     }
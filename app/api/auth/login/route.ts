@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { authenticateUser, generateToken } from '@/lib/auth';
-import { rateLimit, getClientIP, createRateLimitResponse } from '@/lib/rate-limit';
+import { getClientIP, createRateLimitResponse } from '@/lib/rate-limit';
+import { getRateLimitStore } from '@/lib/rate-limit-store';
 
 // Ensure this runs in Node.js runtime, not Edge Runtime
 export const runtime = 'nodejs';
@@ -9,10 +10,10 @@ export async function POST(request: NextRequest) {
     try {
         // Rate limiting
         const clientIP = getClientIP(request);
-        const rateLimitResult = rateLimit(`login:${clientIP}`, 5, 60000); // 5 attempts per minute
+        const rateLimitResult = await getRateLimitStore().check(`login:${clientIP}`, { limit: 5, windowMs: 60000 }); // 5 attempts per minute
         
         if (!rateLimitResult.success) {
-            return createRateLimitResponse(rateLimitResult.remaining, rateLimitResult.resetTime);
+            return createRateLimitResponse(rateLimitResult.remaining, rateLimitResult.resetTime, rateLimitResult.limit);
         }
 
         const body = await request.json();
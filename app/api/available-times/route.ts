@@ -1,10 +1,19 @@
 import { NextResponse, NextRequest } from "next/server";
 import { query } from "@/lib/db";
+import { getRangeAvailability, invalidateAllAvailability, MAX_RANGE_DAYS } from "@/lib/availability";
 
 // Ensure this runs in Node.js runtime, not Edge Runtime
 export const runtime = 'nodejs';
 
-export async function GET() {
+export async function GET(request: NextRequest) {
+    const { searchParams } = new URL(request.url);
+    const from = searchParams.get('from');
+    const to = searchParams.get('to');
+
+    if (from || to) {
+        return getAvailabilityRange(from, to);
+    }
+
     try {
         const availableSlots = await query(`
             SELECT
@@ -21,6 +30,30 @@ export async function GET() {
     }
 }
 
+// Free slots for every date in ?from=YYYY-MM-DD&to=YYYY-MM-DD, computed in one query
+async function getAvailabilityRange(from: string | null, to: string | null) {
+    try {
+        const dateRegex = /^\d{4}-\d{2}-\d{2}$/;
+        if (!from || !to || !dateRegex.test(from) || !dateRegex.test(to) || isNaN(Date.parse(from)) || isNaN(Date.parse(to))) {
+            return NextResponse.json({ error: "Invalid date range. Expected from=YYYY-MM-DD&to=YYYY-MM-DD" }, { status: 400 });
+        }
+
+        const rangeDays = (Date.parse(to) - Date.parse(from)) / 86400000 + 1;
+        if (rangeDays < 1) {
+            return NextResponse.json({ error: "'from' must not be after 'to'" }, { status: 400 });
+        }
+        if (rangeDays > MAX_RANGE_DAYS) {
+            return NextResponse.json({ error: `Date range cannot exceed ${MAX_RANGE_DAYS} days` }, { status: 400 });
+        }
+
+        const days = await getRangeAvailability(from, to);
+        return NextResponse.json({ from, to, days }, { status: 200 });
+    } catch (error) {
+        console.error("Database query error:", error);
+        return NextResponse.json({ error: "Failed to fetch available times" }, { status: 500 });
+    }
+}
+
 export async function POST(req: NextRequest) {
     try {
         const body = await req.json();
@@ -35,6 +68,7 @@ export async function POST(req: NextRequest) {
             VALUES ($1, $2, $3, $4) RETURNING id`,
             [work_schedule_id, start_time, end_time, is_available]
         );
+        invalidateAllAvailability();
         return NextResponse.json({ message: "Available slot created successfully", id: result.rows[0].id }, { status: 201 });
     } catch (error) {
         console.error("Database query error:", error);
@@ -0,0 +1,35 @@
+import { NextRequest, NextResponse } from "next/server";
+import { getLookupTables, LookupTables } from "@/lib/lookup-tables";
+import { getHealthInsuranceList, HealthInsurance } from "@/lib/health-insurance";
+import { CachedBody, cachedJsonResponse, createCachedBody } from "@/lib/http-cache";
+
+// Ensure this runs in Node.js runtime, not Edge Runtime
+export const runtime = 'nodejs';
+
+const CACHE_CONTROL = 'public, max-age=60, stale-while-revalidate=600';
+
+// Re-serialized only when one of the underlying caches hands out a new list
+let cached: { lookups: LookupTables; healthInsurance: HealthInsurance[]; response: CachedBody } | null = null;
+
+/**
+ * Every list the booking form needs in one response:
+ * visit_types, consult_types, practice_types and health_insurance
+ */
+export async function GET(request: NextRequest) {
+    try {
+        const [lookups, healthInsurance] = await Promise.all([getLookupTables(), getHealthInsuranceList()]);
+
+        if (!cached || cached.lookups !== lookups || cached.healthInsurance !== healthInsurance) {
+            cached = {
+                lookups,
+                healthInsurance,
+                response: createCachedBody({ ...lookups, health_insurance: healthInsurance })
+            };
+        }
+
+        return cachedJsonResponse(request, cached.response, CACHE_CONTROL);
+    } catch (error) {
+        console.error("Error loading booking options:", error);
+        return NextResponse.json({ error: "Failed to load booking options" }, { status: 500 });
+    }
+}
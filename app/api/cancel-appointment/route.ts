@@ -1,7 +1,7 @@
 import { NextResponse, NextRequest } from "next/server";
 // import { cancelAppointmentByToken } from "@/lib/actions"; // Replaced with direct implementation
-import { query } from "@/lib/db";
 import { verifyCancellationToken, isCancellationAllowed } from "@/lib/cancellation-token";
+import { cancelAppointmentWithNotice } from "@/lib/booking";
 
 // Ensure this runs in Node.js runtime, not Edge Runtime
 export const runtime = 'nodejs';
@@ -33,22 +33,18 @@ export async function POST(request: NextRequest) {
             }, { status: 400 });
         }
 
-        // Update the appointment status to cancelled
-        const result = await query(
-            "UPDATE appointments SET status = 'cancelled' WHERE id = $1 RETURNING id, status",
-            [decoded.appointmentId]
-        );
-
-        if (result.rows.length === 0) {
+        // Cancel and queue the patient's push notice in one transaction
+        const cancelled = await cancelAppointmentWithNotice(decoded.appointmentId);
+        if (!cancelled) {
             return NextResponse.json({ 
-                error: "Cita no encontrada" 
+                error: "Cita no encontrada o ya cancelada" 
             }, { status: 404 });
         }
 
         return NextResponse.json({
             success: true,
             message: "Cita cancelada exitosamente",
-            appointmentId: result.rows[0].id
+            appointmentId: cancelled.id
         }, { status: 200 });
 
     } catch (error: any) {
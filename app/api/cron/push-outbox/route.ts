@@ -0,0 +1,30 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { authorizeCronRequest } from '@/lib/cron';
+import { dispatchPushOutbox } from '@/lib/push-outbox';
+
+// Ensure this runs in Node.js runtime, not Edge Runtime
+export const runtime = 'nodejs';
+export const dynamic = 'force-dynamic';
+
+// Run on a schedule, e.g. every minute, to deliver retries whose backoff has elapsed and
+// anything the in-process dispatcher did not get to. Rows are claimed with SKIP LOCKED.
+async function handle(request: NextRequest) {
+  const denied = authorizeCronRequest(request);
+  if (denied) {
+    return denied;
+  }
+
+  try {
+    const summary = await dispatchPushOutbox();
+    return NextResponse.json({ success: true, ...summary });
+  } catch (error) {
+    console.error('Error dispatching push outbox:', error);
+    return NextResponse.json(
+      { error: 'Failed to dispatch push notifications' },
+      { status: 500 }
+    );
+  }
+}
+
+export const GET = handle;
+export const POST = handle;
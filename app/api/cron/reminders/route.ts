@@ -0,0 +1,30 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { authorizeCronRequest } from '@/lib/cron';
+import { runReminderJobs } from '@/lib/reminders';
+
+// Ensure this runs in Node.js runtime, not Edge Runtime
+export const runtime = 'nodejs';
+export const dynamic = 'force-dynamic';
+
+// Run on a schedule, e.g. every 5 minutes. Overlapping runs are safe: jobs are
+// claimed with SKIP LOCKED.
+async function handle(request: NextRequest) {
+  const denied = authorizeCronRequest(request);
+  if (denied) {
+    return denied;
+  }
+
+  try {
+    const summary = await runReminderJobs();
+    return NextResponse.json({ success: true, ...summary });
+  } catch (error) {
+    console.error('Error running appointment reminders:', error);
+    return NextResponse.json(
+      { error: 'Failed to run appointment reminders' },
+      { status: 500 }
+    );
+  }
+}
+
+export const GET = handle;
+export const POST = handle;
@@ -0,0 +1,21 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { authorizeMetricsRequest, renderMetrics } from '@/lib/metrics';
+
+// Ensure this runs in Node.js runtime, not Edge Runtime
+export const runtime = 'nodejs';
+export const dynamic = 'force-dynamic';
+
+// Prometheus scrape target. Values are per server process.
+export async function GET(request: NextRequest) {
+  const denied = authorizeMetricsRequest(request);
+  if (denied) {
+    return denied;
+  }
+
+  return new NextResponse(renderMetrics(), {
+    headers: {
+      'Content-Type': 'text/plain; version=0.0.4; charset=utf-8',
+      'Cache-Control': 'no-store'
+    }
+  });
+}
@@ -1,5 +1,6 @@
 import { NextResponse, NextRequest } from "next/server";
 import { query } from "@/lib/db";
+import { cursorId, cursorText, decodeCursor, encodeCursor, parsePageSize, wantsCount } from "@/lib/pagination";
 
 // Ensure this runs in Node.js runtime, not Edge Runtime
 export const runtime = 'nodejs';
@@ -19,12 +20,74 @@ const getPatientId = async (phone_number: string) => {
     }
 };
 
-export async function GET() {
+// Must match the indexed expression in database/add_patients_search_indexes.sql
+const PATIENT_SEARCH_SQL = "lower(p.first_name || ' ' || p.last_name || ' ' || p.phone_number)";
+
+/**
+ * List patients ordered by (last_name, first_name, id), one page at a time.
+ *
+ * Query params: q (substring of name or phone), limit (default 50, max 200),
+ * cursor (next_cursor of the previous page) and count=true to also return
+ * the total number of matching patients.
+ */
+export async function GET(request: NextRequest) {
     try {
-        const patients = await query("SELECT * FROM patients ORDER BY last_name, first_name");
+        const { searchParams } = new URL(request.url);
+        const search = searchParams.get('q')?.trim();
+        const cursor = searchParams.get('cursor');
+
+        const limit = parsePageSize(searchParams.get('limit'));
+        if (limit === null) {
+            return NextResponse.json({ error: "limit must be a positive integer" }, { status: 400 });
+        }
+
+        const conditions: string[] = [];
+        const params: any[] = [];
+
+        if (search) {
+            // Escape LIKE wildcards so the search is a literal substring match
+            params.push(`%${search.toLowerCase().replace(/[\\%_]/g, '\\$&')}%`);
+            conditions.push(`${PATIENT_SEARCH_SQL} LIKE $${params.length}`);
+        }
+
+        // The total ignores the cursor so it stays the same on every page
+        const filterSQL = conditions.length > 0 ? `WHERE ${conditions.join(' AND ')}` : '';
+        const countParams = [...params];
+
+        if (cursor) {
+            const after = decodeCursor(cursor, [cursorText, cursorText, cursorId]);
+            if (!after) {
+                return NextResponse.json({ error: "Invalid cursor" }, { status: 400 });
+            }
+            params.push(...after);
+            conditions.push(
+                `(p.last_name, p.first_name, p.id) > ($${params.length - 2}, $${params.length - 1}, $${params.length})`
+            );
+        }
+
+        const whereSQL = conditions.length > 0 ? `WHERE ${conditions.join(' AND ')}` : '';
+        params.push(limit + 1);
+
+        const [patients, total] = await Promise.all([
+            query(
+                `SELECT p.* FROM patients p ${whereSQL} ORDER BY p.last_name, p.first_name, p.id LIMIT $${params.length}`,
+                params
+            ),
+            wantsCount(searchParams.get('count'))
+                ? query(`SELECT COUNT(*)::int AS count FROM patients p ${filterSQL}`, countParams)
+                : Promise.resolve(null)
+        ]);
+
+        // One extra row tells whether another page exists
+        const hasMore = patients.rows.length > limit;
+        const rows = hasMore ? patients.rows.slice(0, limit) : patients.rows;
+        const last = rows[rows.length - 1];
+
         return NextResponse.json({ 
-            patients: patients.rows,
-            count: patients.rows.length
+            patients: rows,
+            ...(total ? { count: total.rows[0].count } : {}),
+            has_more: hasMore,
+            next_cursor: hasMore ? encodeCursor([last.last_name, last.first_name, last.id]) : null
         }, { status: 200 });
     } catch (error) {
         console.error("Database query error:", error);
@@ -1,23 +1,22 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { query } from '@/lib/db';
-import webpush from 'web-push';
+import {
+  activeSubscriptions,
+  buildNotificationPayload,
+  configureWebPush,
+  fanOutPush,
+  findAppointmentPatientId,
+  PushDeliveryResult,
+  SubscriptionFilter
+} from '@/lib/push-sender';
+import { enqueueNotification, scheduleOutboxDispatch } from '@/lib/push-outbox';
 
 // Ensure this runs in Node.js runtime, not Edge Runtime
 export const runtime = 'nodejs';
 
-// Configure web-push (only if VAPID keys are available)
-if (process.env.NEXT_PUBLIC_VAPID_PUBLIC_KEY && process.env.VAPID_PRIVATE_KEY) {
-  webpush.setVapidDetails(
-    'mailto:contacto@dra-mara-flamini.com',
-    process.env.NEXT_PUBLIC_VAPID_PUBLIC_KEY,
-    process.env.VAPID_PRIVATE_KEY
-  );
-}
-
 export async function POST(request: NextRequest) {
   try {
     // Check if VAPID keys are configured
-    if (!process.env.NEXT_PUBLIC_VAPID_PUBLIC_KEY || !process.env.VAPID_PRIVATE_KEY) {
+    if (!configureWebPush()) {
       return NextResponse.json(
         { error: 'Push notifications not configured. VAPID keys missing.' },
         { status: 503 }
@@ -29,6 +28,7 @@ export async function POST(request: NextRequest) {
       body, 
       appointmentId, 
       patientId, 
+      broadcast = false,
       type = 'general',
       data = {} 
     } = await request.json();
@@ -40,80 +40,73 @@ export async function POST(request: NextRequest) {
       );
     }
 
-    // Get all active subscriptions
-    const subscriptions = await query(
-      'SELECT endpoint, p256dh_key, auth_key FROM push_subscriptions WHERE active = true'
-    );
+    // Sends go to one patient's devices unless a broadcast is requested explicitly
+    let filter: SubscriptionFilter;
+    if (broadcast === true) {
+      if (appointmentId || patientId) {
+        return NextResponse.json(
+          { error: 'A broadcast cannot target a patient or appointment' },
+          { status: 400 }
+        );
+      }
+      filter = {};
+    } else if (patientId !== undefined && patientId !== null) {
+      if (!Number.isInteger(Number(patientId)) || Number(patientId) <= 0) {
+        return NextResponse.json(
+          { error: 'Invalid patientId' },
+          { status: 400 }
+        );
+      }
+      filter = { patientId: Number(patientId) };
+    } else if (appointmentId) {
+      const uuidRegex = /^[0-9a-f]{8}-[0-9a-f]{4}-[1-5][0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$/i;
+      if (!uuidRegex.test(appointmentId)) {
+        return NextResponse.json(
+          { error: 'Invalid appointmentId' },
+          { status: 400 }
+        );
+      }
+      const appointmentPatientId = await findAppointmentPatientId(appointmentId);
+      if (appointmentPatientId === null) {
+        return NextResponse.json(
+          { error: 'Appointment not found' },
+          { status: 404 }
+        );
+      }
+      filter = { patientId: appointmentPatientId };
+    } else {
+      return NextResponse.json(
+        { error: 'Specify patientId or appointmentId, or set broadcast to true' },
+        { status: 400 }
+      );
+    }
+
+    const content = { title, body, type, data: { appointmentId, patientId, ...data } };
+
+    // Clients that accept NDJSON opt into live delivery: one line per delivery as it
+    // settles, then a summary line
+    if (request.headers.get('accept')?.includes('application/x-ndjson')) {
+      return streamDeliveries(filter, buildNotificationPayload(content));
+    }
 
-    if (subscriptions.rows.length === 0) {
+    // Otherwise the notifications are queued in the outbox and delivered in the background,
+    // with retries, so the caller does not wait on the push services
+    const queued = await enqueueNotification(filter, content);
+
+    if (queued === 0) {
       return NextResponse.json({
         success: true,
         message: 'No active subscriptions found',
-        sent: 0
+        queued: 0
       });
     }
 
-    const payload = JSON.stringify({
-      title,
-      body,
-      icon: '/icons/icon-192x192.svg',
-      badge: '/icons/icon-72x72.svg',
-      data: {
-        appointmentId,
-        patientId,
-        type,
-        url: type === 'appointment_reminder' ? '/agendar-visita' : '/',
-        ...data
-      },
-      actions: [
-        {
-          action: 'view',
-          title: 'Ver',
-          icon: '/icons/icon-96x96.svg'
-        }
-      ],
-      requireInteraction: type === 'appointment_reminder',
-      vibrate: [200, 100, 200]
-    });
-
-    const promises = subscriptions.rows.map(async (subscription) => {
-      try {
-        const pushSubscription = {
-          endpoint: subscription.endpoint,
-          keys: {
-            p256dh: subscription.p256dh_key,
-            auth: subscription.auth_key
-          }
-        };
-
-        await webpush.sendNotification(pushSubscription, payload);
-        return { success: true, endpoint: subscription.endpoint };
-      } catch (error: any) {
-        console.error('Error sending notification:', error);
-        
-        // If subscription is invalid, mark as inactive
-        if (error?.statusCode === 410) {
-          await query(
-            'UPDATE push_subscriptions SET active = false WHERE endpoint = $1',
-            [subscription.endpoint]
-          );
-        }
-        
-        return { success: false, endpoint: subscription.endpoint, error: error?.message || 'Unknown error' };
-      }
-    });
-
-    const results = await Promise.all(promises);
-    const successful = results.filter(r => r.success).length;
-    const failed = results.filter(r => !r.success).length;
-
+    scheduleOutboxDispatch();
     return NextResponse.json({
       success: true,
-      message: `Notifications sent: ${successful} successful, ${failed} failed`,
-      sent: successful,
-      failed,
-      results
-    });
+      message: `Notifications queued: ${queued}`,
+      queued
+    }, { status: 202 });
 
   } catch (error) {
     console.error('Error sending push notifications:', error);
@@ -123,3 +116,29 @@ export async function POST(request: NextRequest) {
     );
   }
 }
+
+function streamDeliveries(filter: SubscriptionFilter, payload: string) {
+  const encoder = new TextEncoder();
+  const stream = new ReadableStream({
+    async start(controller) {
+      const writeLine = (line: object) => controller.enqueue(encoder.encode(JSON.stringify(line) + '\n'));
+      try {
+        const summary = await fanOutPush(activeSubscriptions(filter), payload, {
+          onResult: (result: PushDeliveryResult) => writeLine(result)
+        });
+        writeLine({ done: true, success: true, ...summary });
+      } catch (error) {
+        console.error('Error sending push notifications:', error);
+        writeLine({ done: true, success: false, error: 'Failed to send notifications' });
+      }
+      controller.close();
+    }
+  });
+
+  return new NextResponse(stream, {
+    headers: {
+      'Content-Type': 'application/x-ndjson',
+      'Cache-Control': 'no-store'
+    }
+  });
+}
@@ -1,12 +1,13 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { query } from '@/lib/db';
+import { verifyCancellationToken } from '@/lib/cancellation-token';
 
 // Ensure this runs in Node.js runtime, not Edge Runtime
 export const runtime = 'nodejs';
 
 export async function POST(request: NextRequest) {
   try {
-    const { subscription, userAgent, timestamp } = await request.json();
+    const { subscription, userAgent, timestamp, cancellationToken } = await request.json();
 
     // Validate subscription object structure
     if (!subscription) {
@@ -56,31 +57,48 @@ export async function POST(request: NextRequest) {
       );
     }
 
-    // Store subscription in database
+    // A booking's cancellation token proves which patient this device belongs to,
+    // so targeted reminders can reach it. Without one the subscription stays unlinked.
+    let patientId: number | null = null;
+    if (cancellationToken) {
+      const decoded = verifyCancellationToken(cancellationToken);
+      if (!decoded) {
+        return NextResponse.json(
+          { error: 'Invalid or expired cancellation token' },
+          { status: 400 }
+        );
+      }
+      patientId = Number(decoded.patientId);
+    }
+
+    // Store subscription in database, keeping an existing patient link when none is given
     const result = await query(
-      `INSERT INTO push_subscriptions (endpoint, p256dh_key, auth_key, user_agent, created_at, updated_at)
-       VALUES ($1, $2, $3, $4, $5, $6)
+      `INSERT INTO push_subscriptions (endpoint, p256dh_key, auth_key, user_agent, created_at, updated_at, patient_id)
+       VALUES ($1, $2, $3, $4, $5, $6, $7)
        ON CONFLICT (endpoint) 
        DO UPDATE SET 
          p256dh_key = EXCLUDED.p256dh_key,
          auth_key = EXCLUDED.auth_key,
          user_agent = EXCLUDED.user_agent,
-         updated_at = EXCLUDED.updated_at
-       RETURNING id`,
+         updated_at = EXCLUDED.updated_at,
+         patient_id = COALESCE(EXCLUDED.patient_id, push_subscriptions.patient_id)
+       RETURNING id, patient_id`,
       [
         subscription.endpoint,
         subscription.keys?.p256dh || null,
         subscription.keys?.auth || null,
         userAgent || null,
         timestamp || new Date().toISOString(),
-        new Date().toISOString()
+        new Date().toISOString(),
+        patientId
       ]
     );
 
     return NextResponse.json({
       success: true,
       message: 'Subscription saved successfully',
-      id: result.rows[0]?.id
+      id: result.rows[0]?.id,
+      linked: result.rows[0]?.patient_id != null
     });
 
   } catch (error) {
@@ -1,5 +1,6 @@
 import { NextResponse, NextRequest } from "next/server";
 import { query } from "@/lib/db";
+import { invalidateAvailability } from "@/lib/availability";
 
 // Ensure this runs in Node.js runtime, not Edge Runtime
 export const runtime = 'nodejs';
@@ -48,6 +49,7 @@ export async function DELETE(_request: NextRequest, { params }: { params: Promis
         if (result.rowCount === 0) {
             return NextResponse.json({ error: "No unavailable day found for this date" }, { status: 404 });
         }
+        invalidateAvailability(date);
         
         return NextResponse.json({ 
             success: true,
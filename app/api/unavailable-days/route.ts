@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { query } from '@/lib/db';
+import { invalidateAvailability } from '@/lib/availability';
 
 // Ensure this runs in Node.js runtime, not Edge Runtime
 export const runtime = 'nodejs';
@@ -69,6 +70,8 @@ export async function POST(request: NextRequest) {
             );
         }
 
+        invalidateAvailability(dateToUse);
+
         return NextResponse.json({
             success: true,
             message: confirmed ? "Day marked as unavailable" : "Day marked as available",
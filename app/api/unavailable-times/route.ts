@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { query } from '@/lib/db';
+import { invalidateAvailability, toDateKey } from '@/lib/availability';
 
 // Ensure this runs in Node.js runtime, not Edge Runtime
 export const runtime = 'nodejs';
@@ -15,7 +16,14 @@ export async function POST(request: NextRequest) {
             );
         }
 
-        const formatedDate = `${selectedDate.getFullYear()}-${selectedDate.getMonth() + 1}-${selectedDate.getDate()}`;
+        // selectedDate arrives as a JSON string (YYYY-MM-DD or ISO timestamp)
+        const formatedDate = toDateKey(selectedDate);
+        if (!formatedDate) {
+            return NextResponse.json(
+                { error: "Invalid date format. Expected YYYY-MM-DD" },
+                { status: 400 }
+            );
+        }
 
         // Check if record already exists
         const existingRecord = await query(
@@ -31,6 +39,8 @@ export async function POST(request: NextRequest) {
             );
         }
 
+        invalidateAvailability(formatedDate);
+
         return NextResponse.json({
             success: true,
             message: "Unavailable time slot added successfully"
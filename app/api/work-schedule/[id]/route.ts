@@ -1,5 +1,6 @@
 import { NextResponse, NextRequest } from "next/server";
 import { query } from "@/lib/db";
+import { invalidateAllAvailability } from "@/lib/availability";
 
 // Ensure this runs in Node.js runtime, not Edge Runtime
 export const runtime = 'nodejs';
@@ -64,6 +65,7 @@ export async function PUT(_request: NextRequest, { params }: { params: Promise<{
         if (result.rowCount === 0) {
             return NextResponse.json({ error: "Work schedule entry not found for update" }, { status: 404 });
         }
+        invalidateAllAvailability();
         
         return NextResponse.json({ 
             message: "Work schedule entry updated successfully",
@@ -97,6 +99,7 @@ export async function DELETE(_request: NextRequest, { params }: { params: Promis
         if (result.rowCount === 0) {
             return NextResponse.json({ error: "Work schedule entry not found for deletion" }, { status: 404 });
         }
+        invalidateAllAvailability();
         
         return NextResponse.json({ 
             message: "Work schedule entry deleted successfully",
@@ -1,5 +1,6 @@
 import { NextResponse, NextRequest } from "next/server";
 import { query } from "@/lib/db";
+import { invalidateAllAvailability } from "@/lib/availability";
 
 // Ensure this runs in Node.js runtime, not Edge Runtime
 export const runtime = 'nodejs';
@@ -42,6 +43,7 @@ export async function POST(req: NextRequest) {
             "INSERT INTO work_schedule (day_of_week, is_working_day) VALUES ($1, $2) RETURNING id",
             [day_of_week, workingDay]
         );
+        invalidateAllAvailability();
         return NextResponse.json(
             { 
                 message: "Work schedule entry created successfully", 
@@ -15,34 +15,6 @@ interface AvailableTimesComponentProps {
 const AvailableTimesComponent = ({ selectedDate, form }: AvailableTimesComponentProps) => {
     const [times, setTimes] = useState<string[]>([]);
 
-    const createTimes = (startTime: string, endTime: string, appointmentTimes: string[]) => {
-        if (!startTime || !endTime) {
-            setTimes([]);
-            return;
-        }
-
-        const startHour = parseInt(startTime.split(":")[0]);
-        const startMinutes = parseInt(startTime.split(":")[1]);
-        const endHour = parseInt(endTime.split(":")[0]);
-        const endMinutes = parseInt(endTime.split(":")[1]);
-
-        const totalMinutes = (endHour - startHour) * 60 + (endMinutes - startMinutes);
-        const intervalMinutes = 20; // Intervalo de 20 minutos
-
-        const newTimes: string[] = [];
-        
-        for (let i = 0; i <= totalMinutes - intervalMinutes; i += intervalMinutes) {
-            const hour = startHour + Math.floor(i / 60);
-            const minutes = (i % 60).toString().padStart(2, "0");
-            const time = `${hour}:${minutes}`;
-            if (!appointmentTimes.includes(time)) {
-                newTimes.push(time);
-            }
-        }
-        
-        setTimes(newTimes);
-    };
-
     const formatDateForAPI = (date: Date) => {
         return `${date.getFullYear()}-${date.getMonth() + 1}-${date.getDate()}`
             .split("-")
@@ -64,34 +36,8 @@ const AvailableTimesComponent = ({ selectedDate, form }: AvailableTimesComponent
 
             const data = await getAvailableTimesByDate(formatedDate);
 
-            // Check if availableSlots is an array and has at least one item
-            if (!data.availableSlots || !Array.isArray(data.availableSlots) || data.availableSlots.length === 0) {
-                setTimes([]);
-                return data;
-            }
-
-            // Use the first available slot for time generation
-            const firstSlot = data.availableSlots[0];
-            
-            if (!firstSlot.start_time || !firstSlot.end_time) {
-                setTimes([]);
-                return data;
-            }
-
-            // Fetch existing appointments for this date
-            let appointmentTimes: string[] = [];
-            try {
-                const appointmentsResponse = await fetch(`/api/appointments/date/${formatedDate}`);
-                if (appointmentsResponse.ok) {
-                    const appointmentsData = await appointmentsResponse.json();
-                    appointmentTimes = appointmentsData.appointments.map((appointment: any) => appointment.appointment_time);
-                }
-            } catch (error) {
-                console.error("Error fetching appointments:", error);
-            }
-
-            // Generate times immediately when we get the data
-            createTimes(firstSlot.start_time, firstSlot.end_time, appointmentTimes);
+            // Free slots already computed server-side across every work window
+            setTimes(data.times);
             return data;
         },
         enabled: !!selectedDate,
@@ -22,36 +22,6 @@ const AvailableTimesComponent = ({ selectedDate, form }: AvailableTimesComponent
         return selectedDate.toISOString().split('T')[0];
     }, [selectedDate]);
 
-    // Memoize the createTimes function to prevent unnecessary re-creations
-    const createTimes = useCallback((startTime: string, endTime: string, appointmentTimes: string[]) => {
-        if (!startTime || !endTime) {
-            setTimes([]);
-            return;
-        }
-
-        const startHour = parseInt(startTime.split(":")[0]);
-        const startMinutes = parseInt(startTime.split(":")[1]);
-        const endHour = parseInt(endTime.split(":")[0]);
-        const endMinutes = parseInt(endTime.split(":")[1]);
-
-        const totalMinutes = (endHour - startHour) * 60 + (endMinutes - startMinutes);
-        const intervalMinutes = 20; // 20-minute intervals
-
-        const newTimes: string[] = [];
-        
-        for (let i = 0; i <= totalMinutes - intervalMinutes; i += intervalMinutes) {
-            const hour = startHour + Math.floor(i / 60);
-            const minutes = (i % 60).toString().padStart(2, "0");
-            const time = `${hour.toString().padStart(2, "0")}:${minutes}`;
-            if (!appointmentTimes.includes(time)) {
-                newTimes.push(time);
-            }
-        }
-        
-        setTimes(newTimes);
-        setIsGeneratingTimes(false);
-    }, []);
-
     // Memoize the formatDateForAPI function
     const formatDateForAPI = useCallback((date: Date) => {
         return `${date.getFullYear()}-${(date.getMonth() + 1).toString().padStart(2, '0')}-${date.getDate().toString().padStart(2, '0')}`;
@@ -74,37 +44,9 @@ const AvailableTimesComponent = ({ selectedDate, form }: AvailableTimesComponent
             try {
                 const data = await getAvailableTimesByDate(formatedDate);
 
-                // Check if availableSlots exists
-                if (!data.availableSlots) {
-                    setTimes([]);
-                    setIsGeneratingTimes(false);
-                    return data;
-                }
-
-                // Handle both array and object formats
-                const firstSlot = Array.isArray(data.availableSlots) ? data.availableSlots[0] : data.availableSlots;
-                
-                if (!firstSlot.start_time || !firstSlot.end_time) {
-                    setTimes([]);
-                    setIsGeneratingTimes(false);
-                    return data;
-                }
-
-                // Fetch existing appointments for this date
-                let appointmentTimes: string[] = [];
-                try {
-                    const appointmentsResponse = await fetch(`/api/appointments/date/${formatedDate}`);
-                    if (appointmentsResponse.ok) {
-                        const appointmentsData = await appointmentsResponse.json();
-                        appointmentTimes = appointmentsData.appointments.map((appointment: any) => appointment.appointment_time);
-                    }
-                } catch (error) {
-                    console.error("Error fetching appointments:", error);
-                    // Continue with empty appointment times if fetch fails
-                }
-
-                // Generate times immediately when we get the data
-                createTimes(firstSlot.start_time, firstSlot.end_time, appointmentTimes);
+                // Free slots already computed server-side across every work window
+                setTimes(data.times);
+                setIsGeneratingTimes(false);
                 return data;
             } catch (error) {
                 console.error("Error in queryFn:", error);
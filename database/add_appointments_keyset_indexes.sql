@@ -0,0 +1,8 @@
+-- Indexes backing the keyset pagination of GET /api/appointments
+-- Pages are ordered by (appointment_date, appointment_time, id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_date_time_id
+    ON appointments (appointment_date, appointment_time, id);
+
+-- Per-patient history in the same order
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_patient_date_time_id
+    ON appointments (patient_id, appointment_date, appointment_time, id);
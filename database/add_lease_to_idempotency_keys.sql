@@ -0,0 +1,6 @@
+-- In-progress lease for idempotency keys
+-- A claim holds the key only until locked_until; if the process dies mid-request, a retry
+-- can take the key over once the lease lapses instead of waiting out the 24h expiry,
+-- which is set when the response is stored
+ALTER TABLE idempotency_keys
+    ADD COLUMN IF NOT EXISTS locked_until TIMESTAMP WITH TIME ZONE;
@@ -0,0 +1,8 @@
+-- Link push subscriptions to patients so reminders reach only that patient's devices
+ALTER TABLE push_subscriptions
+    ADD COLUMN IF NOT EXISTS patient_id INTEGER REFERENCES patients(id) ON DELETE SET NULL;
+
+-- Targeted sends read only the active rows of one patient
+CREATE INDEX IF NOT EXISTS idx_push_subscriptions_patient_active
+    ON push_subscriptions (patient_id)
+    WHERE active = true;
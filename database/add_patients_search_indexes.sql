@@ -0,0 +1,12 @@
+-- Indexes backing GET /api/patients pagination and q= search
+
+-- Pages are ordered by (last_name, first_name, id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_name_id
+    ON patients (last_name, first_name, id);
+
+-- Trigram index so substring search over name and phone does not scan the table
+-- The expression must match PATIENT_SEARCH_SQL in app/api/patients/route.ts
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_search_trgm
+    ON patients USING GIN (lower(first_name || ' ' || last_name || ' ' || phone_number) gin_trgm_ops);
@@ -0,0 +1,17 @@
+-- Enforce at most one active (non-cancelled) appointment per date and time.
+-- Concurrent bookings of the same slot now fail with a unique violation instead of
+-- racing past the application-level duplicate check.
+
+-- Find existing double bookings first; the index cannot be built while any remain
+-- SELECT appointment_date, appointment_time, array_agg(id) AS appointment_ids
+-- FROM appointments
+-- WHERE status <> 'cancelled'
+-- GROUP BY appointment_date, appointment_time
+-- HAVING COUNT(*) > 1;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uniq_appointments_active_slot
+ON appointments (appointment_date, appointment_time)
+WHERE status <> 'cancelled';
+
+-- Patient upserts (INSERT ... ON CONFLICT (phone_number)) rely on the existing
+-- UNIQUE constraint on patients.phone_number.
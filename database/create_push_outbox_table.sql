@@ -0,0 +1,34 @@
+-- Transactional outbox for push notifications: rows are written in the same transaction
+-- as the booking or cancellation that triggers them and drained by lib/push-outbox.ts.
+-- Run this before deploying a build with the outbox: once VAPID keys are configured,
+-- bookings and cancellations fail while the table is missing.
+CREATE TABLE IF NOT EXISTS push_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending, sent, dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    sent_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Dispatchers claim due pending rows, oldest first
+CREATE INDEX IF NOT EXISTS idx_push_outbox_pending_next_attempt
+    ON push_outbox (next_attempt_at)
+    WHERE status = 'pending';
+
+-- Dead-lettering everything queued for a retired endpoint
+CREATE INDEX IF NOT EXISTS idx_push_outbox_pending_endpoint
+    ON push_outbox (endpoint)
+    WHERE status = 'pending';
+
+-- Sweeping delivered rows past their retention
+CREATE INDEX IF NOT EXISTS idx_push_outbox_sent_at
+    ON push_outbox (sent_at)
+    WHERE status = 'sent';
+
+-- Consecutive delivery failures per endpoint, reset on success
+ALTER TABLE push_subscriptions
+    ADD COLUMN IF NOT EXISTS failure_count INTEGER NOT NULL DEFAULT 0;
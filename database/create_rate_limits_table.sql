@@ -0,0 +1,17 @@
+-- Shared rate limit counters used when RATE_LIMIT_STORE=postgres
+-- UNLOGGED: counters are cheap to lose on crash and skip WAL on every request
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limits (
+    key VARCHAR(255) PRIMARY KEY,
+    -- Requests in the current window, or tokens left for token-bucket limits
+    count DOUBLE PRECISION NOT NULL,
+    -- Requests in the previous window (sliding-window limits)
+    previous_count DOUBLE PRECISION NOT NULL DEFAULT 0,
+    -- Epoch milliseconds: window start, or last refill for token-bucket limits
+    window_start BIGINT NOT NULL,
+    -- Whether the last hit was let through (token-bucket limits)
+    allowed BOOLEAN NOT NULL DEFAULT true,
+    expires_at BIGINT NOT NULL
+);
+
+-- Used by the expiry sweeper
+CREATE INDEX IF NOT EXISTS idx_rate_limits_expires_at ON rate_limits (expires_at);
@@ -0,0 +1,26 @@
+-- Appointment reminder jobs, enqueued ahead of each scheduled appointment and claimed
+-- by workers with FOR UPDATE SKIP LOCKED (see lib/reminders.ts)
+CREATE TABLE IF NOT EXISTS reminder_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    appointment_id UUID NOT NULL REFERENCES appointments(id) ON DELETE CASCADE,
+    -- Local time, like appointment_date + appointment_time
+    run_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending, running, done, skipped, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    locked_until TIMESTAMP WITHOUT TIME ZONE,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    -- A rescheduled appointment gets a new job; the old one is skipped when claimed
+    UNIQUE (appointment_id, run_at)
+);
+
+-- Claims scan only due pending jobs, oldest first
+CREATE INDEX IF NOT EXISTS idx_reminder_jobs_pending_run_at
+    ON reminder_jobs (run_at)
+    WHERE status = 'pending';
+
+-- Jobs whose worker died are reclaimed once their lock lapses
+CREATE INDEX IF NOT EXISTS idx_reminder_jobs_running_locked_until
+    ON reminder_jobs (locked_until)
+    WHERE status = 'running';
@@ -0,0 +1,7 @@
+// Runs once when the server starts (https://nextjs.org/docs/app/guides/instrumentation)
+export async function register() {
+  if (process.env.NEXT_RUNTIME === 'nodejs') {
+    const { installHttpMetrics } = await import('./lib/http-metrics')
+    installHttpMetrics()
+  }
+}
@@ -1,12 +1,17 @@
 // Edge Runtime compatible auth functions
-// This file only contains functions that work in Edge Runtime (no Node.js modules)
+// This file only contains functions that work in Edge Runtime (no Node.js modules).
+// HS256 is implemented on crypto.subtle so jsonwebtoken stays out of the middleware bundle;
+// tokens are interchangeable with the ones lib/auth.ts issues.
 
-import jwt from 'jsonwebtoken';
+const MAX_VERIFIED_TOKENS = 1000;
+
+const encoder = new TextEncoder();
+const decoder = new TextDecoder();
 
 // JWT Secret - must be provided via environment variables
 function getJWTSecret(): string {
   const JWT_SECRET = process.env.JWT_SECRET;
-  
+
   if (!JWT_SECRET) {
     throw new Error('JWT_SECRET environment variable is required');
   }
@@ -14,29 +19,137 @@ function getJWTSecret(): string {
   if (JWT_SECRET.length < 32) {
     throw new Error('JWT_SECRET must be at least 32 characters long');
   }
-  
+
   return JWT_SECRET;
 }
 
+interface VerifiedToken {
+  signingInput: string;
+  payload: any;
+  expiresAt: number;
+}
+
+// Imported once per isolate; re-imported only if JWT_SECRET changes
+let cachedKey: { secret: string; key: Promise<CryptoKey> } | null = null;
+
+// Recently verified tokens keyed by signature, in LRU order
+const verifiedTokens = new Map<string, VerifiedToken>();
+
+function getSigningKey(): Promise<CryptoKey> {
+  const secret = process.env.JWT_SECRET;
+  if (cachedKey && cachedKey.secret === secret) {
+    return cachedKey.key;
+  }
+
+  const validSecret = getJWTSecret();
+  const key = crypto.subtle.importKey(
+    'raw',
+    encoder.encode(validSecret),
+    { name: 'HMAC', hash: 'SHA-256' },
+    false,
+    ['sign', 'verify']
+  );
+  cachedKey = { secret: validSecret, key };
+  // Tokens verified under the old secret are no longer trusted
+  verifiedTokens.clear();
+  return key;
+}
+
+function base64UrlEncode(bytes: Uint8Array): string {
+  let binary = '';
+  for (const byte of bytes) {
+    binary += String.fromCharCode(byte);
+  }
+  return btoa(binary).replace(/\+/g, '-').replace(/\//g, '_').replace(/=+$/, '');
+}
+
+function base64UrlDecode(value: string): Uint8Array {
+  const base64 = value.replace(/-/g, '+').replace(/_/g, '/');
+  const binary = atob(base64.padEnd(base64.length + ((4 - (base64.length % 4)) % 4), '='));
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return bytes;
+}
+
+function decodeJSON(segment: string): any {
+  return JSON.parse(decoder.decode(base64UrlDecode(segment)));
+}
+
+function rememberToken(signature: string, entry: VerifiedToken): void {
+  verifiedTokens.delete(signature);
+  verifiedTokens.set(signature, entry);
+  if (verifiedTokens.size > MAX_VERIFIED_TOKENS) {
+    verifiedTokens.delete(verifiedTokens.keys().next().value as string);
+  }
+}
+
 // JWT token verification (Edge Runtime compatible)
-export function verifyToken(token: string): any {
+export async function verifyToken(token: string): Promise<any> {
   try {
-    return jwt.verify(token, getJWTSecret());
+    const parts = token.split('.');
+    if (parts.length !== 3) {
+      return null;
+    }
+    const [encodedHeader, encodedPayload, signature] = parts;
+    const signingInput = `${encodedHeader}.${encodedPayload}`;
+    const now = Date.now();
+    const key = await getSigningKey();
+
+    const cached = verifiedTokens.get(signature);
+    if (cached && cached.signingInput === signingInput) {
+      if (cached.expiresAt > now) {
+        rememberToken(signature, cached);
+        return cached.payload;
+      }
+      verifiedTokens.delete(signature);
+      return null;
+    }
+
+    const header = decodeJSON(encodedHeader);
+    if (header.alg !== 'HS256') {
+      return null;
+    }
+
+    const valid = await crypto.subtle.verify('HMAC', key, base64UrlDecode(signature), encoder.encode(signingInput));
+    if (!valid) {
+      return null;
+    }
+
+    const payload = decodeJSON(encodedPayload);
+    if (!payload || typeof payload !== 'object') {
+      return null;
+    }
+    if (typeof payload.exp === 'number' && payload.exp * 1000 <= now) {
+      return null;
+    }
+    if (typeof payload.nbf === 'number' && payload.nbf * 1000 > now) {
+      return null;
+    }
+
+    // Only tokens with an expiry are cached, and only until it passes
+    if (typeof payload.exp === 'number') {
+      rememberToken(signature, { signingInput, payload, expiresAt: payload.exp * 1000 });
+    }
+    return payload;
   } catch (error) {
     return null;
   }
 }
 
 // Generate JWT token (Edge Runtime compatible)
-export function generateToken(user: { id: number; email: string; role: string; full_name: string }): string {
-  return jwt.sign(
-    { 
-      id: user.id, 
-      email: user.email, 
-      role: user.role,
-      full_name: user.full_name 
-    },
-    getJWTSecret(),
-    { expiresIn: '24h' }
-  );
+export async function generateToken(user: { id: number; email: string; role: string; full_name: string }): Promise<string> {
+  const issuedAt = Math.floor(Date.now() / 1000);
+  const header = base64UrlEncode(encoder.encode(JSON.stringify({ alg: 'HS256', typ: 'JWT' })));
+  const payload = base64UrlEncode(encoder.encode(JSON.stringify({
+    id: user.id,
+    email: user.email,
+    role: user.role,
+    full_name: user.full_name,
+    iat: issuedAt,
+    exp: issuedAt + 24 * 60 * 60
+  })));
+  const signature = await crypto.subtle.sign('HMAC', await getSigningKey(), encoder.encode(`${header}.${payload}`));
+  return `${header}.${payload}.${base64UrlEncode(new Uint8Array(signature))}`;
 }
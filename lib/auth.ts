@@ -1,8 +1,8 @@
-import bcrypt from 'bcryptjs';
 import jwt from 'jsonwebtoken';
-import nodemailer from 'nodemailer';
 // Remove crypto import - using web crypto API instead
 import { query } from './db';
+import { bcryptCompare, bcryptHash } from './bcrypt-pool';
+import { enqueueMail, isMailConfigured } from './mailer';
 
 // JWT Secret - must be provided via environment variables
 function getJWTSecret(): string {
@@ -19,17 +19,6 @@ function getJWTSecret(): string {
   return JWT_SECRET;
 }
 
-// Email configuration
-const transporter = nodemailer.createTransport({
-    service: 'gmail',
-    auth: {
-        user: process.env.EMAIL_USER,
-        pass: process.env.EMAIL_PASS,
-    },
-    secure: true,
-    port: 465,
-});
-
 export interface User {
     id: number;
     full_name: string;
@@ -44,15 +33,39 @@ export interface LoginCredentials {
     password: string;
 }
 
-// Password hashing
+// Short-lived cache of users by id, so /api/auth/verify does not query Postgres on every
+// admin navigation. Entries are dropped on password reset; call invalidateUser() after
+// any other change to a user row (role, name, email).
+const USER_CACHE_TTL_MS = 60 * 1000;
+const USER_CACHE_MAX_ENTRIES = 1000;
+
+const userCache = new Map<number, { user: User; expiresAt: number }>();
+
+function cacheUser(user: User): void {
+    userCache.delete(Number(user.id));
+    userCache.set(Number(user.id), { user, expiresAt: Date.now() + USER_CACHE_TTL_MS });
+    if (userCache.size > USER_CACHE_MAX_ENTRIES) {
+        userCache.delete(userCache.keys().next().value as number);
+    }
+}
+
+export function invalidateUser(id?: number): void {
+    if (id === undefined) {
+        userCache.clear();
+    } else {
+        userCache.delete(Number(id));
+    }
+}
+
+// Password hashing, on the bcrypt worker pool
 export async function hashPassword(password: string): Promise<string> {
     const saltRounds = 12;
-    return bcrypt.hash(password, saltRounds);
+    return bcryptHash(password, saltRounds);
 }
 
 // Password verification
 export async function verifyPassword(password: string, hashedPassword: string): Promise<boolean> {
-    return bcrypt.compare(password, hashedPassword);
+    return bcryptCompare(password, hashedPassword);
 }
 
 // JWT token generation
@@ -99,6 +112,7 @@ export async function authenticateUser(credentials: LoginCredentials): Promise<U
 
         // Return user without password
         const { password, ...userWithoutPassword } = user;
+        cacheUser(userWithoutPassword);
         return userWithoutPassword;
     } catch (error) {
         console.error('Authentication error:', error);
@@ -131,11 +145,11 @@ export async function generateResetToken(email: string): Promise<string | null>
     }
 }
 
-// Send password reset email
+// Queue the password reset email; delivery happens in the background (lib/mailer.ts)
 export async function sendPasswordResetEmail(email: string, resetToken: string): Promise<boolean> {
     try {
         // Check if email configuration is available
-        if (!process.env.EMAIL_USER || !process.env.EMAIL_PASS) {
+        if (!isMailConfigured()) {
             console.error('Email configuration missing. Please set EMAIL_USER and EMAIL_PASS environment variables.');
             return false;
         }
@@ -143,7 +157,6 @@ export async function sendPasswordResetEmail(email: string, resetToken: string):
         const resetUrl = `${process.env.NEXT_PUBLIC_APP_URL}/reset-password?token=${resetToken}`;
         
         const mailOptions = {
-            from: process.env.EMAIL_USER,
             to: email,
             subject: 'Password Reset Request - Maraxo Admin',
             html: `
@@ -165,10 +178,9 @@ export async function sendPasswordResetEmail(email: string, resetToken: string):
             `
         };
 
-        await transporter.sendMail(mailOptions);
-        return true;
+        return enqueueMail(mailOptions);
     } catch (error) {
-        console.error('Error sending password reset email:', error);
+        console.error('Error queueing password reset email:', error);
         return false;
     }
 }
@@ -181,10 +193,14 @@ export async function resetPasswordWithToken(token: string, newPassword: string)
         const result = await query(
             `UPDATE users 
              SET password = $1, reset_token = NULL, reset_token_expires = NULL 
-             WHERE reset_token = $2 AND reset_token_expires > NOW()`,
+             WHERE reset_token = $2 AND reset_token_expires > NOW()
+             RETURNING id`,
             [hashedPassword, token]
         );
 
+        for (const row of result.rows) {
+            invalidateUser(row.id);
+        }
         return (result.rowCount ?? 0) > 0;
     } catch (error) {
         console.error('Error resetting password:', error);
@@ -192,15 +208,25 @@ export async function resetPasswordWithToken(token: string, newPassword: string)
     }
 }
 
-// Get user by ID
+// Get user by ID, served from the user cache while it is fresh
 export async function getUserById(id: number): Promise<User | null> {
     try {
+        const cached = userCache.get(Number(id));
+        if (cached && cached.expiresAt > Date.now()) {
+            return cached.user;
+        }
+
         const result = await query(
             'SELECT id, full_name, email, role, created_at, updated_at FROM users WHERE id = $1',
             [id]
         );
 
-        return result.rows.length > 0 ? result.rows[0] : null;
+        if (result.rows.length === 0) {
+            userCache.delete(Number(id));
+            return null;
+        }
+        cacheUser(result.rows[0]);
+        return result.rows[0];
     } catch (error) {
         console.error('Error getting user by ID:', error);
         return null;
@@ -0,0 +1,197 @@
+import { query } from "./db";
+import { LRUCache } from "./lru-cache";
+import { computeFreeSlots, TimeWindow } from "./slot-bitmap";
+
+export { SLOT_INTERVAL_MINUTES } from "./slot-bitmap";
+
+// Widest range accepted by the range endpoint (a month view plus overflow weeks)
+export const MAX_RANGE_DAYS = 62;
+
+export type DayAvailability =
+    | { available: true; times: string[]; windows: TimeWindow[] }
+    | { available: false; error: string; reason?: string };
+
+export type RangeDayAvailability = { date: string; available: boolean; count: number; times: string[]; reason?: string };
+
+// Per-date availability cache. Entries are invalidated from every write path that
+// changes a day's slots; the TTL only bounds staleness from writers outside this process.
+const AVAILABILITY_CACHE_MAX_DAYS = 400;
+const AVAILABILITY_CACHE_TTL_MS = 5 * 60 * 1000;
+const availabilityCache = new LRUCache<string, DayAvailability>(AVAILABILITY_CACHE_MAX_DAYS, AVAILABILITY_CACHE_TTL_MS);
+
+// Bumped on every invalidation so a read that started before a write never caches its stale result
+let cacheGeneration = 0;
+
+/**
+ * Normalize a date (YYYY-MM-DD string, ISO timestamp, unpadded Y-M-D or a pg DATE value) to a YYYY-MM-DD cache key
+ */
+export function toDateKey(date: string | Date | null | undefined): string | null {
+    if (!date) {
+        return null;
+    }
+
+    if (date instanceof Date) {
+        if (isNaN(date.getTime())) {
+            return null;
+        }
+        // pg parses DATE columns to local midnight
+        return `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}-${String(date.getDate()).padStart(2, '0')}`;
+    }
+
+    const match = /^(\d{4})-(\d{1,2})-(\d{1,2})/.exec(date);
+    if (!match) {
+        return null;
+    }
+    return `${match[1]}-${match[2].padStart(2, '0')}-${match[3].padStart(2, '0')}`;
+}
+
+export function invalidateAvailability(...dates: Array<string | Date | null | undefined>): void {
+    cacheGeneration++;
+    for (const date of dates) {
+        const key = toDateKey(date);
+        if (key) {
+            availabilityCache.delete(key);
+        }
+    }
+}
+
+// Schedule edits (work_schedule, available_slots) can change any date
+export function invalidateAllAvailability(): void {
+    cacheGeneration++;
+    availabilityCache.clear();
+}
+
+function datesInRange(from: string, to: string): string[] {
+    const dates: string[] = [];
+    for (let time = Date.parse(`${from}T00:00:00.000Z`); time <= Date.parse(`${to}T00:00:00.000Z`); time += 86400000) {
+        dates.push(new Date(time).toISOString().split('T')[0]);
+    }
+    return dates;
+}
+
+function toRangeDay(date: string, day: DayAvailability): RangeDayAvailability {
+    if (!day.available) {
+        return { date, available: false, count: 0, times: [], reason: day.reason || day.error };
+    }
+    return { date, available: true, count: day.times.length, times: day.times };
+}
+
+/**
+ * Load everything that decides the free slots of every date in [$1, $2] in one statement.
+ *
+ * Per day it returns every custom frame from unavailable_time_frames, every
+ * enabled available_slots window for its weekday and the booked times; the
+ * slots themselves are computed with the bitmap engine in lib/slot-bitmap.ts.
+ */
+const availabilitySQL = `
+    WITH days AS (
+        SELECT day::date AS day
+        FROM generate_series($1::date, $2::date, interval '1 day') AS day
+    ),
+    booked AS (
+        SELECT appointment_date, array_agg(left(appointment_time::text, 5)) AS times
+        FROM appointments
+        WHERE appointment_date BETWEEN $1::date AND $2::date
+          AND status != 'cancelled'
+        GROUP BY appointment_date
+    )
+    SELECT
+        to_char(d.day, 'YYYY-MM-DD') AS date,
+        ws.is_working_day,
+        EXISTS (
+            SELECT 1 FROM unavailable_days ud
+            WHERE ud.unavailable_date = d.day AND ud.is_confirmed = true
+        ) AS is_day_off,
+        (
+            SELECT json_agg(json_build_object('start_time', asl.start_time, 'end_time', asl.end_time) ORDER BY asl.start_time)
+            FROM available_slots asl
+            WHERE asl.work_schedule_id = ws.id AND asl.is_available = true
+        ) AS default_windows,
+        custom.windows AS custom_windows,
+        custom.is_working_day AS custom_is_working_day,
+        COALESCE(b.times, '{}') AS booked_times
+    FROM days d
+    LEFT JOIN work_schedule ws ON ws.day_of_week = to_char(d.day, 'FMDay')
+    LEFT JOIN LATERAL (
+        SELECT
+            json_agg(json_build_object('start_time', utf.start_time, 'end_time', utf.end_time) ORDER BY utf.start_time) AS windows,
+            bool_and(COALESCE(fws.is_working_day, true)) AS is_working_day
+        FROM unavailable_time_frames utf
+        LEFT JOIN work_schedule fws ON utf.work_schedule_id = fws.id
+        WHERE utf.workday_date = d.day
+    ) custom ON true
+    LEFT JOIN booked b ON b.appointment_date = d.day
+    ORDER BY d.day
+`;
+
+function toDayAvailability(row: any): DayAvailability {
+    const customWindows: TimeWindow[] | null = row.custom_windows;
+
+    // Custom frames replace the weekday windows for that date
+    if (customWindows && customWindows.length > 0) {
+        if (row.custom_is_working_day === false || row.is_day_off) {
+            return {
+                available: false,
+                error: "This day is unavailable",
+                reason: row.custom_is_working_day === false ? "Not a working day" : "Day marked as unavailable"
+            };
+        }
+        return { available: true, times: computeFreeSlots(customWindows, row.booked_times), windows: customWindows };
+    }
+
+    if (row.is_day_off) {
+        return { available: false, error: "This day is unavailable", reason: "Day marked as unavailable" };
+    }
+
+    if (row.is_working_day === false) {
+        return { available: false, error: "This day is not a working day" };
+    }
+
+    const defaultWindows: TimeWindow[] | null = row.default_windows;
+    if (!defaultWindows || defaultWindows.length === 0) {
+        return { available: false, error: "No available slots configured for this day of week" };
+    }
+
+    return { available: true, times: computeFreeSlots(defaultWindows, row.booked_times), windows: defaultWindows };
+}
+
+export async function getDayAvailability(date: string): Promise<DayAvailability> {
+    const key = toDateKey(date);
+    const cached = key ? availabilityCache.get(key) : undefined;
+    if (cached) {
+        return cached;
+    }
+
+    const generation = cacheGeneration;
+    const result = await query(availabilitySQL, [date, date]);
+
+    if (result.rows.length < 1) {
+        return { available: false, error: "No available slots configured for this day of week" };
+    }
+
+    const day = toDayAvailability(result.rows[0]);
+    if (key && generation === cacheGeneration) {
+        availabilityCache.set(key, day);
+    }
+    return day;
+}
+
+export async function getRangeAvailability(from: string, to: string): Promise<RangeDayAvailability[]> {
+    // Serve fully cached ranges without touching the database
+    const dates = datesInRange(from, to);
+    const cachedDays = dates.map((date) => availabilityCache.get(date));
+    if (cachedDays.every((day) => day !== undefined)) {
+        return dates.map((date, index) => toRangeDay(date, cachedDays[index] as DayAvailability));
+    }
+
+    const generation = cacheGeneration;
+    const result = await query(availabilitySQL, [from, to]);
+
+    return result.rows.map((row: any) => {
+        const day = toDayAvailability(row);
+        if (generation === cacheGeneration) {
+            availabilityCache.set(row.date, day);
+        }
+        return toRangeDay(row.date, day);
+    });
+}
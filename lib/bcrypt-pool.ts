@@ -0,0 +1,188 @@
+import { Worker } from 'worker_threads';
+import os from 'os';
+import bcrypt from 'bcryptjs';
+
+// Bounded worker_threads pool for bcrypt, so cost-12 hashes and compares run off the
+// event loop instead of stalling every concurrent request on the process.
+
+type BcryptTask =
+    | { op: 'hash'; args: [string, number] }
+    | { op: 'compare'; args: [string, string] };
+
+interface QueuedTask {
+    id: number;
+    task: BcryptTask;
+    resolve: (value: any) => void;
+    reject: (error: Error) => void;
+}
+
+interface PoolWorker {
+    worker: Worker;
+    current: QueuedTask | null;
+}
+
+export interface BcryptPoolStats {
+    size: number;
+    busy: number;
+    queueDepth: number;
+    maxQueueDepth: number;
+    completed: number;
+    rejected: number;
+}
+
+// Kept as source so bundlers leave it alone; bcryptjs is resolved from the app root at runtime
+const WORKER_SOURCE = `
+const { parentPort, workerData } = require('worker_threads');
+const { createRequire } = require('module');
+const bcrypt = createRequire(workerData.root + '/package.json')('bcryptjs');
+parentPort.on('message', ({ id, op, args }) => {
+    try {
+        const result = op === 'hash' ? bcrypt.hashSync(args[0], args[1]) : bcrypt.compareSync(args[0], args[1]);
+        parentPort.postMessage({ id, result });
+    } catch (error) {
+        parentPort.postMessage({ id, error: error instanceof Error ? error.message : String(error) });
+    }
+});
+`;
+
+export class BcryptPool {
+    private workers: PoolWorker[] = [];
+    private queue: QueuedTask[] = [];
+    private nextId = 1;
+    private completed = 0;
+    private rejected = 0;
+    private workersUnavailable = false;
+
+    constructor(private size: number, private maxQueueDepth: number) {}
+
+    run(task: BcryptTask): Promise<any> {
+        if (this.workersUnavailable) {
+            return runInThread(task);
+        }
+
+        if (this.queue.length >= this.maxQueueDepth) {
+            this.rejected++;
+            return Promise.reject(new Error('Password hashing queue is full'));
+        }
+
+        return new Promise((resolve, reject) => {
+            this.queue.push({ id: this.nextId++, task, resolve, reject });
+            this.dispatch();
+        });
+    }
+
+    stats(): BcryptPoolStats {
+        return {
+            size: this.workers.length,
+            busy: this.workers.filter((poolWorker) => poolWorker.current).length,
+            queueDepth: this.queue.length,
+            maxQueueDepth: this.maxQueueDepth,
+            completed: this.completed,
+            rejected: this.rejected
+        };
+    }
+
+    private dispatch(): void {
+        while (this.queue.length > 0) {
+            const idle = this.workers.find((poolWorker) => !poolWorker.current) ?? this.spawn();
+            if (!idle) {
+                return;
+            }
+
+            const queued = this.queue.shift() as QueuedTask;
+            idle.current = queued;
+            idle.worker.postMessage({ id: queued.id, ...queued.task });
+        }
+    }
+
+    // Workers start lazily, up to size
+    private spawn(): PoolWorker | null {
+        if (this.workers.length >= this.size) {
+            return null;
+        }
+
+        let worker: Worker;
+        try {
+            worker = new Worker(WORKER_SOURCE, { eval: true, workerData: { root: process.cwd() } });
+        } catch (error) {
+            // Runtimes without worker_threads hash on the main thread, as before
+            console.error('Could not start bcrypt worker, hashing in-thread:', error);
+            this.workersUnavailable = true;
+            this.drainInThread();
+            return null;
+        }
+
+        const poolWorker: PoolWorker = { worker, current: null };
+        worker.on('message', ({ id, result, error }) => {
+            const current = poolWorker.current;
+            if (!current || current.id !== id) {
+                return;
+            }
+            poolWorker.current = null;
+            this.completed++;
+            if (error) {
+                current.reject(new Error(error));
+            } else {
+                current.resolve(result);
+            }
+            this.dispatch();
+        });
+        worker.on('error', (error) => {
+            console.error('bcrypt worker error:', error);
+            this.retire(poolWorker, error);
+        });
+        worker.on('exit', (code) => {
+            this.retire(poolWorker, new Error(`bcrypt worker exited with code ${code}`));
+        });
+
+        // Idle workers must not keep the process alive; attaching listeners re-refs, so unref last
+        worker.unref();
+        this.workers.push(poolWorker);
+        return poolWorker;
+    }
+
+    // Drop a dead worker, fail its task and let the queue spawn a replacement
+    private retire(poolWorker: PoolWorker, error: Error): void {
+        const index = this.workers.indexOf(poolWorker);
+        if (index === -1) {
+            return;
+        }
+        this.workers.splice(index, 1);
+        if (poolWorker.current) {
+            poolWorker.current.reject(error);
+            poolWorker.current = null;
+        }
+        this.dispatch();
+    }
+
+    private drainInThread(): void {
+        for (const queued of this.queue.splice(0)) {
+            runInThread(queued.task).then(queued.resolve, queued.reject);
+        }
+    }
+}
+
+function runInThread(task: BcryptTask): Promise<any> {
+    return task.op === 'hash' ? bcrypt.hash(task.args[0], task.args[1]) : bcrypt.compare(task.args[0], task.args[1]);
+}
+
+// os.availableParallelism() only exists from Node 18.14, and engines allows any 18.x
+const cores = os.availableParallelism?.() ?? os.cpus().length;
+
+const pool = new BcryptPool(
+    Number(process.env.BCRYPT_POOL_SIZE) || Math.max(1, Math.min(4, cores - 1)),
+    Number(process.env.BCRYPT_MAX_QUEUE) || 100
+);
+
+export function bcryptHash(password: string, saltRounds: number): Promise<string> {
+    return pool.run({ op: 'hash', args: [password, saltRounds] });
+}
+
+export function bcryptCompare(password: string, hashedPassword: string): Promise<boolean> {
+    return pool.run({ op: 'compare', args: [password, hashedPassword] });
+}
+
+// Queue depth and utilization, for health checks and metrics
+export function getBcryptPoolStats(): BcryptPoolStats {
+    return pool.stats();
+}
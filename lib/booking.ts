@@ -0,0 +1,182 @@
+import { randomUUID } from "crypto";
+import { transaction } from "./db";
+import { NewAppointmentInfo } from "./types";
+import { generateCancellationToken } from "./cancellation-token";
+import { invalidateAvailability } from "./availability";
+import { enqueueAppointmentNotice, scheduleOutboxDispatch } from "./push-outbox";
+
+// Partial unique index from database/add_unique_active_appointment_slot.sql
+export const ACTIVE_SLOT_CONSTRAINT = "uniq_appointments_active_slot";
+
+export interface BookedAppointment {
+    id: string;
+    patient_id: number;
+    patient_first_name: string;
+    patient_last_name: string;
+    phone_number: string;
+    appointment_date: Date;
+    appointment_time: string;
+    status: string;
+    visit_type_name: string | null;
+    consult_type_name: string | null;
+    practice_type_name: string | null;
+    health_insurance: string | null;
+    cancellation_token: string;
+    is_existing_patient: boolean;
+}
+
+export interface CancelledAppointment {
+    id: string;
+    patient_id: number;
+    appointment_date: Date;
+    appointment_time: string;
+    status: string;
+    [column: string]: any;
+}
+
+/**
+ * Allocate an appointment id client-side (appointments.id is a UUID primary key),
+ * so the cancellation token can embed it before the row is inserted
+ */
+export function newAppointmentId(): string {
+    return randomUUID();
+}
+
+// True when a booking lost the race for its slot to another active appointment.
+// Matched on pg's SQLSTATE and constraint fields, which unlike the message do not depend on locale.
+export function isSlotTakenError(error: unknown): boolean {
+    return (error as any)?.code === "23505" && (error as any)?.constraint === ACTIVE_SLOT_CONSTRAINT;
+}
+
+/**
+ * Book an appointment for a new or returning patient in a single transaction.
+ * The patient is upserted by phone number and double booking is rejected by
+ * the partial unique index on (appointment_date, appointment_time).
+ * @throws The pg unique violation when the slot is taken (see isSlotTakenError)
+ */
+export async function bookAppointment(appointment: NewAppointmentInfo): Promise<BookedAppointment> {
+    const booked = await transaction(async (client) => {
+        // Existing patients keep their stored name; xmax = 0 only for freshly inserted rows
+        const patientResult = await client.query(
+            `INSERT INTO patients (first_name, last_name, phone_number)
+             VALUES ($1, $2, $3)
+             ON CONFLICT (phone_number) DO UPDATE SET phone_number = EXCLUDED.phone_number
+             RETURNING id, (xmax = 0) AS inserted`,
+            [appointment.first_name, appointment.last_name, appointment.phone_number]
+        );
+        const patientId = patientResult.rows[0].id;
+
+        // The id is allocated here so the token is signed once, already bound to its appointment
+        const appointmentId = newAppointmentId();
+        const appointmentDate = new Date(appointment.appointment_date).toISOString().split('T')[0];
+        const cancellationToken = generateCancellationToken({
+            appointmentId,
+            patientId: patientId.toString(),
+            patientPhone: appointment.phone_number,
+            appointmentDate,
+            appointmentTime: appointment.appointment_time
+        });
+
+        // Insert and read back everything the confirmation needs in one statement
+        const bookedResult = await client.query(
+            `WITH inserted AS (
+                INSERT INTO appointments (
+                    id,
+                    patient_id,
+                    appointment_date,
+                    appointment_time,
+                    consult_type_id,
+                    visit_type_id,
+                    practice_type_id,
+                    health_insurance,
+                    status,
+                    cancellation_token
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, 'scheduled', $9)
+                RETURNING *
+            )
+            SELECT
+                a.id,
+                a.patient_id,
+                p.first_name AS patient_first_name,
+                p.last_name AS patient_last_name,
+                p.phone_number,
+                a.appointment_date,
+                a.appointment_time,
+                a.status,
+                vt.name AS visit_type_name,
+                ct.name AS consult_type_name,
+                pt.name AS practice_type_name,
+                a.health_insurance,
+                a.cancellation_token
+            FROM inserted a
+            JOIN patients p ON a.patient_id = p.id
+            LEFT JOIN visit_types vt ON a.visit_type_id = vt.id
+            LEFT JOIN consult_types ct ON a.consult_type_id = ct.id
+            LEFT JOIN practice_types pt ON a.practice_type_id = pt.id`,
+            [
+                appointmentId,
+                patientId,
+                appointment.appointment_date,
+                appointment.appointment_time,
+                appointment.consult_type_id || null,
+                appointment.visit_type_id,
+                appointment.practice_type_id ?? null,
+                appointment.health_insurance || null,
+                cancellationToken
+            ]
+        );
+
+        // Confirmation push for a returning patient's devices, committed with the booking;
+        // skipped when web push is not configured
+        await enqueueAppointmentNotice(client, 'confirmation', {
+            id: appointmentId,
+            patient_id: patientId,
+            date: appointmentDate,
+            time: appointment.appointment_time
+        });
+
+        return {
+            ...bookedResult.rows[0],
+            is_existing_patient: !patientResult.rows[0].inserted
+        } as BookedAppointment;
+    });
+
+    invalidateAvailability(appointment.appointment_date);
+    scheduleOutboxDispatch();
+    return booked;
+}
+
+/**
+ * Cancel an active appointment and queue the patient's push notice in the same
+ * transaction, then free its slot and kick the outbox dispatcher.
+ * @returns The cancelled row, or null when no active appointment has that id
+ */
+export async function cancelAppointmentWithNotice(id: string): Promise<CancelledAppointment | null> {
+    const cancelled = await transaction(async (client) => {
+        // appointment_time is TEXT 'HH:MM'; the notice shows it as stored
+        const result = await client.query(
+            `UPDATE appointments SET status = 'cancelled', updated_at = NOW()
+             WHERE id = $1 AND status <> 'cancelled'
+             RETURNING *, appointment_date::text AS notice_date, left(appointment_time::text, 5) AS notice_time`,
+            [id]
+        );
+        if (result.rows.length === 0) {
+            return null;
+        }
+
+        const { notice_date, notice_time, ...row } = result.rows[0];
+        await enqueueAppointmentNotice(client, 'cancellation', {
+            id: row.id,
+            patient_id: row.patient_id,
+            date: notice_date,
+            time: notice_time
+        });
+        return row as CancelledAppointment;
+    });
+
+    if (cancelled) {
+        invalidateAvailability(cancelled.appointment_date);
+        scheduleOutboxDispatch();
+    }
+    return cancelled;
+}
@@ -0,0 +1,23 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { tokensMatch } from './secure-compare';
+
+// Scheduled routes under /api/cron are called by an external cron service sending
+// Authorization: Bearer $CRON_SECRET. Returns the error response, or null when allowed.
+export function authorizeCronRequest(request: NextRequest): NextResponse | null {
+    const secret = process.env.CRON_SECRET;
+    if (!secret) {
+        return NextResponse.json(
+            { error: 'Scheduled jobs not configured. CRON_SECRET missing.' },
+            { status: 503 }
+        );
+    }
+
+    if (!tokensMatch(request.headers.get('authorization') ?? '', `Bearer ${secret}`)) {
+        return NextResponse.json(
+            { error: 'Unauthorized' },
+            { status: 401 }
+        );
+    }
+
+    return null;
+}
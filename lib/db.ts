@@ -1,4 +1,6 @@
-import { Pool } from "pg";
+import { performance } from "perf_hooks";
+import { Pool, PoolClient, QueryResult } from "pg";
+import { recordQuery } from "./query-metrics";
 
 // Validate required environment variables
 const requiredEnvVars = [
@@ -42,6 +44,9 @@ const getSSLConfig = () => {
     }
 };
 
+// Maximum number of clients in the pool
+const POOL_MAX = 20;
+
 const pool = new Pool({
     host: process.env.POSTGRESQL_HOST,
     port: Number(process.env.POSTGRESQL_PORT),
@@ -52,7 +57,7 @@ const pool = new Pool({
     // Add connection timeout and retry logic
     connectionTimeoutMillis: 10000,
     idleTimeoutMillis: 30000,
-    max: 20, // Maximum number of clients in the pool
+    max: POOL_MAX,
 });
 
 // Handle connection errors
@@ -61,19 +66,73 @@ pool.on('error', (err) => {
     process.exit(-1);
 });
 
-export async function query(text: string, params?: any[]) {
-    const start = Date.now();
+// Timings go to in-memory per-statement histograms (lib/query-metrics.ts) rather than a
+// log line per query; only slow statements are logged, and those are sampled
+async function timed<T extends QueryResult>(text: string, run: () => Promise<T>): Promise<T> {
+    const start = performance.now();
     try {
-        const res = await pool.query(text, params);
-        const duration = Date.now() - start;
-        console.log("executed query", { text, duration, rows: res.rowCount });
+        const res = await run();
+        recordQuery(text, performance.now() - start, res.rowCount);
         return res;
+    } catch (error) {
+        recordQuery(text, performance.now() - start, 0, error);
+        throw error;
+    }
+}
+
+export async function query(text: string, params?: any[]) {
+    try {
+        return await timed(text, () => pool.query(text, params));
     } catch (error) {
         console.error("Database query error:", error);
         throw error;
     }
 }
 
+export interface PoolStats {
+    total: number;
+    idle: number;
+    waiting: number;
+    max: number;
+}
+
+// Clients open, idle, and requests queued for one; waiting > 0 means the pool is saturated
+export function getPoolStats(): PoolStats {
+    return {
+        total: pool.totalCount,
+        idle: pool.idleCount,
+        waiting: pool.waitingCount,
+        max: POOL_MAX,
+    };
+}
+
+// Run callback inside BEGIN/COMMIT on a single pooled client, rolling back on any error.
+// Statements on the client are timed like query(); the client gets its own query back
+// before it returns to the pool.
+export async function transaction<T>(callback: (client: PoolClient) => Promise<T>): Promise<T> {
+    const client = await pool.connect();
+    const clientQuery = client.query;
+    const run = clientQuery.bind(client) as (config: any, values?: any) => Promise<QueryResult>;
+    client.query = ((config: any, values?: any) =>
+        timed(typeof config === "string" ? config : config.text, () => run(config, values))
+    ) as typeof client.query;
+    try {
+        await client.query("BEGIN");
+        const result = await callback(client);
+        await client.query("COMMIT");
+        return result;
+    } catch (error) {
+        await client.query("ROLLBACK").catch((rollbackError) => {
+            console.error("Transaction rollback error:", rollbackError);
+        });
+        console.error("Database transaction error:", error);
+        throw error;
+    } finally {
+        client.query = clientQuery;
+        client.release();
+    }
+}
+
 // SSL Configuration Notes:
 // 
 // Environment Variables:
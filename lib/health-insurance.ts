@@ -0,0 +1,78 @@
+import { readFile } from "fs/promises";
+import { watch } from "fs";
+import { join } from "path";
+import { CachedBody, createCachedBody } from "./http-cache";
+
+export interface HealthInsurance {
+    id: number;
+    name: string;
+    price: string | null;
+    price_numeric: number | null;
+    notes: string | null;
+    pricing: string | null;
+}
+
+const HEALTH_INSURANCE_FILE = join(process.cwd(), 'data', 'obras-sociales.json');
+
+// The normalized list is built once and rebuilt only after the file changes
+let cached: Promise<{ list: HealthInsurance[]; response: CachedBody }> | null = null;
+let watching = false;
+
+export function normalizeHealthInsurance(healthInsuranceData: any[]): HealthInsurance[] {
+    // Normalize the data structure - ensure consistent format
+    return healthInsuranceData.map((item: any, index: number) => ({
+        id: index + 1,
+        name: item.name,
+        price: item.price || null, // Keep as string or null (e.g., "$25.000" or null)
+        price_numeric: item.price ? parseFloat(item.price.replace(/[^0-9.]/g, '')) : null, // Extract numeric value for convenience
+        notes: item.notes || null,
+        pricing: item.price || null // Alias for backward compatibility
+    }));
+}
+
+async function load() {
+    const fileContent = await readFile(HEALTH_INSURANCE_FILE, 'utf-8');
+    const list = normalizeHealthInsurance(JSON.parse(fileContent));
+    return { list, response: createCachedBody(list) };
+}
+
+function watchForChanges() {
+    if (watching) {
+        return;
+    }
+    try {
+        const watcher = watch(HEALTH_INSURANCE_FILE, { persistent: false }, (eventType) => {
+            cached = null;
+            // Editors and deploys replace the file; watch the new one on next load
+            if (eventType === 'rename') {
+                watcher.close();
+                watching = false;
+            }
+        });
+        watching = true;
+    } catch (error) {
+        // Read-only or watcher-less deployments keep serving the first load
+        console.error("Could not watch health insurance data:", error);
+    }
+}
+
+async function getHealthInsurance() {
+    if (!cached) {
+        watchForChanges();
+        cached = load().catch((error) => {
+            // Do not cache failures; the next request retries the read
+            cached = null;
+            throw error;
+        });
+    }
+    return cached;
+}
+
+export async function getHealthInsuranceList(): Promise<HealthInsurance[]> {
+    return (await getHealthInsurance()).list;
+}
+
+// Serialized list and its ETag, ready to serve
+export async function getHealthInsuranceResponse(): Promise<CachedBody> {
+    return (await getHealthInsurance()).response;
+}
@@ -0,0 +1,46 @@
+import { createHash } from "crypto";
+import { NextRequest, NextResponse } from "next/server";
+
+// Conditional GET helpers for responses that are serialized once and served many times.
+
+export interface CachedBody {
+    body: string;
+    etag: string;
+}
+
+// Strong ETag over the exact bytes that will be sent
+export function createCachedBody(data: unknown): CachedBody {
+    const body = JSON.stringify(data);
+    const etag = `"${createHash("sha1").update(body).digest("base64url")}"`;
+    return { body, etag };
+}
+
+/**
+ * True when the request's If-None-Match already names this representation.
+ * Uses the weak comparison RFC 9110 requires for If-None-Match.
+ */
+export function isNotModified(request: NextRequest, etag: string): boolean {
+    const ifNoneMatch = request.headers.get("if-none-match");
+    if (!ifNoneMatch) {
+        return false;
+    }
+    if (ifNoneMatch.trim() === "*") {
+        return true;
+    }
+    const opaque = etag.replace(/^W\//, "");
+    return ifNoneMatch.split(",").some((candidate) => candidate.trim().replace(/^W\//, "") === opaque);
+}
+
+/**
+ * Serve a pre-serialized JSON body, or an empty 304 if the client already has it
+ */
+export function cachedJsonResponse(request: NextRequest, cached: CachedBody, cacheControl: string): NextResponse {
+    const headers = { ETag: cached.etag, "Cache-Control": cacheControl };
+    if (isNotModified(request, cached.etag)) {
+        return new NextResponse(null, { status: 304, headers });
+    }
+    return new NextResponse(cached.body, {
+        status: 200,
+        headers: { ...headers, "Content-Type": "application/json" }
+    });
+}
@@ -0,0 +1,86 @@
+import diagnosticsChannel from 'diagnostics_channel';
+import type { IncomingMessage, ServerResponse } from 'http';
+import { counter, histogram } from './prometheus';
+
+// Per-route latency and status counts for /api requests, taken from Node's built-in HTTP
+// server diagnostics channels. installHttpMetrics() runs once from instrumentation.ts, so
+// no route handler needs wrapping and responses from the framework itself (404s, thrown
+// errors) are counted too.
+
+export const HTTP_DURATION_BUCKETS_SECONDS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10];
+
+// Distinct route labels kept; paths beyond it (e.g. scans for random URLs) share one label
+const MAX_ROUTES = 200;
+const OVERFLOW_ROUTE = '(other)';
+
+const UUID_SEGMENT = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
+const NUMERIC_SEGMENT = /^\d+$/;
+const DATE_SEGMENT = /^\d{4}-\d{2}-\d{2}$/;
+
+const requestDuration = histogram(
+    'http_request_duration_seconds',
+    'Time from receiving an API request to finishing its response',
+    HTTP_DURATION_BUCKETS_SECONDS
+);
+const requestsTotal = counter('http_requests_total', 'API responses by route, method and status code');
+
+const knownRoutes = new Set<string>();
+const startTimes = new WeakMap<ServerResponse, bigint>();
+let installed = false;
+
+// Collapse ids and dates so /api/appointments/<uuid> is labelled /api/appointments/[id]
+export function normalizeRoutePath(path: string): string {
+    const pathname = path.split('?')[0].replace(/\/+$/, '') || '/';
+    const route = pathname
+        .split('/')
+        .map((segment) => {
+            if (UUID_SEGMENT.test(segment) || NUMERIC_SEGMENT.test(segment)) {
+                return '[id]';
+            }
+            return DATE_SEGMENT.test(segment) ? '[date]' : segment;
+        })
+        .join('/');
+
+    if (!knownRoutes.has(route)) {
+        if (knownRoutes.size >= MAX_ROUTES) {
+            return OVERFLOW_ROUTE;
+        }
+        knownRoutes.add(route);
+    }
+    return route;
+}
+
+export function recordHttpRequest(method: string, path: string, status: number, durationSeconds: number): void {
+    const route = normalizeRoutePath(path);
+    requestDuration.observe({ route, method }, durationSeconds);
+    requestsTotal.inc({ route, method, status: String(status) });
+}
+
+function isApiRequest(request: IncomingMessage): boolean {
+    return request.url === '/api' || Boolean(request.url?.startsWith('/api/'));
+}
+
+export function installHttpMetrics(): void {
+    if (installed) {
+        return;
+    }
+    installed = true;
+
+    diagnosticsChannel.subscribe('http.server.request.start', (message) => {
+        const { request, response } = message as { request: IncomingMessage; response: ServerResponse };
+        if (isApiRequest(request)) {
+            startTimes.set(response, process.hrtime.bigint());
+        }
+    });
+
+    diagnosticsChannel.subscribe('http.server.response.finish', (message) => {
+        const { request, response } = message as { request: IncomingMessage; response: ServerResponse };
+        const start = startTimes.get(response);
+        if (start === undefined) {
+            return;
+        }
+        startTimes.delete(response);
+        const durationSeconds = Number(process.hrtime.bigint() - start) / 1e9;
+        recordHttpRequest(request.method || 'GET', request.url || '/', response.statusCode, durationSeconds);
+    });
+}
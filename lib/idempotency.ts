@@ -0,0 +1,166 @@
+import { createHash } from "crypto";
+import { NextResponse } from "next/server";
+import { query } from "./db";
+
+// Idempotency-Key support backed by the idempotency_keys table
+// (database/create_idempotency_keys_table.sql, database/add_lease_to_idempotency_keys.sql).
+
+export const IDEMPOTENCY_HEADER = "Idempotency-Key";
+
+const IDEMPOTENCY_KEY_TTL_HOURS = 24;
+// How long a claim holds the key before a retry may take it over, e.g. after a crash
+const IDEMPOTENCY_LEASE_SECONDS = 30;
+const MAX_KEY_LENGTH = 255;
+
+// Expired keys are swept opportunistically, at most once per interval and in bounded batches
+const SWEEP_INTERVAL_MS = 10 * 60 * 1000;
+const SWEEP_BATCH_SIZE = 1000;
+let lastSweepAt = 0;
+
+export function isValidIdempotencyKey(key: string): boolean {
+    return key.length > 0 && key.length <= MAX_KEY_LENGTH && /^[\x21-\x7e]+$/.test(key);
+}
+
+export function hashRequestBody(body: string): string {
+    return createHash("sha256").update(body).digest("hex");
+}
+
+export async function sweepExpiredIdempotencyKeys(): Promise<number> {
+    const result = await query(
+        `DELETE FROM idempotency_keys
+         WHERE key IN (
+             SELECT key FROM idempotency_keys WHERE expires_at < NOW() LIMIT $1
+         )`,
+        [SWEEP_BATCH_SIZE]
+    );
+    return result.rowCount ?? 0;
+}
+
+function maybeSweep(): void {
+    const now = Date.now();
+    if (now - lastSweepAt < SWEEP_INTERVAL_MS) {
+        return;
+    }
+    lastSweepAt = now;
+    sweepExpiredIdempotencyKeys().catch((error) => {
+        console.error("Idempotency key sweep error:", error);
+    });
+}
+
+/**
+ * Run handler at most once per idempotency key.
+ *
+ * The first request claims the key and stores its response; retries with the same
+ * key and body replay that response without running the handler. A claim is a short
+ * lease: if the response is never stored (the process died), a retry takes the key over
+ * once the lease lapses. Only the holder of the current lease may store or release the
+ * key, so a request whose lease was taken over cannot overwrite the retry's outcome.
+ * Stored responses are kept for IDEMPOTENCY_KEY_TTL_HOURS. 5xx responses and thrown
+ * errors release the key so the client can retry.
+ */
+export async function withIdempotency(
+    key: string,
+    requestHash: string,
+    handler: () => Promise<NextResponse>
+): Promise<NextResponse> {
+    maybeSweep();
+
+    const claim = await query(
+        `INSERT INTO idempotency_keys (key, request_hash, locked_until, expires_at)
+         VALUES ($1, $2, NOW() + make_interval(secs => $3), NOW() + make_interval(secs => $3))
+         ON CONFLICT (key) DO UPDATE SET
+             request_hash = EXCLUDED.request_hash,
+             status_code = NULL,
+             response = NULL,
+             created_at = NOW(),
+             locked_until = EXCLUDED.locked_until,
+             expires_at = EXCLUDED.expires_at
+         WHERE idempotency_keys.expires_at < NOW()
+            OR (idempotency_keys.status_code IS NULL AND idempotency_keys.locked_until < NOW())
+         RETURNING locked_until::text AS lease`,
+        [key, requestHash, IDEMPOTENCY_LEASE_SECONDS]
+    );
+
+    if (claim.rows.length === 0) {
+        const existing = await query(
+            "SELECT request_hash, status_code, response FROM idempotency_keys WHERE key = $1",
+            [key]
+        );
+        const stored = existing.rows[0];
+
+        if (!stored) {
+            // Swept between the claim and the lookup
+            return NextResponse.json({ error: "Idempotency key expired, please retry" }, { status: 409 });
+        }
+        if (stored.request_hash !== requestHash) {
+            return NextResponse.json(
+                { error: "Idempotency key was already used with a different request" },
+                { status: 422 }
+            );
+        }
+        if (stored.status_code === null) {
+            return NextResponse.json(
+                { error: "A request with this idempotency key is still in progress" },
+                { status: 409, headers: { "Retry-After": "1" } }
+            );
+        }
+        return NextResponse.json(stored.response, {
+            status: stored.status_code,
+            headers: { "Idempotent-Replayed": "true" }
+        });
+    }
+
+    // Identifies this claim; read back as text so it compares exactly, microseconds included
+    const claimed: IdempotencyClaim = { key, requestHash, lease: claim.rows[0].lease };
+
+    let response: NextResponse;
+    try {
+        response = await handler();
+    } catch (error) {
+        await releaseIdempotencyKey(claimed);
+        throw error;
+    }
+
+    if (response.status >= 500) {
+        await releaseIdempotencyKey(claimed);
+        return response;
+    }
+
+    try {
+        const body = await response.clone().json();
+        const stored = await query(
+            `UPDATE idempotency_keys
+             SET status_code = $1, response = $2, locked_until = NULL,
+                 expires_at = NOW() + make_interval(hours => $4)
+             WHERE key = $3 AND request_hash = $5 AND status_code IS NULL AND locked_until = $6::timestamptz`,
+            [response.status, JSON.stringify(body), key, IDEMPOTENCY_KEY_TTL_HOURS, requestHash, claimed.lease]
+        );
+        if (stored.rowCount === 0) {
+            // The lease lapsed and a retry took the key over; its outcome is the one kept
+            console.warn(`Idempotency key ${key} was taken over before its response was stored`);
+        }
+    } catch (error) {
+        // The booking already happened; a failed store only costs replay protection
+        console.error("Error storing idempotent response:", error);
+        await releaseIdempotencyKey(claimed);
+    }
+    return response;
+}
+
+interface IdempotencyClaim {
+    key: string;
+    requestHash: string;
+    lease: string;
+}
+
+async function releaseIdempotencyKey({ key, requestHash, lease }: IdempotencyClaim): Promise<void> {
+    try {
+        await query(
+            `DELETE FROM idempotency_keys
+             WHERE key = $1 AND request_hash = $2 AND status_code IS NULL AND locked_until = $3::timestamptz`,
+            [key, requestHash, lease]
+        );
+    } catch (error) {
+        console.error("Error releasing idempotency key:", error);
+    }
+}
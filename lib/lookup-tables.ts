@@ -0,0 +1,115 @@
+import { query } from "./db";
+
+// In-process cache of the small reference tables used by the booking flow.
+// All three are loaded in one statement. The app never writes these tables (they are
+// edited by migrations or directly in the database), so the TTL is the only invalidation:
+// an edit shows up within LOOKUP_TABLES_TTL_MS, or sooner when a lookup misses.
+
+export interface LookupRow {
+    id: number;
+    name: string;
+    [column: string]: any;
+}
+
+export interface LookupTables {
+    visit_types: LookupRow[];
+    consult_types: LookupRow[];
+    practice_types: LookupRow[];
+}
+
+export type LookupTableName = keyof LookupTables;
+
+interface LookupIndex {
+    byId: Map<number, LookupRow>;
+    byName: Map<string, LookupRow>;
+}
+
+interface LoadedLookupTables {
+    tables: LookupTables;
+    index: Record<LookupTableName, LookupIndex>;
+}
+
+const LOOKUP_TABLES_TTL_MS = 5 * 60 * 1000;
+// A lookup miss may mean a row was added since the last load; reload at most this often
+const MISS_REFRESH_INTERVAL_MS = 30 * 1000;
+
+let cached: { loaded: Promise<LoadedLookupTables>; expiresAt: number; loadedAt: number } | null = null;
+
+const lookupTablesSQL = `
+    SELECT
+        (SELECT COALESCE(json_agg(vt ORDER BY vt.name), '[]') FROM visit_types vt) AS visit_types,
+        (SELECT COALESCE(json_agg(ct ORDER BY ct.name), '[]') FROM consult_types ct) AS consult_types,
+        (SELECT COALESCE(json_agg(pt ORDER BY pt.name), '[]') FROM practice_types pt) AS practice_types
+`;
+
+function indexRows(rows: LookupRow[]): LookupIndex {
+    return {
+        byId: new Map(rows.map((row) => [Number(row.id), row])),
+        byName: new Map(rows.map((row) => [row.name, row]))
+    };
+}
+
+async function loadLookupTables(): Promise<LoadedLookupTables> {
+    const result = await query(lookupTablesSQL);
+    const row = result.rows[0];
+    const tables: LookupTables = {
+        visit_types: row.visit_types,
+        consult_types: row.consult_types,
+        practice_types: row.practice_types
+    };
+    return {
+        tables,
+        index: {
+            visit_types: indexRows(tables.visit_types),
+            consult_types: indexRows(tables.consult_types),
+            practice_types: indexRows(tables.practice_types)
+        }
+    };
+}
+
+// Concurrent callers share a single in-flight load
+function getLoadedLookupTables(): Promise<LoadedLookupTables> {
+    if (!cached || cached.expiresAt <= Date.now()) {
+        const now = Date.now();
+        const entry = {
+            loaded: loadLookupTables(),
+            expiresAt: now + LOOKUP_TABLES_TTL_MS,
+            loadedAt: now
+        };
+        cached = entry;
+        entry.loaded.catch(() => {
+            // Do not cache failures; the next call retries the query
+            if (cached === entry) {
+                cached = null;
+            }
+        });
+    }
+    return cached.loaded;
+}
+
+/**
+ * Visit, consult and practice types, each ordered by name
+ */
+export async function getLookupTables(): Promise<LookupTables> {
+    return (await getLoadedLookupTables()).tables;
+}
+
+async function findLookup(table: LookupTableName, find: (index: LookupIndex) => LookupRow | undefined): Promise<LookupRow | undefined> {
+    const row = find((await getLoadedLookupTables()).index[table]);
+    if (row || !cached || Date.now() - cached.loadedAt < MISS_REFRESH_INTERVAL_MS) {
+        return row;
+    }
+    cached = null;
+    return find((await getLoadedLookupTables()).index[table]);
+}
+
+export function findLookupById(table: LookupTableName, id: number | string | null | undefined): Promise<LookupRow | undefined> {
+    if (id === null || id === undefined || id === '' || isNaN(Number(id))) {
+        return Promise.resolve(undefined);
+    }
+    return findLookup(table, (index) => index.byId.get(Number(id)));
+}
+
+export function findLookupByName(table: LookupTableName, name: string): Promise<LookupRow | undefined> {
+    return findLookup(table, (index) => index.byName.get(name));
+}
@@ -0,0 +1,60 @@
+// Small in-process LRU cache with optional per-entry TTL.
+// Relies on Map preserving insertion order: the first key is the least recently used.
+
+interface CacheEntry<V> {
+    value: V;
+    expiresAt: number;
+}
+
+export class LRUCache<K, V> {
+    private entries = new Map<K, CacheEntry<V>>();
+
+    constructor(private maxEntries: number, private ttlMs: number = Infinity) {
+        if (maxEntries < 1) {
+            throw new Error('LRUCache maxEntries must be at least 1');
+        }
+    }
+
+    get(key: K): V | undefined {
+        const entry = this.entries.get(key);
+        if (!entry) {
+            return undefined;
+        }
+
+        if (entry.expiresAt <= Date.now()) {
+            this.entries.delete(key);
+            return undefined;
+        }
+
+        // Move to the most recently used position
+        this.entries.delete(key);
+        this.entries.set(key, entry);
+        return entry.value;
+    }
+
+    set(key: K, value: V, ttlMs: number = this.ttlMs): void {
+        this.entries.delete(key);
+        this.entries.set(key, { value, expiresAt: Date.now() + ttlMs });
+
+        while (this.entries.size > this.maxEntries) {
+            const oldestKey = this.entries.keys().next().value as K;
+            this.entries.delete(oldestKey);
+        }
+    }
+
+    has(key: K): boolean {
+        return this.get(key) !== undefined;
+    }
+
+    delete(key: K): boolean {
+        return this.entries.delete(key);
+    }
+
+    clear(): void {
+        this.entries.clear();
+    }
+
+    get size(): number {
+        return this.entries.size;
+    }
+}
@@ -0,0 +1,160 @@
+import nodemailer, { SendMailOptions, Transporter } from 'nodemailer';
+
+// Outgoing mail. Messages are queued in memory and drained in the background over a pooled
+// SMTP transport, so a request that sends mail only pays for enqueueing it. Failed sends are
+// retried with exponential backoff. SMTP_HOST/SMTP_PORT point the transport at another
+// server, e.g. a local SMTP stand-in in tests or development; otherwise Gmail is used.
+
+export interface MailQueueStats {
+    queued: number;
+    inFlight: number;
+    retrying: number;
+    sent: number;
+    retried: number;
+    failed: number;
+}
+
+interface QueuedMail {
+    message: SendMailOptions;
+    attempts: number;
+}
+
+// Pooled connections, and so the number of messages sent concurrently
+const MAX_CONNECTIONS = 3;
+const MAX_QUEUE_LENGTH = 1000;
+const MAX_ATTEMPTS = 4;
+const RETRY_BASE_MS = 2000;
+
+let transport: Transporter | null = null;
+const queue: QueuedMail[] = [];
+let inFlight = 0;
+let retrying = 0;
+const totals = { sent: 0, retried: 0, failed: 0 };
+let idleWaiters: Array<() => void> = [];
+
+export function isMailConfigured(): boolean {
+    return Boolean(process.env.SMTP_HOST || (process.env.EMAIL_USER && process.env.EMAIL_PASS));
+}
+
+export function getMailSender(): string {
+    return process.env.EMAIL_FROM || process.env.EMAIL_USER || 'no-reply@localhost';
+}
+
+function createTransport(): Transporter {
+    const auth = process.env.EMAIL_USER && process.env.EMAIL_PASS
+        ? { user: process.env.EMAIL_USER, pass: process.env.EMAIL_PASS }
+        : undefined;
+
+    if (process.env.SMTP_HOST) {
+        const secure = process.env.SMTP_SECURE === 'true';
+        return nodemailer.createTransport({
+            pool: true,
+            maxConnections: MAX_CONNECTIONS,
+            host: process.env.SMTP_HOST,
+            port: Number(process.env.SMTP_PORT) || (secure ? 465 : 587),
+            secure,
+            auth
+        });
+    }
+
+    return nodemailer.createTransport({
+        pool: true,
+        maxConnections: MAX_CONNECTIONS,
+        service: 'gmail',
+        auth,
+        secure: true,
+        port: 465,
+    });
+}
+
+// Created on first send rather than at import
+function getTransport(): Transporter {
+    if (!transport) {
+        transport = createTransport();
+    }
+    return transport;
+}
+
+// Close pooled connections; the next send opens a fresh transport (e.g. after env changes)
+export function resetMailTransport(): void {
+    transport?.close();
+    transport = null;
+}
+
+function notifyIfIdle(): void {
+    if (queue.length === 0 && inFlight === 0 && retrying === 0) {
+        const waiters = idleWaiters;
+        idleWaiters = [];
+        waiters.forEach((resolve) => resolve());
+    }
+}
+
+function scheduleRetry(item: QueuedMail): void {
+    retrying++;
+    totals.retried++;
+    const timer = setTimeout(() => {
+        retrying--;
+        queue.push(item);
+        drain();
+    }, RETRY_BASE_MS * 2 ** (item.attempts - 1));
+    timer.unref?.();
+}
+
+async function deliver(item: QueuedMail): Promise<void> {
+    try {
+        await getTransport().sendMail(item.message);
+        totals.sent++;
+    } catch (error) {
+        item.attempts++;
+        if (item.attempts >= MAX_ATTEMPTS) {
+            totals.failed++;
+            console.error(`Giving up on email to ${item.message.to} after ${item.attempts} attempts:`, error);
+        } else {
+            console.error(`Error sending email to ${item.message.to}, retrying:`, error);
+            scheduleRetry(item);
+        }
+    }
+}
+
+function drain(): void {
+    while (inFlight < MAX_CONNECTIONS && queue.length > 0) {
+        const item = queue.shift() as QueuedMail;
+        inFlight++;
+        deliver(item).finally(() => {
+            inFlight--;
+            drain();
+            notifyIfIdle();
+        });
+    }
+}
+
+/**
+ * Queue a message for background delivery. Returns false when mail is not configured
+ * or the queue is full; delivery failures after that are only logged.
+ */
+export function enqueueMail(message: SendMailOptions): boolean {
+    if (!isMailConfigured()) {
+        console.error('Email configuration missing. Set EMAIL_USER and EMAIL_PASS, or SMTP_HOST.');
+        return false;
+    }
+    if (queue.length >= MAX_QUEUE_LENGTH) {
+        console.error('Email queue is full, dropping message to', message.to);
+        return false;
+    }
+
+    queue.push({ message: { from: getMailSender(), ...message }, attempts: 0 });
+    drain();
+    return true;
+}
+
+// Resolves once every queued message has been sent or given up on, retries included
+export function flushMailQueue(): Promise<void> {
+    return new Promise((resolve) => {
+        idleWaiters.push(resolve);
+        notifyIfIdle();
+    });
+}
+
+export function getMailQueueStats(): MailQueueStats {
+    return { queued: queue.length, inFlight, retrying, ...totals };
+}
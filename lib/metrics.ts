@@ -0,0 +1,101 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { getBcryptPoolStats } from './bcrypt-pool';
+import { getPoolStats } from './db';
+import { getMailQueueStats } from './mailer';
+import {
+    formatGauge,
+    formatHeader,
+    formatHistogramSeries,
+    formatSample,
+    renderRegistry
+} from './prometheus';
+import { getQueryHistograms, QUERY_DURATION_BUCKETS_MS } from './query-metrics';
+import { memoryRateLimitStore } from './rate-limit';
+import { tokensMatch } from './secure-compare';
+
+// Everything /api/metrics exports. Counters and histograms updated as events happen
+// (HTTP requests, push deliveries) come from the registry in lib/prometheus.ts; pool,
+// queue and limiter state is read when scraped.
+
+const QUERY_DURATION_BUCKETS_SECONDS = QUERY_DURATION_BUCKETS_MS.map((ms) => ms / 1000);
+
+function renderDatabaseMetrics(): string {
+    const pool = getPoolStats();
+    let text = formatGauge('pg_pool_clients', 'Clients in the Postgres pool by state', [
+        [{ state: 'total' }, pool.total],
+        [{ state: 'idle' }, pool.idle]
+    ]);
+    text += formatGauge('pg_pool_waiting_requests', 'Queries waiting for a pooled client', [[{}, pool.waiting]]);
+    text += formatGauge('pg_pool_max_clients', 'Configured pool size', [[{}, pool.max]]);
+
+    // Labelled by a short id of the statement; /api/admin/query-metrics maps ids to SQL
+    const queries = getQueryHistograms();
+    text += formatHeader('db_query_duration_seconds', 'Query latency by normalized statement', 'histogram');
+    for (const { id, totalMs, buckets } of queries) {
+        text += formatHistogramSeries('db_query_duration_seconds', { query_id: id }, QUERY_DURATION_BUCKETS_SECONDS, buckets, totalMs / 1000);
+    }
+    text += formatHeader('db_query_errors_total', 'Failed queries by normalized statement', 'counter');
+    for (const { id, errors } of queries) {
+        text += formatSample('db_query_errors_total', { query_id: id }, errors);
+    }
+    return text;
+}
+
+function renderQueueMetrics(): string {
+    const bcrypt = getBcryptPoolStats();
+    let text = formatGauge('bcrypt_pool_workers', 'Password hashing workers by state', [
+        [{ state: 'busy' }, bcrypt.busy],
+        [{ state: 'spawned' }, bcrypt.size]
+    ]);
+    text += formatGauge('bcrypt_pool_queue_depth', 'Password hashing jobs waiting for a worker', [[{}, bcrypt.queueDepth]]);
+    text += formatHeader('bcrypt_pool_jobs_total', 'Password hashing jobs by outcome', 'counter');
+    text += formatSample('bcrypt_pool_jobs_total', { result: 'completed' }, bcrypt.completed);
+    text += formatSample('bcrypt_pool_jobs_total', { result: 'rejected' }, bcrypt.rejected);
+
+    const mail = getMailQueueStats();
+    text += formatGauge('mail_queue_messages', 'Outgoing mail by state', [
+        [{ state: 'queued' }, mail.queued],
+        [{ state: 'in_flight' }, mail.inFlight],
+        [{ state: 'retrying' }, mail.retrying]
+    ]);
+    text += formatHeader('mail_messages_total', 'Outgoing mail by outcome', 'counter');
+    text += formatSample('mail_messages_total', { result: 'sent' }, mail.sent);
+    text += formatSample('mail_messages_total', { result: 'retried' }, mail.retried);
+    text += formatSample('mail_messages_total', { result: 'failed' }, mail.failed);
+    return text;
+}
+
+function renderRateLimitMetrics(): string {
+    // The middleware's limiter runs in the Edge runtime and is not visible from here;
+    // its rejections show up as status="429" in http_requests_total
+    return formatGauge('rate_limiter_keys', 'Identifiers tracked by the in-process rate limiter', [
+        [{ limiter: 'memory' }, memoryRateLimitStore.size]
+    ]);
+}
+
+export function renderMetrics(): string {
+    return renderRegistry()
+        + renderDatabaseMetrics()
+        + renderQueueMetrics()
+        + renderRateLimitMetrics();
+}
+
+// Scrapers send Authorization: Bearer $METRICS_TOKEN. Returns the error response, or null when allowed.
+export function authorizeMetricsRequest(request: NextRequest): NextResponse | null {
+    const token = process.env.METRICS_TOKEN;
+    if (!token) {
+        return NextResponse.json(
+            { error: 'Metrics not configured. METRICS_TOKEN missing.' },
+            { status: 503 }
+        );
+    }
+
+    if (!tokensMatch(request.headers.get('authorization') ?? '', `Bearer ${token}`)) {
+        return NextResponse.json(
+            { error: 'Unauthorized' },
+            { status: 401 }
+        );
+    }
+
+    return null;
+}
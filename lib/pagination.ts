@@ -0,0 +1,66 @@
+// Keyset (cursor) pagination helpers shared by the list endpoints.
+// A cursor is the opaque base64url encoding of the sort key of the last row returned.
+
+export const DEFAULT_PAGE_SIZE = 50;
+export const MAX_PAGE_SIZE = 200;
+
+export function encodeCursor(values: Array<string | number>): string {
+    return Buffer.from(JSON.stringify(values)).toString("base64url");
+}
+
+// Checks one cursor value before it is bound as a query parameter
+export type CursorField = (value: unknown) => boolean;
+
+export const cursorDate: CursorField = (value) =>
+    typeof value === "string" && /^\d{4}-\d{2}-\d{2}$/.test(value) && !Number.isNaN(Date.parse(value));
+
+export const cursorTime: CursorField = (value) =>
+    typeof value === "string" && /^([01]\d|2[0-3]):[0-5]\d(:[0-5]\d)?$/.test(value);
+
+export const cursorUuid: CursorField = (value) =>
+    typeof value === "string" && /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i.test(value);
+
+export const cursorId: CursorField = (value) =>
+    typeof value === "number" && Number.isSafeInteger(value) && value > 0;
+
+export const cursorText: CursorField = (value) =>
+    typeof value === "string" && value.length <= 255;
+
+/**
+ * Decode a cursor produced by encodeCursor, checking each value against its field
+ * @returns The sort key values, or null if the cursor is malformed, has the wrong arity
+ *          or a value that does not fit its column (so it never reaches Postgres)
+ */
+export function decodeCursor(cursor: string, fields: CursorField[]): Array<string | number> | null {
+    try {
+        const values = JSON.parse(Buffer.from(cursor, "base64url").toString("utf8"));
+        if (!Array.isArray(values) || values.length !== fields.length) {
+            return null;
+        }
+        if (!values.every((value, i) => fields[i](value))) {
+            return null;
+        }
+        return values;
+    } catch {
+        return null;
+    }
+}
+
+/**
+ * Parse the `limit` query parameter
+ * @returns The page size, or null if the value is not a positive integer
+ */
+export function parsePageSize(limit: string | null): number | null {
+    if (limit === null) {
+        return DEFAULT_PAGE_SIZE;
+    }
+    if (!/^\d+$/.test(limit) || Number(limit) < 1) {
+        return null;
+    }
+    return Math.min(Number(limit), MAX_PAGE_SIZE);
+}
+
+// `count=true` (or 1) opts into the extra COUNT(*) query
+export function wantsCount(value: string | null): boolean {
+    return value === "true" || value === "1";
+}
@@ -0,0 +1,157 @@
+// Minimal Prometheus metric primitives and text exposition format
+// (https://prometheus.io/docs/instrumenting/exposition_formats/).
+// Metrics live in a registry on globalThis: Next.js may load a module once for
+// instrumentation.ts and again for route handlers, and both must update the same series.
+
+export type Labels = Record<string, string>;
+
+interface Metric {
+    render(): string;
+    reset(): void;
+}
+
+function registry(): Map<string, Metric> {
+    const globals = globalThis as typeof globalThis & { __metricsRegistry?: Map<string, Metric> };
+    if (!globals.__metricsRegistry) {
+        globals.__metricsRegistry = new Map();
+    }
+    return globals.__metricsRegistry;
+}
+
+function escapeLabelValue(value: string): string {
+    return value.replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n');
+}
+
+export function formatLabels(labels: Labels): string {
+    const pairs = Object.entries(labels).map(([name, value]) => `${name}="${escapeLabelValue(value)}"`);
+    return pairs.length > 0 ? `{${pairs.join(',')}}` : '';
+}
+
+function formatValue(value: number): string {
+    if (value === Infinity) {
+        return '+Inf';
+    }
+    return Number.isFinite(value) ? String(value) : 'NaN';
+}
+
+export function formatHeader(name: string, help: string, type: 'counter' | 'gauge' | 'histogram'): string {
+    return `# HELP ${name} ${help}\n# TYPE ${name} ${type}\n`;
+}
+
+export function formatSample(name: string, labels: Labels, value: number): string {
+    return `${name}${formatLabels(labels)} ${formatValue(value)}\n`;
+}
+
+// A gauge read at scrape time, e.g. from a pool's stats()
+export function formatGauge(name: string, help: string, samples: Array<[Labels, number]>): string {
+    return formatHeader(name, help, 'gauge')
+        + samples.map(([labels, value]) => formatSample(name, labels, value)).join('');
+}
+
+/**
+ * Histogram samples from per-bucket (non-cumulative) counts; `buckets` has one more
+ * entry than `bounds`, the overflow.
+ */
+export function formatHistogramSeries(name: string, labels: Labels, bounds: number[], buckets: number[], sum: number): string {
+    let cumulative = 0;
+    let text = '';
+    bounds.forEach((bound, i) => {
+        cumulative += buckets[i];
+        text += formatSample(`${name}_bucket`, { ...labels, le: String(bound) }, cumulative);
+    });
+    cumulative += buckets[bounds.length];
+    text += formatSample(`${name}_bucket`, { ...labels, le: '+Inf' }, cumulative);
+    text += formatSample(`${name}_sum`, labels, sum);
+    text += formatSample(`${name}_count`, labels, cumulative);
+    return text;
+}
+
+function seriesKey(labels: Labels): string {
+    return JSON.stringify(labels);
+}
+
+export class Counter implements Metric {
+    private series = new Map<string, { labels: Labels; value: number }>();
+
+    constructor(readonly name: string, readonly help: string) {}
+
+    inc(labels: Labels = {}, amount: number = 1): void {
+        const key = seriesKey(labels);
+        const entry = this.series.get(key);
+        if (entry) {
+            entry.value += amount;
+        } else {
+            this.series.set(key, { labels, value: amount });
+        }
+    }
+
+    render(): string {
+        return formatHeader(this.name, this.help, 'counter')
+            + Array.from(this.series.values(), ({ labels, value }) => formatSample(this.name, labels, value)).join('');
+    }
+
+    reset(): void {
+        this.series.clear();
+    }
+}
+
+export class Histogram implements Metric {
+    private series = new Map<string, { labels: Labels; buckets: number[]; sum: number }>();
+
+    constructor(readonly name: string, readonly help: string, readonly bounds: number[]) {}
+
+    observe(labels: Labels, value: number): void {
+        const key = seriesKey(labels);
+        let entry = this.series.get(key);
+        if (!entry) {
+            entry = { labels, buckets: new Array(this.bounds.length + 1).fill(0), sum: 0 };
+            this.series.set(key, entry);
+        }
+        let index = this.bounds.findIndex((bound) => value <= bound);
+        if (index === -1) {
+            index = this.bounds.length;
+        }
+        entry.buckets[index]++;
+        entry.sum += value;
+    }
+
+    render(): string {
+        return formatHeader(this.name, this.help, 'histogram')
+            + Array.from(this.series.values(), ({ labels, buckets, sum }) =>
+                formatHistogramSeries(this.name, labels, this.bounds, buckets, sum)).join('');
+    }
+
+    reset(): void {
+        this.series.clear();
+    }
+}
+
+// Get-or-create, so every module instance shares one series per name
+export function counter(name: string, help: string): Counter {
+    const existing = registry().get(name);
+    if (existing) {
+        return existing as Counter;
+    }
+    const created = new Counter(name, help);
+    registry().set(name, created);
+    return created;
+}
+
+export function histogram(name: string, help: string, bounds: number[]): Histogram {
+    const existing = registry().get(name);
+    if (existing) {
+        return existing as Histogram;
+    }
+    const created = new Histogram(name, help, bounds);
+    registry().set(name, created);
+    return created;
+}
+
+export function renderRegistry(): string {
+    return Array.from(registry().values(), (metric) => metric.render()).join('');
+}
+
+// Zero every registered metric; for tests
+export function resetRegistry(): void {
+    registry().forEach((metric) => metric.reset());
+}
@@ -52,8 +52,9 @@ class PushNotificationService {
     return permission;
   }
 
-  // Subscribe to push notifications
-  async subscribe(): Promise<PushSubscription | null> {
+  // Subscribe to push notifications. Passing the cancellation token of a booking links
+  // this device to that patient so it receives their appointment reminders.
+  async subscribe(cancellationToken?: string): Promise<PushSubscription | null> {
     if (!this.registration) {
       console.error('Service worker not ready');
       return null;
@@ -66,7 +67,7 @@ class PushNotificationService {
       });
 
       // Send subscription to server
-      await this.sendSubscriptionToServer(subscription);
+      await this.sendSubscriptionToServer(subscription, cancellationToken);
       
       return subscription;
     } catch (error) {
@@ -227,7 +228,7 @@ class PushNotificationService {
   }
 
   // Send subscription to server
-  private async sendSubscriptionToServer(subscription: PushSubscription): Promise<void> {
+  private async sendSubscriptionToServer(subscription: PushSubscription, cancellationToken?: string): Promise<void> {
     try {
       const response = await fetch('/api/push/subscribe', {
         method: 'POST',
@@ -237,7 +238,8 @@ class PushNotificationService {
         body: JSON.stringify({
           subscription: subscription.toJSON(),
           userAgent: navigator.userAgent,
-          timestamp: new Date().toISOString()
+          timestamp: new Date().toISOString(),
+          cancellationToken
         })
       });
 
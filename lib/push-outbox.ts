@@ -0,0 +1,319 @@
+import { PoolClient } from 'pg';
+import { query } from './db';
+import {
+    buildNotificationPayload,
+    configureWebPush,
+    deactivateSubscriptions,
+    isExpiredSubscription,
+    NotificationContent,
+    pushDeliveries,
+    sendPush,
+    SubscriptionFilter
+} from './push-sender';
+
+// Transactional outbox for push notifications (database/create_push_outbox_table.sql).
+// Events write one push_outbox row per target endpoint inside their own transaction, so a
+// notification exists if and only if the booking or cancellation committed. A dispatcher
+// drains the table afterwards: failed sends back off exponentially, an endpoint that keeps
+// failing exhausts its failure budget and is deactivated, and undeliverable rows are kept
+// as status 'dead' for inspection.
+
+export interface OutboxDispatchSummary {
+    sent: number;
+    retried: number;
+    dead: number;
+}
+
+export interface OutboxDispatchOptions {
+    batchSize?: number;
+    maxBatches?: number;
+}
+
+export interface AppointmentNotice {
+    id: string;
+    patient_id: number;
+    // YYYY-MM-DD and HH:MM, as shown to the patient
+    date: string;
+    time: string;
+}
+
+interface ClaimedDelivery {
+    id: number;
+    endpoint: string;
+    payload: string;
+    attempts: number;
+    subscription_id: number | null;
+    p256dh_key: string | null;
+    auth_key: string | null;
+    active: boolean | null;
+}
+
+const DEFAULT_BATCH_SIZE = Number(process.env.PUSH_CONCURRENCY) || 20;
+const DEFAULT_MAX_BATCHES = 50;
+// A claimed row not settled within this window is claimed again
+const CLAIM_TIMEOUT_SECONDS = 2 * 60;
+const MAX_ATTEMPTS = 8;
+const RETRY_BASE_SECONDS = 30;
+const RETRY_MAX_SECONDS = 6 * 60 * 60;
+// Consecutive failures, across all messages, before an endpoint is deactivated
+const ENDPOINT_FAILURE_BUDGET = Number(process.env.PUSH_ENDPOINT_FAILURE_BUDGET) || 10;
+
+// Delivered rows are swept opportunistically, at most once per interval and in bounded batches
+const SWEEP_INTERVAL_MS = 10 * 60 * 1000;
+const SWEEP_BATCH_SIZE = 1000;
+const SENT_RETENTION_DAYS = 7;
+
+let lastSweepAt = 0;
+
+// Queue one payload for the matching active subscriptions; pass the event's client to
+// enqueue atomically with it
+export async function enqueueNotification(
+    filter: SubscriptionFilter,
+    content: NotificationContent,
+    client?: PoolClient
+): Promise<number> {
+    const params: any[] = [buildNotificationPayload(content)];
+    let patientClause = '';
+    if (filter.patientId !== undefined) {
+        params.push(filter.patientId);
+        patientClause = 'AND patient_id = $2';
+    }
+
+    const sql = `INSERT INTO push_outbox (endpoint, payload)
+                 SELECT endpoint, $1 FROM push_subscriptions
+                 WHERE active = true ${patientClause}`;
+    const result = client ? await client.query(sql, params) : await query(sql, params);
+    return result.rowCount ?? 0;
+}
+
+export function enqueueAppointmentNotice(
+    client: PoolClient,
+    kind: 'confirmation' | 'cancellation',
+    appointment: AppointmentNotice
+): Promise<number> {
+    // Without VAPID keys nothing could ever deliver the rows, so the event's
+    // transaction leaves push_outbox alone (and works before its migration has run)
+    if (!configureWebPush()) {
+        return Promise.resolve(0);
+    }
+    const content: NotificationContent = kind === 'confirmation'
+        ? {
+            title: 'Cita Confirmada - Dra. Mara Flamini',
+            body: `Tu cita ha sido confirmada para el ${appointment.date} a las ${appointment.time}`,
+            type: 'appointment_confirmation',
+            data: { appointmentId: appointment.id, url: '/confirmation' }
+        }
+        : {
+            title: 'Cita Cancelada - Dra. Mara Flamini',
+            body: `Tu cita del ${appointment.date} a las ${appointment.time} ha sido cancelada`,
+            type: 'appointment_cancellation',
+            data: { appointmentId: appointment.id }
+        };
+    return enqueueNotification({ patientId: appointment.patient_id }, content, client);
+}
+
+async function claimDeliveries(batchSize: number): Promise<ClaimedDelivery[]> {
+    const result = await query(
+        `WITH claimed AS (
+            UPDATE push_outbox
+            SET attempts = attempts + 1,
+                next_attempt_at = NOW() + make_interval(secs => $2::int)
+            WHERE id IN (
+                SELECT id FROM push_outbox
+                WHERE status = 'pending' AND next_attempt_at <= NOW()
+                ORDER BY next_attempt_at
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, endpoint, payload, attempts
+        )
+        SELECT c.id, c.endpoint, c.payload, c.attempts,
+               s.id AS subscription_id, s.p256dh_key, s.auth_key, s.active
+        FROM claimed c
+        LEFT JOIN push_subscriptions s ON s.endpoint = c.endpoint`,
+        [batchSize, CLAIM_TIMEOUT_SECONDS]
+    );
+    return result.rows;
+}
+
+async function markSent(ids: number[], endpoints: string[]): Promise<void> {
+    if (ids.length === 0) {
+        return;
+    }
+    await query(
+        `UPDATE push_outbox SET status = 'sent', sent_at = NOW(), last_error = NULL WHERE id = ANY($1)`,
+        [ids]
+    );
+    await query(
+        'UPDATE push_subscriptions SET failure_count = 0 WHERE endpoint = ANY($1) AND failure_count > 0',
+        [endpoints]
+    );
+}
+
+async function markDead(ids: number[], error: string): Promise<void> {
+    if (ids.length === 0) {
+        return;
+    }
+    await query(
+        `UPDATE push_outbox SET status = 'dead', last_error = $2 WHERE id = ANY($1)`,
+        [ids, error]
+    );
+}
+
+// Deactivate endpoints and dead-letter everything still queued for them
+async function retireEndpoints(endpoints: string[], error: string): Promise<number> {
+    if (endpoints.length === 0) {
+        return 0;
+    }
+    await deactivateSubscriptions(endpoints);
+    const result = await query(
+        `UPDATE push_outbox SET status = 'dead', last_error = $2 WHERE endpoint = ANY($1) AND status = 'pending'`,
+        [endpoints, error]
+    );
+    return result.rowCount ?? 0;
+}
+
+// Charge a transient failure to the endpoint; true once its budget is spent
+async function chargeEndpointFailure(endpoint: string): Promise<boolean> {
+    const result = await query(
+        'UPDATE push_subscriptions SET failure_count = failure_count + 1 WHERE endpoint = $1 RETURNING failure_count',
+        [endpoint]
+    );
+    return result.rows.length > 0 && result.rows[0].failure_count >= ENDPOINT_FAILURE_BUDGET;
+}
+
+export function retryDelaySeconds(attempts: number): number {
+    return Math.min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1));
+}
+
+async function settleFailure(delivery: ClaimedDelivery, error: string, summary: OutboxDispatchSummary): Promise<void> {
+    if (await chargeEndpointFailure(delivery.endpoint)) {
+        summary.dead += await retireEndpoints([delivery.endpoint], `Failure budget exhausted: ${error}`);
+        return;
+    }
+    if (delivery.attempts >= MAX_ATTEMPTS) {
+        await markDead([delivery.id], error);
+        summary.dead++;
+        return;
+    }
+    await query(
+        `UPDATE push_outbox SET next_attempt_at = NOW() + make_interval(secs => $2::int), last_error = $3 WHERE id = $1`,
+        [delivery.id, retryDelaySeconds(delivery.attempts), error]
+    );
+    summary.retried++;
+}
+
+function maybeSweep(): void {
+    const now = Date.now();
+    if (now - lastSweepAt < SWEEP_INTERVAL_MS) {
+        return;
+    }
+    lastSweepAt = now;
+    query(
+        `DELETE FROM push_outbox WHERE id IN (
+            SELECT id FROM push_outbox
+            WHERE status = 'sent' AND sent_at < NOW() - make_interval(days => $1::int)
+            LIMIT $2
+        )`,
+        [SENT_RETENTION_DAYS, SWEEP_BATCH_SIZE]
+    ).catch((error) => {
+        console.error('Push outbox sweep error:', error);
+    });
+}
+
+/**
+ * Drain due outbox rows in batches claimed with FOR UPDATE SKIP LOCKED, so several
+ * dispatchers (the in-process one and the cron route) never send a row twice.
+ */
+export async function dispatchPushOutbox({
+    batchSize = DEFAULT_BATCH_SIZE,
+    maxBatches = DEFAULT_MAX_BATCHES
+}: OutboxDispatchOptions = {}): Promise<OutboxDispatchSummary> {
+    const summary: OutboxDispatchSummary = { sent: 0, retried: 0, dead: 0 };
+    if (!configureWebPush()) {
+        throw new Error('Push notifications not configured. VAPID keys missing.');
+    }
+    maybeSweep();
+
+    try {
+        await drainBatches(batchSize, maxBatches, summary);
+    } finally {
+        pushDeliveries.inc({ source: 'outbox', result: 'sent' }, summary.sent);
+        pushDeliveries.inc({ source: 'outbox', result: 'retried' }, summary.retried);
+        pushDeliveries.inc({ source: 'outbox', result: 'dead' }, summary.dead);
+    }
+    return summary;
+}
+
+async function drainBatches(batchSize: number, maxBatches: number, summary: OutboxDispatchSummary): Promise<void> {
+    for (let batch = 0; batch < maxBatches; batch++) {
+        const deliveries = await claimDeliveries(batchSize);
+        const sent: ClaimedDelivery[] = [];
+        const inactive: number[] = [];
+        const expired: string[] = [];
+
+        await Promise.all(deliveries.map(async (delivery) => {
+            if (!delivery.active) {
+                inactive.push(delivery.id);
+                return;
+            }
+
+            const result = await sendPush({
+                id: delivery.subscription_id as number,
+                endpoint: delivery.endpoint,
+                p256dh_key: delivery.p256dh_key as string,
+                auth_key: delivery.auth_key as string
+            }, delivery.payload);
+
+            if (result.success) {
+                sent.push(delivery);
+            } else if (isExpiredSubscription(result)) {
+                expired.push(delivery.endpoint);
+            } else {
+                console.error('Error sending notification:', result.statusCode, result.error);
+                await settleFailure(delivery, result.error || 'Unknown error', summary);
+            }
+        }));
+
+        await markSent(sent.map((delivery) => delivery.id), sent.map((delivery) => delivery.endpoint));
+        await markDead(inactive, 'Subscription inactive');
+        summary.sent += sent.length;
+        summary.dead += inactive.length;
+        summary.dead += await retireEndpoints(Array.from(new Set(expired)), 'Subscription expired');
+
+        if (deliveries.length < batchSize) {
+            break;
+        }
+    }
+}
+
+let dispatching: Promise<void> | null = null;
+let dispatchRequested = false;
+
+/**
+ * Start draining the outbox in the background after an event commits. Calls made while
+ * a dispatch is running schedule one more pass, so rows committed mid-run are not left
+ * for the next cron tick.
+ */
+export function scheduleOutboxDispatch(): void {
+    if (!configureWebPush()) {
+        return;
+    }
+    if (dispatching) {
+        dispatchRequested = true;
+        return;
+    }
+
+    dispatchRequested = false;
+    dispatching = dispatchPushOutbox()
+        .then(() => undefined)
+        .catch((error) => {
+            console.error('Push outbox dispatch error:', error);
+        })
+        .finally(() => {
+            dispatching = null;
+            if (dispatchRequested) {
+                scheduleOutboxDispatch();
+            }
+        });
+}
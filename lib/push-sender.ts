@@ -0,0 +1,229 @@
+import https from 'https';
+import webpush from 'web-push';
+import { query } from './db';
+import { counter } from './prometheus';
+
+// Server-side Web Push delivery. Sends run through a fixed number of concurrent workers
+// sharing one keep-alive agent, and endpoints the push service reports as gone (404/410)
+// are deactivated in batches rather than with one UPDATE each.
+
+export interface PushSubscriptionRow {
+    id: number;
+    endpoint: string;
+    p256dh_key: string;
+    auth_key: string;
+}
+
+export interface PushDeliveryResult {
+    endpoint: string;
+    success: boolean;
+    statusCode?: number;
+    error?: string;
+}
+
+export interface PushFanOutSummary {
+    sent: number;
+    failed: number;
+    expired: number;
+}
+
+export interface PushFanOutOptions {
+    concurrency?: number;
+    // Called as each delivery settles, e.g. to stream progress to the caller
+    onResult?: (result: PushDeliveryResult) => void | Promise<void>;
+}
+
+const DEFAULT_CONCURRENCY = Number(process.env.PUSH_CONCURRENCY) || 20;
+const SUBSCRIPTION_PAGE_SIZE = 500;
+const DEACTIVATE_BATCH_SIZE = 500;
+
+// Exported at /api/metrics; source is 'fanout' here and 'outbox' in lib/push-outbox.ts
+export const pushDeliveries = counter('push_deliveries_total', 'Push notification deliveries by source and outcome');
+
+// Sockets to each push service are reused across sends and requests
+const agent = new https.Agent({ keepAlive: true, maxSockets: 64 });
+
+let vapidConfigured = false;
+
+export function configureWebPush(): boolean {
+    if (vapidConfigured) {
+        return true;
+    }
+    if (!process.env.NEXT_PUBLIC_VAPID_PUBLIC_KEY || !process.env.VAPID_PRIVATE_KEY) {
+        return false;
+    }
+    webpush.setVapidDetails(
+        'mailto:contacto@dra-mara-flamini.com',
+        process.env.NEXT_PUBLIC_VAPID_PUBLIC_KEY,
+        process.env.VAPID_PRIVATE_KEY
+    );
+    vapidConfigured = true;
+    return true;
+}
+
+export interface NotificationContent {
+    title: string;
+    body: string;
+    type?: string;
+    data?: Record<string, any>;
+}
+
+// Payload the service worker renders; reminders stay on screen until dismissed
+export function buildNotificationPayload({ title, body, type = 'general', data = {} }: NotificationContent): string {
+    return JSON.stringify({
+        title,
+        body,
+        icon: '/icons/icon-192x192.svg',
+        badge: '/icons/icon-72x72.svg',
+        data: {
+            type,
+            url: type === 'appointment_reminder' ? '/agendar-visita' : '/',
+            ...data
+        },
+        actions: [
+            {
+                action: 'view',
+                title: 'Ver',
+                icon: '/icons/icon-96x96.svg'
+            }
+        ],
+        requireInteraction: type === 'appointment_reminder',
+        vibrate: [200, 100, 200]
+    });
+}
+
+export interface SubscriptionFilter {
+    // Only this patient's subscriptions; omit for a broadcast to every active subscription
+    patientId?: number;
+    pageSize?: number;
+}
+
+// Active subscriptions in id order, fetched a page at a time
+export async function* activeSubscriptions({ patientId, pageSize = SUBSCRIPTION_PAGE_SIZE }: SubscriptionFilter = {}): AsyncGenerator<PushSubscriptionRow> {
+    const params: any[] = [0, pageSize];
+    let patientClause = '';
+    if (patientId !== undefined) {
+        params.push(patientId);
+        patientClause = 'AND patient_id = $3';
+    }
+
+    while (true) {
+        const result = await query(
+            `SELECT id, endpoint, p256dh_key, auth_key
+             FROM push_subscriptions
+             WHERE active = true AND id > $1 ${patientClause}
+             ORDER BY id
+             LIMIT $2`,
+            params
+        );
+        yield* result.rows;
+        if (result.rows.length < pageSize) {
+            return;
+        }
+        params[0] = result.rows[result.rows.length - 1].id;
+    }
+}
+
+// Patient an appointment belongs to, for sends addressed by appointment
+export async function findAppointmentPatientId(appointmentId: string): Promise<number | null> {
+    const result = await query('SELECT patient_id FROM appointments WHERE id = $1', [appointmentId]);
+    return result.rows.length > 0 ? result.rows[0].patient_id : null;
+}
+
+export async function deactivateSubscriptions(endpoints: string[]): Promise<void> {
+    if (endpoints.length === 0) {
+        return;
+    }
+    await query(
+        'UPDATE push_subscriptions SET active = false WHERE endpoint = ANY($1)',
+        [endpoints]
+    );
+}
+
+export async function sendPush(subscription: PushSubscriptionRow, payload: string): Promise<PushDeliveryResult> {
+    try {
+        await webpush.sendNotification(
+            {
+                endpoint: subscription.endpoint,
+                keys: {
+                    p256dh: subscription.p256dh_key,
+                    auth: subscription.auth_key
+                }
+            },
+            payload,
+            { agent }
+        );
+        return { endpoint: subscription.endpoint, success: true };
+    } catch (error: any) {
+        return {
+            endpoint: subscription.endpoint,
+            success: false,
+            statusCode: error?.statusCode,
+            error: error?.message || 'Unknown error'
+        };
+    }
+}
+
+export function isExpiredSubscription(result: PushDeliveryResult): boolean {
+    return result.statusCode === 404 || result.statusCode === 410;
+}
+
+/**
+ * Deliver one payload to every subscription with at most `concurrency` sends in flight.
+ * Subscriptions are pulled lazily, so an async generator over the table never holds
+ * more than a page in memory.
+ */
+export async function fanOutPush(
+    subscriptions: AsyncIterable<PushSubscriptionRow> | Iterable<PushSubscriptionRow>,
+    payload: string,
+    { concurrency = DEFAULT_CONCURRENCY, onResult }: PushFanOutOptions = {}
+): Promise<PushFanOutSummary> {
+    const iterator = Symbol.asyncIterator in subscriptions
+        ? (subscriptions as AsyncIterable<PushSubscriptionRow>)[Symbol.asyncIterator]()
+        : (subscriptions as Iterable<PushSubscriptionRow>)[Symbol.iterator]();
+    const summary: PushFanOutSummary = { sent: 0, failed: 0, expired: 0 };
+    let expired: string[] = [];
+
+    const flushExpired = async () => {
+        const batch = expired;
+        expired = [];
+        try {
+            await deactivateSubscriptions(batch);
+        } catch (error) {
+            console.error('Error deactivating expired push subscriptions:', error);
+        }
+    };
+
+    const worker = async () => {
+        while (true) {
+            const next = await iterator.next();
+            if (next.done) {
+                return;
+            }
+
+            const result = await sendPush(next.value, payload);
+            if (result.success) {
+                summary.sent++;
+                pushDeliveries.inc({ source: 'fanout', result: 'sent' });
+            } else {
+                summary.failed++;
+                console.error('Error sending notification:', result.statusCode, result.error);
+                if (isExpiredSubscription(result)) {
+                    summary.expired++;
+                    pushDeliveries.inc({ source: 'fanout', result: 'expired' });
+                    expired.push(result.endpoint);
+                    if (expired.length >= DEACTIVATE_BATCH_SIZE) {
+                        await flushExpired();
+                    }
+                } else {
+                    pushDeliveries.inc({ source: 'fanout', result: 'failed' });
+                }
+            }
+            await onResult?.(result);
+        }
+    };
+
+    await Promise.all(Array.from({ length: Math.max(1, concurrency) }, worker));
+    await flushExpired();
+    return summary;
+}
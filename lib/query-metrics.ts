@@ -0,0 +1,217 @@
+import { createHash } from 'crypto';
+
+// In-memory query latency metrics, keyed by a normalized fingerprint of the SQL text
+// (literals and parameters replaced by ?). Each fingerprint keeps a fixed-bucket histogram,
+// so memory stays constant however many queries run, and percentiles are estimated
+// from the buckets. Queries slower than SLOW_QUERY_MS are logged, at most once per
+// fingerprint per SLOW_QUERY_LOG_INTERVAL_MS, and the latest ones are kept for inspection.
+
+export const QUERY_DURATION_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000];
+
+export interface QueryStats {
+    id: string;
+    fingerprint: string;
+    count: number;
+    errors: number;
+    rows: number;
+    totalMs: number;
+    meanMs: number;
+    p50Ms: number;
+    p95Ms: number;
+    p99Ms: number;
+    maxMs: number;
+}
+
+export interface SlowQuery {
+    fingerprint: string;
+    durationMs: number;
+    rows: number;
+    error?: string;
+    at: string;
+}
+
+interface QueryHistogram {
+    id: string;
+    count: number;
+    errors: number;
+    rows: number;
+    totalMs: number;
+    maxMs: number;
+    // One count per QUERY_DURATION_BUCKETS_MS bound, plus an overflow bucket
+    buckets: number[];
+    lastSlowLogAt: number;
+    suppressedSlow: number;
+}
+
+const SLOW_QUERY_MS = Number(process.env.SLOW_QUERY_MS) || 200;
+const SLOW_QUERY_LOG_INTERVAL_MS = 60 * 1000;
+const SLOW_QUERY_HISTORY = 100;
+const MAX_FINGERPRINTS = 500;
+const MAX_CACHED_TEXTS = 2000;
+// Statements beyond MAX_FINGERPRINTS are pooled here rather than growing without bound
+const OVERFLOW_FINGERPRINT = '<other>';
+
+const histograms = new Map<string, QueryHistogram>();
+const fingerprintCache = new Map<string, string>();
+const slowQueries: SlowQuery[] = [];
+
+export function fingerprintQuery(text: string): string {
+    return text
+        .replace(/\/\*[\s\S]*?\*\//g, ' ')
+        .replace(/--[^\n]*/g, ' ')
+        .replace(/'(?:[^']|'')*'/g, '?')
+        .replace(/\$\d+/g, '?')
+        .replace(/\b\d+(?:\.\d+)?\b/g, '?')
+        .replace(/\s+/g, ' ')
+        .replace(/\(\s*\?(?:\s*,\s*\?)+\s*\)/g, '(?)')
+        .trim();
+}
+
+// Short stable id for a fingerprint, e.g. as a metrics label in place of the SQL text
+export function queryId(fingerprint: string): string {
+    return createHash('sha1').update(fingerprint).digest('hex').slice(0, 12);
+}
+
+// Statement texts repeat, so normalization runs once per distinct text
+function cachedFingerprint(text: string): string {
+    let fingerprint = fingerprintCache.get(text);
+    if (fingerprint === undefined) {
+        if (fingerprintCache.size >= MAX_CACHED_TEXTS) {
+            fingerprintCache.clear();
+        }
+        fingerprint = fingerprintQuery(text);
+        fingerprintCache.set(text, fingerprint);
+    }
+    return fingerprint;
+}
+
+function histogramFor(fingerprint: string): QueryHistogram {
+    let histogram = histograms.get(fingerprint);
+    if (!histogram) {
+        if (histograms.size >= MAX_FINGERPRINTS && fingerprint !== OVERFLOW_FINGERPRINT) {
+            return histogramFor(OVERFLOW_FINGERPRINT);
+        }
+        histogram = {
+            id: queryId(fingerprint),
+            count: 0,
+            errors: 0,
+            rows: 0,
+            totalMs: 0,
+            maxMs: 0,
+            buckets: new Array(QUERY_DURATION_BUCKETS_MS.length + 1).fill(0),
+            lastSlowLogAt: 0,
+            suppressedSlow: 0
+        };
+        histograms.set(fingerprint, histogram);
+    }
+    return histogram;
+}
+
+function bucketIndex(durationMs: number): number {
+    for (let i = 0; i < QUERY_DURATION_BUCKETS_MS.length; i++) {
+        if (durationMs <= QUERY_DURATION_BUCKETS_MS[i]) {
+            return i;
+        }
+    }
+    return QUERY_DURATION_BUCKETS_MS.length;
+}
+
+export function recordQuery(text: string, durationMs: number, rows: number | null, error?: unknown): void {
+    const fingerprint = cachedFingerprint(text);
+    const histogram = histogramFor(fingerprint);
+    histogram.count++;
+    histogram.rows += rows ?? 0;
+    histogram.totalMs += durationMs;
+    histogram.maxMs = Math.max(histogram.maxMs, durationMs);
+    histogram.buckets[bucketIndex(durationMs)]++;
+    if (error) {
+        histogram.errors++;
+    }
+
+    if (durationMs >= SLOW_QUERY_MS) {
+        recordSlowQuery(fingerprint, histogram, durationMs, rows ?? 0, error);
+    }
+}
+
+function recordSlowQuery(fingerprint: string, histogram: QueryHistogram, durationMs: number, rows: number, error?: unknown): void {
+    const slow: SlowQuery = {
+        fingerprint,
+        durationMs: Math.round(durationMs),
+        rows,
+        at: new Date().toISOString()
+    };
+    if (error) {
+        slow.error = error instanceof Error ? error.message : String(error);
+    }
+    slowQueries.push(slow);
+    if (slowQueries.length > SLOW_QUERY_HISTORY) {
+        slowQueries.shift();
+    }
+
+    const now = Date.now();
+    if (now - histogram.lastSlowLogAt < SLOW_QUERY_LOG_INTERVAL_MS) {
+        histogram.suppressedSlow++;
+        return;
+    }
+    console.warn('slow query', { ...slow, suppressed: histogram.suppressedSlow });
+    histogram.lastSlowLogAt = now;
+    histogram.suppressedSlow = 0;
+}
+
+// Linear interpolation inside the bucket holding the q-th observation
+function estimateQuantile(histogram: QueryHistogram, q: number): number {
+    const target = q * histogram.count;
+    let seen = 0;
+    for (let i = 0; i < histogram.buckets.length; i++) {
+        const inBucket = histogram.buckets[i];
+        if (inBucket > 0 && seen + inBucket >= target) {
+            const lower = i === 0 ? 0 : QUERY_DURATION_BUCKETS_MS[i - 1];
+            const upper = Math.min(QUERY_DURATION_BUCKETS_MS[i] ?? histogram.maxMs, histogram.maxMs);
+            return lower + (Math.max(upper, lower) - lower) * ((target - seen) / inBucket);
+        }
+        seen += inBucket;
+    }
+    return histogram.maxMs;
+}
+
+function round(value: number): number {
+    return Math.round(value * 100) / 100;
+}
+
+// Per-fingerprint statistics, most total time first
+export function getQueryMetrics(): QueryStats[] {
+    return Array.from(histograms, ([fingerprint, histogram]) => ({
+        id: histogram.id,
+        fingerprint,
+        count: histogram.count,
+        errors: histogram.errors,
+        rows: histogram.rows,
+        totalMs: round(histogram.totalMs),
+        meanMs: round(histogram.totalMs / histogram.count),
+        p50Ms: round(estimateQuantile(histogram, 0.5)),
+        p95Ms: round(estimateQuantile(histogram, 0.95)),
+        p99Ms: round(estimateQuantile(histogram, 0.99)),
+        maxMs: round(histogram.maxMs)
+    })).sort((a, b) => b.totalMs - a.totalMs);
+}
+
+// Raw bucket counts, for exporting histograms as they are
+export function getQueryHistograms(): Array<{ id: string; fingerprint: string; count: number; errors: number; totalMs: number; buckets: number[] }> {
+    return Array.from(histograms, ([fingerprint, histogram]) => ({
+        id: histogram.id,
+        fingerprint,
+        count: histogram.count,
+        errors: histogram.errors,
+        totalMs: histogram.totalMs,
+        buckets: [...histogram.buckets]
+    }));
+}
+
+export function getSlowQueries(): SlowQuery[] {
+    return [...slowQueries];
+}
+
+export function resetQueryMetrics(): void {
+    histograms.clear();
+    slowQueries.length = 0;
+}
@@ -0,0 +1,165 @@
+import { query } from './db'
+import {
+  memoryRateLimitStore,
+  RateLimitOptions,
+  RateLimitPolicy,
+  RateLimitResult,
+  RateLimitStore
+} from './rate-limit'
+
+// Node-only: keeps pg out of lib/rate-limit.ts, which the Edge middleware imports
+
+// Expired rows are swept opportunistically, at most once per interval and in bounded batches
+const SWEEP_INTERVAL_MS = 60 * 1000
+const SWEEP_BATCH_SIZE = 1000
+
+const POLICIES: RateLimitPolicy[] = ['fixed-window', 'sliding-window', 'token-bucket']
+
+// Each policy keeps its own row for an identifier
+function storeKey(policy: RateLimitPolicy, identifier: string): string {
+  return `${policy}:${identifier}`
+}
+
+const RETURNING = 'RETURNING count, previous_count, window_start, allowed'
+
+// One atomic upsert per hit; every timestamp is epoch milliseconds
+function upsert(key: string, { limit, windowMs, policy }: Required<RateLimitOptions>, now: number): [string, any[]] {
+  switch (policy) {
+    case 'sliding-window':
+      // $1 key, $2 window, $3 aligned window start
+      return [`
+        INSERT INTO rate_limits AS rl (key, count, window_start, expires_at)
+        VALUES ($1, 1, $3::bigint, $3::bigint + 2 * $2::bigint)
+        ON CONFLICT (key) DO UPDATE SET
+          previous_count = CASE
+            WHEN rl.window_start = $3::bigint THEN rl.previous_count
+            WHEN rl.window_start = $3::bigint - $2::bigint THEN rl.count
+            ELSE 0
+          END,
+          count = CASE WHEN rl.window_start = $3::bigint THEN rl.count + 1 ELSE 1 END,
+          window_start = $3::bigint,
+          expires_at = $3::bigint + 2 * $2::bigint
+        ${RETURNING}
+      `, [key, windowMs, now - (now % windowMs)]]
+    case 'token-bucket':
+      // $1 key, $2 capacity, $3 window (time to refill from empty), $4 now
+      return [`
+        INSERT INTO rate_limits AS rl (key, count, window_start, allowed, expires_at)
+        VALUES ($1, $2::float8 - 1, $4::bigint, $2::float8 >= 1, $4::bigint + $3::bigint)
+        ON CONFLICT (key) DO UPDATE SET
+          count = LEAST($2::float8, rl.count + ($4::bigint - rl.window_start) * $2::float8 / $3::bigint)
+            - CASE WHEN LEAST($2::float8, rl.count + ($4::bigint - rl.window_start) * $2::float8 / $3::bigint) >= 1 THEN 1 ELSE 0 END,
+          allowed = LEAST($2::float8, rl.count + ($4::bigint - rl.window_start) * $2::float8 / $3::bigint) >= 1,
+          window_start = $4::bigint,
+          expires_at = $4::bigint + $3::bigint
+        ${RETURNING}
+      `, [key, limit, windowMs, now]]
+    default:
+      // $1 key, $2 window, $3 now
+      return [`
+        INSERT INTO rate_limits AS rl (key, count, window_start, expires_at)
+        VALUES ($1, 1, $3::bigint, $3::bigint + $2::bigint)
+        ON CONFLICT (key) DO UPDATE SET
+          count = CASE WHEN rl.expires_at < $3::bigint THEN 1 ELSE rl.count + 1 END,
+          window_start = CASE WHEN rl.expires_at < $3::bigint THEN $3::bigint ELSE rl.window_start END,
+          expires_at = CASE WHEN rl.expires_at < $3::bigint THEN $3::bigint + $2::bigint ELSE rl.expires_at END
+        ${RETURNING}
+      `, [key, windowMs, now]]
+  }
+}
+
+/**
+ * Rate limit counters in the UNLOGGED rate_limits table
+ * (database/create_rate_limits_table.sql), shared by every app instance.
+ *
+ * Unlike the in-memory store, rejected hits are counted too. If the database
+ * is unreachable the limiter fails open rather than locking everyone out.
+ */
+export class PostgresRateLimitStore implements RateLimitStore {
+  private lastSweepAt = 0
+
+  async check(identifier: string, { limit, windowMs, policy = 'fixed-window' }: RateLimitOptions): Promise<RateLimitResult> {
+    const now = Date.now()
+    this.maybeSweep(now)
+
+    let row
+    try {
+      const [sql, params] = upsert(storeKey(policy, identifier), { limit, windowMs, policy }, now)
+      const result = await query(sql, params)
+      row = result.rows[0]
+    } catch (error) {
+      console.error('Rate limit store error:', error)
+      return { success: true, remaining: Math.max(0, limit - 1), resetTime: now + windowMs, limit }
+    }
+
+    const count = Number(row.count)
+    const rowWindowStart = Number(row.window_start)
+
+    if (policy === 'token-bucket') {
+      const refillPerMs = limit / windowMs
+      return {
+        success: row.allowed,
+        remaining: Math.max(0, Math.floor(count)),
+        resetTime: now + Math.ceil(((row.allowed ? limit : 1) - count) / refillPerMs),
+        limit
+      }
+    }
+
+    if (policy === 'sliding-window') {
+      const overlap = 1 - (now - rowWindowStart) / windowMs
+      const estimated = Number(row.previous_count) * overlap + count
+      return {
+        success: estimated <= limit,
+        remaining: Math.max(0, Math.floor(limit - estimated)),
+        resetTime: rowWindowStart + windowMs,
+        limit
+      }
+    }
+
+    return {
+      success: count <= limit,
+      remaining: Math.max(0, limit - count),
+      resetTime: rowWindowStart + windowMs,
+      limit
+    }
+  }
+
+  async reset(identifier?: string): Promise<void> {
+    if (identifier === undefined) {
+      await query('DELETE FROM rate_limits')
+      return
+    }
+    await query('DELETE FROM rate_limits WHERE key = ANY($1)', [POLICIES.map((policy) => storeKey(policy, identifier))])
+  }
+
+  private maybeSweep(now: number): void {
+    if (now - this.lastSweepAt < SWEEP_INTERVAL_MS) {
+      return
+    }
+    this.lastSweepAt = now
+    query(
+      'DELETE FROM rate_limits WHERE key IN (SELECT key FROM rate_limits WHERE expires_at < $1 LIMIT $2)',
+      [now, SWEEP_BATCH_SIZE]
+    ).catch((error) => {
+      console.error('Rate limit sweep error:', error)
+    })
+  }
+}
+
+let store: RateLimitStore | null = null
+
+/**
+ * Store selected by RATE_LIMIT_STORE: 'postgres' for limits shared across
+ * instances, anything else for the per-process memory store
+ */
+export function getRateLimitStore(): RateLimitStore {
+  if (!store) {
+    store = process.env.RATE_LIMIT_STORE === 'postgres' ? new PostgresRateLimitStore() : memoryRateLimitStore
+  }
+  return store
+}
+
+// Swap the backend, e.g. a MemoryRateLimitStore stand-in in tests
+export function setRateLimitStore(next: RateLimitStore | null): void {
+  store = next
+}
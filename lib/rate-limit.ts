@@ -1,64 +1,300 @@
 import { NextRequest } from 'next/server'
 
+export type RateLimitPolicy = 'fixed-window' | 'sliding-window' | 'token-bucket'
+
+export interface RateLimitOptions {
+  limit: number
+  windowMs: number
+  policy?: RateLimitPolicy
+}
+
+export interface RateLimitResult {
+  success: boolean
+  remaining: number
+  resetTime: number
+  limit: number
+}
+
+export interface RateLimiterOptions {
+  // Upper bound on tracked identifiers; the least recently used one is evicted past it
+  maxKeys?: number
+  // Granularity of the expiry buckets
+  bucketMs?: number
+}
+
 interface RateLimitEntry {
+  policy: RateLimitPolicy
+  // fixed/sliding window: requests in the current window; token bucket: tokens left
   count: number
+  // sliding window: requests in the previous window
+  previousCount: number
+  // fixed/sliding window: start of the current window; token bucket: last refill
+  windowStart: number
   resetTime: number
+  expiresAt: number
+  bucket: number
 }
 
-const rateLimitMap = new Map<string, RateLimitEntry>()
+/**
+ * In-memory rate limiter with amortized O(1) expiry.
+ *
+ * Entries are filed into time buckets by expiry, so each call only visits the
+ * buckets that have fully elapsed since the previous call instead of every
+ * tracked identifier. Memory is bounded by maxKeys.
+ */
+export class RateLimiter {
+  private entries = new Map<string, RateLimitEntry>()
+  private buckets = new Map<number, Set<string>>()
+  private sweptThrough: number
+  private maxKeys: number
+  private bucketMs: number
 
-export function rateLimit(
-  identifier: string, 
-  limit: number = 5, 
-  windowMs: number = 60000
-): { success: boolean; remaining: number; resetTime: number } {
-  const now = Date.now()
-  const windowStart = now - windowMs
-  
-  // Clean up expired entries
-  const keysToDelete: string[] = []
-  rateLimitMap.forEach((entry, key) => {
-    if (entry.resetTime < now) {
-      keysToDelete.push(key)
+  constructor({ maxKeys = 10000, bucketMs = 1000 }: RateLimiterOptions = {}) {
+    this.maxKeys = maxKeys
+    this.bucketMs = bucketMs
+    this.sweptThrough = Math.floor(Date.now() / bucketMs) - 1
+  }
+
+  check(identifier: string, { limit, windowMs, policy = 'fixed-window' }: RateLimitOptions): RateLimitResult {
+    const now = Date.now()
+    this.sweep(now)
+
+    let entry = this.entries.get(identifier)
+    if (entry && (entry.expiresAt < now || entry.policy !== policy)) {
+      this.remove(identifier, entry)
+      entry = undefined
     }
-  })
-  keysToDelete.forEach(key => rateLimitMap.delete(key))
-  
-  const entry = rateLimitMap.get(identifier)
-  
-  if (!entry || entry.resetTime < now) {
-    // First request or window expired
-    rateLimitMap.set(identifier, {
-      count: 1,
-      resetTime: now + windowMs
-    })
-    return {
-      success: true,
-      remaining: limit - 1,
-      resetTime: now + windowMs
+
+    if (entry) {
+      // Move to the most recently used position
+      this.entries.delete(identifier)
+      this.entries.set(identifier, entry)
+    } else {
+      entry = this.insert(identifier, policy, now)
+    }
+
+    switch (policy) {
+      case 'sliding-window':
+        return this.slidingWindow(identifier, entry, limit, windowMs, now)
+      case 'token-bucket':
+        return this.tokenBucket(identifier, entry, limit, windowMs, now)
+      default:
+        return this.fixedWindow(identifier, entry, limit, windowMs, now)
     }
   }
-  
-  if (entry.count >= limit) {
-    // Rate limit exceeded
-    return {
-      success: false,
-      remaining: 0,
-      resetTime: entry.resetTime
+
+  reset(identifier?: string): void {
+    if (identifier === undefined) {
+      this.entries.clear()
+      this.buckets.clear()
+      return
+    }
+    const entry = this.entries.get(identifier)
+    if (entry) {
+      this.remove(identifier, entry)
     }
   }
-  
-  // Increment counter
-  entry.count++
-  rateLimitMap.set(identifier, entry)
-  
-  return {
-    success: true,
-    remaining: limit - entry.count,
-    resetTime: entry.resetTime
+
+  get size(): number {
+    return this.entries.size
+  }
+
+  private fixedWindow(identifier: string, entry: RateLimitEntry, limit: number, windowMs: number, now: number): RateLimitResult {
+    if (entry.count === 0) {
+      // First request or window expired
+      entry.count = 1
+      entry.windowStart = now
+      entry.resetTime = now + windowMs
+      this.schedule(identifier, entry, entry.resetTime)
+      return { success: true, remaining: limit - 1, resetTime: entry.resetTime, limit }
+    }
+
+    if (entry.count >= limit) {
+      // Rate limit exceeded
+      return { success: false, remaining: 0, resetTime: entry.resetTime, limit }
+    }
+
+    entry.count++
+    return { success: true, remaining: limit - entry.count, resetTime: entry.resetTime, limit }
+  }
+
+  // Sliding window counter: the previous window's count is weighted by how much of it still overlaps
+  private slidingWindow(identifier: string, entry: RateLimitEntry, limit: number, windowMs: number, now: number): RateLimitResult {
+    const windowStart = now - (now % windowMs)
+    if (entry.windowStart !== windowStart) {
+      entry.previousCount = windowStart - entry.windowStart === windowMs ? entry.count : 0
+      entry.count = 0
+      entry.windowStart = windowStart
+    }
+
+    const overlap = 1 - (now - windowStart) / windowMs
+    const estimated = entry.previousCount * overlap + entry.count
+    entry.resetTime = windowStart + windowMs
+    // Both counts are meaningless two windows from now
+    this.schedule(identifier, entry, windowStart + 2 * windowMs)
+
+    if (estimated + 1 > limit) {
+      return { success: false, remaining: 0, resetTime: entry.resetTime, limit }
+    }
+
+    entry.count++
+    return { success: true, remaining: Math.max(0, Math.floor(limit - estimated - 1)), resetTime: entry.resetTime, limit }
+  }
+
+  // Token bucket: holds up to `limit` tokens and refills `limit` tokens per window
+  private tokenBucket(identifier: string, entry: RateLimitEntry, limit: number, windowMs: number, now: number): RateLimitResult {
+    if (limit <= 0) {
+      return { success: false, remaining: 0, resetTime: now + windowMs, limit }
+    }
+
+    const refillPerMs = limit / windowMs
+    if (entry.windowStart === 0) {
+      entry.count = limit
+    } else {
+      entry.count = Math.min(limit, entry.count + (now - entry.windowStart) * refillPerMs)
+    }
+    entry.windowStart = now
+
+    if (entry.count < 1) {
+      entry.resetTime = now + Math.ceil((1 - entry.count) / refillPerMs)
+      this.schedule(identifier, entry, now + Math.ceil((limit - entry.count) / refillPerMs))
+      return { success: false, remaining: 0, resetTime: entry.resetTime, limit }
+    }
+
+    entry.count -= 1
+    // A full bucket is indistinguishable from a new entry, so it can expire then
+    entry.resetTime = now + Math.ceil((limit - entry.count) / refillPerMs)
+    this.schedule(identifier, entry, entry.resetTime)
+    return { success: true, remaining: Math.floor(entry.count), resetTime: entry.resetTime, limit }
+  }
+
+  private insert(identifier: string, policy: RateLimitPolicy, now: number): RateLimitEntry {
+    while (this.entries.size >= this.maxKeys) {
+      const oldest = this.entries.keys().next().value as string
+      this.remove(oldest, this.entries.get(oldest) as RateLimitEntry)
+    }
+
+    const entry: RateLimitEntry = {
+      policy,
+      count: 0,
+      previousCount: 0,
+      windowStart: 0,
+      resetTime: now,
+      expiresAt: now,
+      bucket: Number.NaN
+    }
+    this.entries.set(identifier, entry)
+    return entry
+  }
+
+  private remove(identifier: string, entry: RateLimitEntry): void {
+    this.entries.delete(identifier)
+    this.unfile(identifier, entry.bucket)
+  }
+
+  private schedule(identifier: string, entry: RateLimitEntry, expiresAt: number): void {
+    entry.expiresAt = expiresAt
+    // Buckets at or before sweptThrough are never visited again
+    const bucket = Math.max(Math.floor(expiresAt / this.bucketMs), this.sweptThrough + 1)
+    if (bucket === entry.bucket) {
+      return
+    }
+
+    this.unfile(identifier, entry.bucket)
+    let keys = this.buckets.get(bucket)
+    if (!keys) {
+      keys = new Set()
+      this.buckets.set(bucket, keys)
+    }
+    keys.add(identifier)
+    entry.bucket = bucket
+  }
+
+  private unfile(identifier: string, bucket: number): void {
+    const keys = this.buckets.get(bucket)
+    if (keys) {
+      keys.delete(identifier)
+      if (keys.size === 0) {
+        this.buckets.delete(bucket)
+      }
+    }
+  }
+
+  // Drop every entry in buckets that ended at or before now
+  private sweep(now: number): void {
+    const last = Math.floor(now / this.bucketMs) - 1
+    if (last <= this.sweptThrough) {
+      return
+    }
+
+    // After a long idle gap, walking the bucket map is cheaper than every elapsed bucket index
+    if (last - this.sweptThrough > this.buckets.size) {
+      this.buckets.forEach((_, bucket) => {
+        if (bucket <= last) {
+          this.expireBucket(bucket)
+        }
+      })
+    } else {
+      for (let bucket = this.sweptThrough + 1; bucket <= last; bucket++) {
+        this.expireBucket(bucket)
+      }
+    }
+    this.sweptThrough = last
+  }
+
+  private expireBucket(bucket: number): void {
+    const keys = this.buckets.get(bucket)
+    if (!keys) {
+      return
+    }
+    keys.forEach((identifier) => this.entries.delete(identifier))
+    this.buckets.delete(bucket)
+  }
+}
+
+/**
+ * Backend that keeps rate limit state. The in-memory store is per process;
+ * shared stores (lib/rate-limit-store.ts) keep limits accurate across replicas.
+ */
+export interface RateLimitStore {
+  check(identifier: string, options: RateLimitOptions): Promise<RateLimitResult>
+  reset(identifier?: string): Promise<void>
+}
+
+// Process-local store; also the local stand-in for shared stores in tests
+export class MemoryRateLimitStore implements RateLimitStore {
+  constructor(private limiter: RateLimiter = new RateLimiter()) {}
+
+  async check(identifier: string, options: RateLimitOptions): Promise<RateLimitResult> {
+    return this.limiter.check(identifier, options)
+  }
+
+  async reset(identifier?: string): Promise<void> {
+    this.limiter.reset(identifier)
+  }
+
+  // Identifiers currently tracked
+  get size(): number {
+    return this.limiter.size
   }
 }
 
+const defaultLimiter = new RateLimiter({
+  maxKeys: Number(process.env.RATE_LIMIT_MAX_KEYS) || 10000
+})
+
+// Shares its state with rateLimit()
+export const memoryRateLimitStore = new MemoryRateLimitStore(defaultLimiter)
+
+export function rateLimit(
+  identifier: string, 
+  limit: number = 5, 
+  windowMs: number = 60000,
+  policy: RateLimitPolicy = 'fixed-window'
+): RateLimitResult {
+  return defaultLimiter.check(identifier, { limit, windowMs, policy })
+}
+
 export function getClientIP(request: NextRequest): string {
   const forwarded = request.headers.get('x-forwarded-for')
   const realIP = request.headers.get('x-real-ip')
@@ -71,27 +307,52 @@ export function getClientIP(request: NextRequest): string {
   return 'unknown'
 }
 
+// A rate limit applied to every request whose path matches `pattern`
+export interface RouteRateLimitPolicy extends RateLimitOptions {
+  name: string
+  pattern: RegExp
+  // Limited methods; all methods when omitted
+  methods?: string[]
+}
+
+// First matching policy wins, so list specific routes before broad ones
+export function findRateLimitPolicy(
+  policies: RouteRateLimitPolicy[],
+  pathname: string,
+  method: string
+): RouteRateLimitPolicy | undefined {
+  return policies.find(policy =>
+    policy.pattern.test(pathname) && (!policy.methods || policy.methods.includes(method))
+  )
+}
+
+export function setRateLimitHeaders(headers: Headers, result: RateLimitResult): void {
+  headers.set('X-RateLimit-Limit', result.limit.toString())
+  headers.set('X-RateLimit-Remaining', Math.max(0, result.remaining).toString())
+  headers.set('X-RateLimit-Reset', new Date(result.resetTime).toISOString())
+}
+
 export function createRateLimitResponse(
   remaining: number, 
-  resetTime: number
+  resetTime: number,
+  limit: number = 5
 ): Response {
-  const resetDate = new Date(resetTime)
+  const retryAfter = Math.max(0, Math.ceil((resetTime - Date.now()) / 1000))
+  const headers = new Headers({
+    'Content-Type': 'application/json',
+    'Retry-After': retryAfter.toString()
+  })
+  setRateLimitHeaders(headers, { success: false, remaining, resetTime, limit })
   
   return new Response(
     JSON.stringify({
       error: 'Too many requests',
       message: 'Rate limit exceeded. Please try again later.',
-      retryAfter: Math.ceil((resetTime - Date.now()) / 1000)
+      retryAfter
     }),
     {
       status: 429,
-      headers: {
-        'Content-Type': 'application/json',
-        'X-RateLimit-Limit': '5',
-        'X-RateLimit-Remaining': remaining.toString(),
-        'X-RateLimit-Reset': resetDate.toISOString(),
-        'Retry-After': Math.ceil((resetTime - Date.now()) / 1000).toString()
-      }
+      headers
     }
   )
 }
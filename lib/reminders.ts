@@ -0,0 +1,192 @@
+import { query } from './db';
+import { activeSubscriptions, buildNotificationPayload, configureWebPush, fanOutPush } from './push-sender';
+
+// Server-side appointment reminders. Each run enqueues one reminder_jobs row per upcoming
+// appointment (database/create_reminder_jobs_table.sql), then claims due jobs in batches
+// with FOR UPDATE SKIP LOCKED, so any number of workers can drain them without sending
+// the same reminder twice. Jobs left behind by downtime are simply overdue and go first.
+
+export interface ReminderRunSummary {
+    enqueued: number;
+    sent: number;
+    skipped: number;
+    retried: number;
+    failed: number;
+}
+
+export interface ReminderRunOptions {
+    leadHours?: number;
+    batchSize?: number;
+    maxBatches?: number;
+}
+
+interface ClaimedReminder {
+    id: number;
+    appointment_id: string;
+    attempts: number;
+    patient_id: number;
+    first_name: string;
+    appointment_date: string;
+    appointment_time: string;
+    still_due: boolean;
+}
+
+const DEFAULT_LEAD_HOURS = Number(process.env.REMINDER_LEAD_HOURS) || 24;
+const DEFAULT_BATCH_SIZE = 50;
+const DEFAULT_MAX_BATCHES = 20;
+// A claimed job not finished within this window is picked up by another worker
+const CLAIM_TIMEOUT_SECONDS = 5 * 60;
+const MAX_ATTEMPTS = 5;
+const RETRY_BASE_SECONDS = 60;
+
+export async function enqueueReminderJobs(leadHours: number = DEFAULT_LEAD_HOURS): Promise<number> {
+    const result = await query(
+        `INSERT INTO reminder_jobs (appointment_id, run_at)
+         SELECT a.id, a.appointment_date + a.appointment_time::time - make_interval(hours => $1::int)
+         FROM appointments a
+         WHERE a.status <> 'cancelled'
+           AND a.appointment_date BETWEEN CURRENT_DATE AND CURRENT_DATE + $2::int
+           AND a.appointment_date + a.appointment_time::time > LOCALTIMESTAMP
+         ON CONFLICT (appointment_id, run_at) DO NOTHING`,
+        [leadHours, Math.ceil(leadHours / 24) + 1]
+    );
+    return result.rowCount ?? 0;
+}
+
+// Running jobs whose lock lapsed (a crashed worker, or a retry whose backoff elapsed)
+async function releaseExpiredClaims(): Promise<void> {
+    await query(
+        `UPDATE reminder_jobs
+         SET status = 'pending', locked_until = NULL, updated_at = NOW()
+         WHERE status = 'running' AND locked_until < LOCALTIMESTAMP`
+    );
+}
+
+async function claimReminderJobs(batchSize: number, leadHours: number): Promise<ClaimedReminder[]> {
+    const result = await query(
+        `WITH claimed AS (
+            UPDATE reminder_jobs
+            SET status = 'running',
+                attempts = attempts + 1,
+                locked_until = LOCALTIMESTAMP + make_interval(secs => $2::int),
+                updated_at = NOW()
+            WHERE id IN (
+                SELECT id FROM reminder_jobs
+                WHERE status = 'pending' AND run_at <= LOCALTIMESTAMP
+                ORDER BY run_at
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, appointment_id, run_at, attempts
+        )
+        SELECT
+            c.id, c.appointment_id, c.attempts, a.patient_id, p.first_name,
+            a.appointment_date::text AS appointment_date,
+            left(a.appointment_time::text, 5) AS appointment_time,
+            (a.status <> 'cancelled'
+                AND a.appointment_date + a.appointment_time::time = c.run_at + make_interval(hours => $3::int)
+                AND a.appointment_date + a.appointment_time::time > LOCALTIMESTAMP) AS still_due
+        FROM claimed c
+        JOIN appointments a ON a.id = c.appointment_id
+        JOIN patients p ON p.id = a.patient_id`,
+        [batchSize, CLAIM_TIMEOUT_SECONDS, leadHours]
+    );
+    return result.rows;
+}
+
+async function finishJobs(ids: number[], status: 'done' | 'skipped'): Promise<void> {
+    if (ids.length === 0) {
+        return;
+    }
+    await query(
+        `UPDATE reminder_jobs SET status = $2, locked_until = NULL, updated_at = NOW() WHERE id = ANY($1)`,
+        [ids, status]
+    );
+}
+
+// Leave the job running with its lock pushed out by the backoff; releaseExpiredClaims()
+// returns it to pending once that passes. After MAX_ATTEMPTS it is marked failed.
+async function failJob(job: ClaimedReminder, error: string): Promise<'retried' | 'failed'> {
+    if (job.attempts >= MAX_ATTEMPTS) {
+        await query(
+            `UPDATE reminder_jobs SET status = 'failed', locked_until = NULL, last_error = $2, updated_at = NOW() WHERE id = $1`,
+            [job.id, error]
+        );
+        return 'failed';
+    }
+    await query(
+        `UPDATE reminder_jobs
+         SET locked_until = LOCALTIMESTAMP + make_interval(secs => $2::int), last_error = $3, updated_at = NOW()
+         WHERE id = $1`,
+        [job.id, RETRY_BASE_SECONDS * 2 ** (job.attempts - 1), error]
+    );
+    return 'retried';
+}
+
+// Returns an error message when nothing could be delivered for a retryable reason
+async function sendReminder(job: ClaimedReminder): Promise<string | null> {
+    const payload = buildNotificationPayload({
+        title: 'Recordatorio de Cita - Dra. Mara Flamini',
+        body: `Hola ${job.first_name}, tienes una cita el ${job.appointment_date} a las ${job.appointment_time}`,
+        type: 'appointment_reminder',
+        data: { appointmentId: job.appointment_id }
+    });
+
+    const summary = await fanOutPush(activeSubscriptions({ patientId: job.patient_id }), payload);
+    // Gone endpoints were deactivated; only transient failures with no delivery are retried
+    if (summary.sent === 0 && summary.failed > summary.expired) {
+        return `${summary.failed - summary.expired} deliveries failed`;
+    }
+    return null;
+}
+
+export async function runReminderJobs({
+    leadHours = DEFAULT_LEAD_HOURS,
+    batchSize = DEFAULT_BATCH_SIZE,
+    maxBatches = DEFAULT_MAX_BATCHES
+}: ReminderRunOptions = {}): Promise<ReminderRunSummary> {
+    const summary: ReminderRunSummary = { enqueued: 0, sent: 0, skipped: 0, retried: 0, failed: 0 };
+    if (!configureWebPush()) {
+        throw new Error('Push notifications not configured. VAPID keys missing.');
+    }
+
+    summary.enqueued = await enqueueReminderJobs(leadHours);
+    await releaseExpiredClaims();
+
+    for (let batch = 0; batch < maxBatches; batch++) {
+        const jobs = await claimReminderJobs(batchSize, leadHours);
+        const done: number[] = [];
+        const skipped: number[] = [];
+
+        await Promise.all(jobs.map(async (job) => {
+            if (!job.still_due) {
+                skipped.push(job.id);
+                return;
+            }
+            let error: string | null;
+            try {
+                error = await sendReminder(job);
+            } catch (sendError) {
+                error = sendError instanceof Error ? sendError.message : String(sendError);
+            }
+            if (error === null) {
+                done.push(job.id);
+            } else {
+                console.error(`Reminder job ${job.id} failed:`, error);
+                const outcome = await failJob(job, error);
+                summary[outcome]++;
+            }
+        }));
+
+        await finishJobs(done, 'done');
+        await finishJobs(skipped, 'skipped');
+        summary.sent += done.length;
+        summary.skipped += skipped.length;
+
+        if (jobs.length < batchSize) {
+            break;
+        }
+    }
+
+    return summary;
+}
@@ -0,0 +1,9 @@
+import { createHash, timingSafeEqual } from 'crypto';
+
+// Constant-time comparison for bearer tokens and shared secrets. Both sides are
+// hashed first so timingSafeEqual gets equal-length buffers and the length of the
+// expected value does not leak either.
+export function tokensMatch(provided: string, expected: string): boolean {
+    const digest = (value: string) => createHash('sha256').update(value).digest();
+    return timingSafeEqual(digest(provided), digest(expected));
+}
@@ -0,0 +1,126 @@
+// Per-day slot bitmap: one bit per minute of the day, set where a free slot starts.
+// Slots step SLOT_INTERVAL_MINUTES from the start of their work window (a window
+// opening at 09:10 yields 09:10, 09:30, ...). Windows are unioned in, booked times
+// clear every slot they overlap and the remaining bits are the free slots.
+
+export const SLOT_INTERVAL_MINUTES = 20;
+
+const MINUTES_PER_DAY = 24 * 60;
+
+export interface TimeWindow {
+    start_time: string;
+    end_time: string;
+}
+
+/**
+ * Parse "HH:MM" or "HH:MM:SS" to minutes since midnight
+ * @returns Minutes since midnight, or null if the value is not a time
+ */
+export function timeToMinutes(time: string): number | null {
+    const match = /^(\d{1,2}):(\d{2})/.exec(String(time));
+    if (!match) {
+        return null;
+    }
+
+    const minutes = Number(match[1]) * 60 + Number(match[2]);
+    return minutes <= MINUTES_PER_DAY ? minutes : null;
+}
+
+export function minutesToTime(minutes: number): string {
+    const hour = Math.floor(minutes / 60);
+    const min = minutes % 60;
+    return `${hour.toString().padStart(2, '0')}:${min.toString().padStart(2, '0')}`;
+}
+
+export class SlotBitmap {
+    private words = new Uint32Array(Math.ceil(MINUTES_PER_DAY / 32));
+
+    /**
+     * Mark the slots of a work window as free: one every SLOT_INTERVAL_MINUTES from
+     * `start`, as long as the slot ends by `end`
+     */
+    addWindow(start: string, end: string): this {
+        const startMinutes = timeToMinutes(start);
+        const endMinutes = timeToMinutes(end);
+        if (startMinutes === null || endMinutes === null) {
+            return this;
+        }
+
+        for (let minute = startMinutes; minute + SLOT_INTERVAL_MINUTES <= endMinutes; minute += SLOT_INTERVAL_MINUTES) {
+            this.words[minute >>> 5] |= 1 << (minute & 31);
+        }
+        return this;
+    }
+
+    /**
+     * Clear every slot that overlaps [start, end)
+     */
+    removeWindow(start: string, end: string): this {
+        const startMinutes = timeToMinutes(start);
+        const endMinutes = timeToMinutes(end);
+        if (startMinutes === null || endMinutes === null) {
+            return this;
+        }
+        this.clearOverlapping(startMinutes, endMinutes);
+        return this;
+    }
+
+    /**
+     * Clear the slot(s) taken by an appointment starting at `time`
+     */
+    book(time: string): this {
+        const startMinutes = timeToMinutes(time);
+        if (startMinutes === null) {
+            return this;
+        }
+        this.clearOverlapping(startMinutes, startMinutes + SLOT_INTERVAL_MINUTES);
+        return this;
+    }
+
+    isFree(time: string): boolean {
+        const minute = timeToMinutes(time);
+        if (minute === null || minute >= MINUTES_PER_DAY) {
+            return false;
+        }
+        return (this.words[minute >>> 5] & (1 << (minute & 31))) !== 0;
+    }
+
+    /**
+     * Free slots as sorted "HH:MM" strings
+     */
+    toTimes(): string[] {
+        const times: string[] = [];
+        for (let word = 0; word < this.words.length; word++) {
+            let bits = this.words[word];
+            while (bits !== 0) {
+                const bit = 31 - Math.clz32(bits & -bits);
+                times.push(minutesToTime(word * 32 + bit));
+                bits &= bits - 1;
+            }
+        }
+        return times;
+    }
+
+    // A slot starting at s overlaps [start, end) when start - SLOT_INTERVAL_MINUTES < s < end
+    private clearOverlapping(startMinutes: number, endMinutes: number): void {
+        const first = Math.max(startMinutes - SLOT_INTERVAL_MINUTES + 1, 0);
+        const last = Math.min(endMinutes, MINUTES_PER_DAY);
+        for (let minute = first; minute < last; minute++) {
+            this.words[minute >>> 5] &= ~(1 << (minute & 31));
+        }
+    }
+}
+
+/**
+ * Free slots of a day: the union of its work windows minus booked times
+ */
+export function computeFreeSlots(windows: TimeWindow[], bookedTimes: string[] = []): string[] {
+    const bitmap = new SlotBitmap();
+    for (const workWindow of windows) {
+        bitmap.addWindow(workWindow.start_time, workWindow.end_time);
+    }
+    for (const time of bookedTimes) {
+        bitmap.book(time);
+    }
+    return bitmap.toTimes();
+}
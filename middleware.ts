@@ -1,8 +1,45 @@
 import { NextResponse } from 'next/server'
 import type { NextRequest } from 'next/server'
 import { verifyToken } from '@/lib/auth-edge'
+import {
+  RateLimiter,
+  RouteRateLimitPolicy,
+  createRateLimitResponse,
+  findRateLimitPolicy,
+  getClientIP,
+  setRateLimitHeaders
+} from '@/lib/rate-limit'
 
-export function middleware(request: NextRequest) {
+// Per-IP limits for public endpoints, checked before a request can reach Postgres.
+// First match wins. /api/auth/login is limited in its route through the shared store.
+const RATE_LIMIT_POLICIES: RouteRateLimitPolicy[] = [
+  // Booking: small bursts, then about one booking per minute
+  { name: 'book', pattern: /^\/api\/appointments\/create$/, methods: ['POST'], limit: 10, windowMs: 10 * 60000, policy: 'token-bucket' },
+  { name: 'cancel', pattern: /^\/api\/cancel-appointment(\/verify)?$/, limit: 20, windowMs: 60000, policy: 'sliding-window' },
+  { name: 'availability', pattern: /^\/api\/available-times(\/|$)/, methods: ['GET'], limit: 120, windowMs: 60000, policy: 'sliding-window' },
+  { name: 'booking-options', pattern: /^\/api\/(booking-options|health-insurance|visit-types|consult-types|practice-types)$/, methods: ['GET'], limit: 60, windowMs: 60000, policy: 'sliding-window' },
+  { name: 'public-api', pattern: /^\/api\/(appointments|patients)(\/|$)/, limit: 300, windowMs: 60000, policy: 'sliding-window' }
+]
+
+const routeLimiter = new RateLimiter({ maxKeys: 50000 })
+
+export async function middleware(request: NextRequest) {
+  const policy = findRateLimitPolicy(RATE_LIMIT_POLICIES, request.nextUrl.pathname, request.method)
+  if (!policy) {
+    return authorize(request)
+  }
+
+  const result = routeLimiter.check(`${policy.name}:${getClientIP(request)}`, policy)
+  if (!result.success) {
+    return createRateLimitResponse(result.remaining, result.resetTime, result.limit)
+  }
+
+  const response = await authorize(request)
+  setRateLimitHeaders(response.headers, result)
+  return response
+}
+
+async function authorize(request: NextRequest) {
   const { pathname } = request.nextUrl
 
   // Protect admin routes - but allow /admin to load for authentication
@@ -14,7 +51,7 @@ export function middleware(request: NextRequest) {
       return NextResponse.next()
     }
 
-    const decoded = verifyToken(token)
+    const decoded = await verifyToken(token)
     if (!decoded) {
       // Clear invalid token but still allow page to load
       const response = NextResponse.next()
@@ -44,7 +81,7 @@ export function middleware(request: NextRequest) {
       )
     }
 
-    const decoded = verifyToken(token)
+    const decoded = await verifyToken(token)
     if (!decoded) {
       return NextResponse.json(
         { error: 'Unauthorized - Invalid token' },
@@ -73,7 +110,7 @@ export function middleware(request: NextRequest) {
         )
       }
 
-      const decoded = verifyToken(token)
+      const decoded = await verifyToken(token)
       if (!decoded || decoded.role !== 'admin') {
         return NextResponse.json(
           { error: 'Unauthorized - Admin role required' },
@@ -92,6 +129,13 @@ export const config = {
     '/admin/:path*',
     '/api/admin/:path*',
     '/api/appointments/:path*',
-    '/api/patients/:path*'
+    '/api/patients/:path*',
+    '/api/available-times/:path*',
+    '/api/cancel-appointment/:path*',
+    '/api/booking-options',
+    '/api/health-insurance',
+    '/api/visit-types',
+    '/api/consult-types',
+    '/api/practice-types'
   ]
 }
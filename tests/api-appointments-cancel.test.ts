@@ -0,0 +1,120 @@
+import { describe, it, expect, beforeEach, vi } from 'vitest';
+import { NextRequest } from 'next/server';
+import { query, transaction } from '@/lib/db';
+import { POST as cancelByToken } from '@/app/api/cancel-appointment/route';
+import { DELETE as cancelById } from '@/app/api/appointments/[id]/route';
+import { verifyCancellationToken, isCancellationAllowed } from '@/lib/cancellation-token';
+import { enqueueAppointmentNotice, scheduleOutboxDispatch } from '@/lib/push-outbox';
+import { cancelAppointment } from '@/lib/actions';
+
+// Mock the database: transaction() hands the callback a fake client
+vi.mock('@/lib/db', () => ({
+  query: vi.fn(),
+  transaction: vi.fn()
+}));
+
+vi.mock('@/lib/cancellation-token', () => ({
+  verifyCancellationToken: vi.fn(),
+  isCancellationAllowed: vi.fn()
+}));
+
+vi.mock('@/lib/push-outbox', () => ({
+  enqueueAppointmentNotice: vi.fn(),
+  scheduleOutboxDispatch: vi.fn()
+}));
+
+const appointmentId = '6f1c1f0e-7a52-4c8e-9a51-0f3c8a1b2c3d';
+
+const cancelledRow = {
+  id: appointmentId,
+  status: 'cancelled',
+  patient_id: 7,
+  appointment_date: '2030-01-09',
+  notice_date: '2030-01-09',
+  notice_time: '10:20'
+};
+
+function mockClient(rows: any[] = [cancelledRow]) {
+  const client = { query: vi.fn().mockResolvedValue({ rows, rowCount: rows.length }) };
+  vi.mocked(transaction).mockImplementation(async (callback: any) => callback(client));
+  return client;
+}
+
+// Every cancellation path shares one statement. appointment_time is a TEXT 'HH:MM'
+// column, so it is sliced rather than formatted as a time.
+function expectCancelledWithNotice(client: { query: any }) {
+  expect(client.query).toHaveBeenCalledTimes(1);
+  const [text, params] = client.query.mock.calls[0];
+  expect(text).toContain("SET status = 'cancelled'");
+  expect(text).toContain("status <> 'cancelled'");
+  expect(text).toContain('left(appointment_time::text, 5) AS notice_time');
+  expect(text).not.toContain('to_char');
+  expect(params).toEqual([appointmentId]);
+  expect(enqueueAppointmentNotice).toHaveBeenCalledWith(client, 'cancellation', {
+    id: appointmentId,
+    patient_id: 7,
+    date: '2030-01-09',
+    time: '10:20'
+  });
+  expect(scheduleOutboxDispatch).toHaveBeenCalledTimes(1);
+}
+
+describe('Appointment cancellation', () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+  });
+
+  it('should cancel by token and queue the notice in one transaction', async () => {
+    const client = mockClient();
+    vi.mocked(verifyCancellationToken).mockReturnValue({ appointmentId } as any);
+    vi.mocked(isCancellationAllowed).mockReturnValue(true);
+
+    const response = await cancelByToken(new NextRequest('http://localhost:3000/api/cancel-appointment', {
+      method: 'POST',
+      body: JSON.stringify({ token: 'signed-token' })
+    }));
+
+    expect(response.status).toBe(200);
+    expectCancelledWithNotice(client);
+  });
+
+  it('should cancel by id and queue the notice in one transaction', async () => {
+    const client = mockClient();
+    vi.mocked(query).mockResolvedValueOnce({
+      rows: [{ id: appointmentId, status: 'scheduled', appointment_date: '2030-01-09' }]
+    } as any);
+
+    const response = await cancelById(
+      new NextRequest(`http://localhost:3000/api/appointments/${appointmentId}`, { method: 'DELETE' }),
+      { params: Promise.resolve({ id: appointmentId }) }
+    );
+
+    expect(response.status).toBe(200);
+    expectCancelledWithNotice(client);
+  });
+
+  it('should cancel from the server action through the same transaction', async () => {
+    const client = mockClient();
+
+    const cancelled = await cancelAppointment(appointmentId);
+
+    expect(cancelled.id).toBe(appointmentId);
+    expect(cancelled).not.toHaveProperty('notice_time');
+    expectCancelledWithNotice(client);
+  });
+
+  it('should not queue a notice for an appointment that is already cancelled', async () => {
+    mockClient([]);
+    vi.mocked(verifyCancellationToken).mockReturnValue({ appointmentId } as any);
+    vi.mocked(isCancellationAllowed).mockReturnValue(true);
+
+    const response = await cancelByToken(new NextRequest('http://localhost:3000/api/cancel-appointment', {
+      method: 'POST',
+      body: JSON.stringify({ token: 'signed-token' })
+    }));
+
+    expect(response.status).toBe(404);
+    expect(enqueueAppointmentNotice).not.toHaveBeenCalled();
+    expect(scheduleOutboxDispatch).not.toHaveBeenCalled();
+  });
+});
@@ -0,0 +1,154 @@
+import { describe, it, expect, beforeEach, vi } from 'vitest';
+import { NextRequest } from 'next/server';
+import { query, transaction } from '@/lib/db';
+import { POST } from '@/app/api/appointments/create/route';
+import { verifyCancellationToken } from '@/lib/cancellation-token';
+
+// Mock the database: transaction() hands the callback a fake client
+vi.mock('@/lib/db', () => ({
+  query: vi.fn(),
+  transaction: vi.fn()
+}));
+
+vi.mock('web-push', () => ({
+  default: {
+    setVapidDetails: vi.fn(),
+    sendNotification: vi.fn()
+  }
+}));
+
+const newAppointment = {
+  first_name: 'Ana',
+  last_name: 'Perez',
+  phone_number: '1122334455',
+  visit_type_id: 1,
+  consult_type_id: 2,
+  practice_type_id: 0,
+  health_insurance: 'OSDE',
+  appointment_date: '2030-01-08',
+  appointment_time: '09:20'
+};
+
+function createRequest(body: any) {
+  return new NextRequest('http://localhost:3000/api/appointments/create', {
+    method: 'POST',
+    body: JSON.stringify(body)
+  });
+}
+
+function mockClient(responses: any[]) {
+  const client = { query: vi.fn() };
+  for (const response of responses) {
+    client.query.mockResolvedValueOnce(response);
+  }
+  return client;
+}
+
+describe('POST /api/appointments/create', () => {
+  let mockTransaction: any;
+
+  beforeEach(() => {
+    mockTransaction = vi.mocked(transaction);
+    vi.clearAllMocks();
+    // The confirmation push is only queued when web push is configured
+    process.env.NEXT_PUBLIC_VAPID_PUBLIC_KEY = 'public-key';
+    process.env.VAPID_PRIVATE_KEY = 'private-key';
+    // The post-commit dispatch finds an empty outbox
+    vi.mocked(query).mockResolvedValue({ rows: [], rowCount: 0 } as any);
+  });
+
+  it('should book the patient, slot and token inside one transaction', async () => {
+    const client = mockClient([
+      { rows: [{ id: 7, inserted: false }] },
+      {
+        rows: [{
+          id: 42,
+          patient_id: 7,
+          patient_first_name: 'Ana',
+          patient_last_name: 'Perez',
+          phone_number: '1122334455',
+          appointment_date: '2030-01-08',
+          appointment_time: '09:20',
+          status: 'scheduled',
+          visit_type_name: 'Consulta',
+          consult_type_name: null,
+          practice_type_name: 'Control',
+          health_insurance: 'OSDE',
+          cancellation_token: 'final-token'
+        }]
+      },
+      { rows: [], rowCount: 1 }
+    ]);
+    mockTransaction.mockImplementation((callback: any) => callback(client));
+
+    const response = await POST(createRequest(newAppointment));
+    const data = await response.json();
+
+    expect(response.status).toBe(200);
+    expect(mockTransaction).toHaveBeenCalledTimes(1);
+    // Patient upsert, a single insert that already carries the final token,
+    // then the confirmation push queued in the same transaction
+    expect(client.query).toHaveBeenCalledTimes(3);
+    expect(client.query.mock.calls[0][0]).toContain('ON CONFLICT (phone_number)');
+    expect(client.query.mock.calls[1][0]).not.toContain('UPDATE appointments');
+    expect(client.query.mock.calls[2][0]).toContain('INSERT INTO push_outbox');
+    expect(client.query.mock.calls[2][1][1]).toBe(7);
+
+    const insertParams = client.query.mock.calls[1][1];
+    // practice_type_id 0 is a real id, not a missing one
+    expect(insertParams[6]).toBe(0);
+    const token = verifyCancellationToken(insertParams[8]);
+    expect(token?.appointmentId).toBe(insertParams[0]);
+    expect(data.is_existing_patient).toBe(true);
+    expect(data.appointment_info).toMatchObject({
+      id: 42,
+      patient_id: 7,
+      patient_name: 'Ana Perez',
+      visit_type_name: 'Consulta',
+      cancellation_token: 'final-token'
+    });
+  });
+
+  it('should return 409 when the slot index rejects a double booking', async () => {
+    mockTransaction.mockRejectedValueOnce(
+      Object.assign(new Error('duplicate key value violates unique constraint "uniq_appointments_active_slot"'), {
+        code: '23505',
+        constraint: 'uniq_appointments_active_slot'
+      })
+    );
+
+    const response = await POST(createRequest(newAppointment));
+    const data = await response.json();
+
+    expect(response.status).toBe(409);
+    expect(data.error).toBe('This time slot is already booked');
+  });
+
+  it('should return 500 for unique violations on other constraints', async () => {
+    mockTransaction.mockRejectedValueOnce(
+      Object.assign(new Error('duplicate key value violates unique constraint "appointments_pkey"'), {
+        code: '23505',
+        constraint: 'appointments_pkey'
+      })
+    );
+
+    const response = await POST(createRequest(newAppointment));
+
+    expect(response.status).toBe(500);
+  });
+
+  it('should return 500 for other database errors', async () => {
+    mockTransaction.mockRejectedValueOnce(new Error('connection terminated'));
+
+    const response = await POST(createRequest(newAppointment));
+
+    expect(response.status).toBe(500);
+  });
+
+  it('should reject missing patient information without opening a transaction', async () => {
+    const response = await POST(createRequest({ ...newAppointment, phone_number: '' }));
+
+    expect(response.status).toBe(400);
+    expect(mockTransaction).not.toHaveBeenCalled();
+  });
+});
@@ -0,0 +1,98 @@
+import { describe, it, expect, beforeEach, vi } from 'vitest';
+import { NextRequest } from 'next/server';
+import { query } from '@/lib/db';
+import { GET } from '@/app/api/appointments/route';
+import { cursorDate, cursorTime, cursorUuid, decodeCursor, encodeCursor } from '@/lib/pagination';
+
+// Mock the database query function
+vi.mock('@/lib/db', () => ({
+  query: vi.fn(),
+  transaction: vi.fn()
+}));
+
+function createRequest(search: string = '') {
+  return new NextRequest(`http://localhost:3000/api/appointments${search}`);
+}
+
+// appointments.id is a UUID, and cursors are checked for one
+const A1 = '0b7e6a52-5f1c-4d1e-9a3b-1c2d3e4f5a01';
+const A2 = '0b7e6a52-5f1c-4d1e-9a3b-1c2d3e4f5a02';
+const A3 = '0b7e6a52-5f1c-4d1e-9a3b-1c2d3e4f5a03';
+
+function createAppointmentRow(id: string, time: string) {
+  return {
+    id,
+    patient_id: 7,
+    appointment_date: '2030-01-08',
+    appointment_time: time,
+    status: 'scheduled',
+    patient_first_name: 'Ana',
+    patient_last_name: 'Perez'
+  };
+}
+
+describe('GET /api/appointments', () => {
+  let mockQuery: any;
+
+  beforeEach(() => {
+    mockQuery = vi.mocked(query);
+    vi.clearAllMocks();
+  });
+
+  it('should return one page and a cursor for the next one', async () => {
+    mockQuery.mockResolvedValueOnce({
+      rows: [createAppointmentRow(A1, '09:00'), createAppointmentRow(A2, '09:20'), createAppointmentRow(A3, '09:40')]
+    });
+
+    const response = await GET(createRequest('?limit=2'));
+    const data = await response.json();
+
+    expect(response.status).toBe(200);
+    expect(data.appointments.map((row: any) => row.id)).toEqual([A1, A2]);
+    expect(data.has_more).toBe(true);
+    expect(decodeCursor(data.next_cursor, [cursorDate, cursorTime, cursorUuid])).toEqual(['2030-01-08', '09:20', A2]);
+    expect(data.count).toBeUndefined();
+
+    // Fetches one extra row to detect the next page, and no COUNT(*)
+    expect(mockQuery).toHaveBeenCalledTimes(1);
+    expect(mockQuery.mock.calls[0][1]).toEqual([3]);
+  });
+
+  it('should continue after the cursor with filters applied', async () => {
+    mockQuery.mockResolvedValueOnce({ rows: [createAppointmentRow(A3, '09:40')] });
+    const cursor = encodeCursor(['2030-01-08', '09:20', A2]);
+
+    const response = await GET(createRequest(`?from=2030-01-01&to=2030-01-31&status=scheduled,completed&patient_id=7&cursor=${cursor}`));
+    const data = await response.json();
+
+    expect(data.has_more).toBe(false);
+    expect(data.next_cursor).toBeNull();
+
+    const [sql, params] = mockQuery.mock.calls[0];
+    expect(sql).toContain('(a.appointment_date, a.appointment_time, a.id) > ($5, $6, $7)');
+    expect(params).toEqual(['2030-01-01', '2030-01-31', ['scheduled', 'completed'], 7, '2030-01-08', '09:20', A2, 51]);
+  });
+
+  it('should compute the total only when count is requested', async () => {
+    mockQuery
+      .mockResolvedValueOnce({ rows: [createAppointmentRow(A1, '09:00')] })
+      .mockResolvedValueOnce({ rows: [{ count: 12 }] });
+
+    const response = await GET(createRequest('?status=scheduled&count=true'));
+    const data = await response.json();
+
+    expect(data.count).toBe(12);
+    const [countSql, countParams] = mockQuery.mock.calls[1];
+    expect(countSql).toContain('COUNT(*)');
+    expect(countParams).toEqual([['scheduled']]);
+  });
+
+  it('should reject malformed parameters', async () => {
+    const badCursor = encodeCursor(['x', 'y', 'z']);
+    for (const search of ['?limit=0', '?from=08-01-2030', '?patient_id=abc', '?cursor=not-a-cursor', `?cursor=${badCursor}`]) {
+      const response = await GET(createRequest(search));
+      expect(response.status).toBe(400);
+    }
+    expect(mockQuery).not.toHaveBeenCalled();
+  });
+});
@@ -0,0 +1,112 @@
+import { describe, it, expect, beforeEach, afterEach, vi } from 'vitest';
+import { NextRequest } from 'next/server';
+import { query } from '@/lib/db';
+import { POST } from '@/app/api/appointments/route';
+
+// Mock the database query function
+vi.mock('@/lib/db', () => ({
+  query: vi.fn(),
+  transaction: vi.fn()
+}));
+
+function createRequest(body: any) {
+  return new NextRequest('http://localhost:3000/api/appointments', {
+    method: 'POST',
+    body: JSON.stringify(body)
+  });
+}
+
+const lookupRow = {
+  visit_types: [{ id: 1, name: 'Consulta' }, { id: 2, name: 'Practica' }],
+  consult_types: [{ id: 3, name: 'Primera vez' }],
+  practice_types: [{ id: 4, name: 'Control' }]
+};
+
+// The lookup cache expires only by its five minute TTL, so each test moves the clock past it
+let clock = Date.now();
+function expireLookupTables() {
+  clock += 6 * 60 * 1000;
+  vi.setSystemTime(clock);
+}
+
+// Route each statement by its SQL; the lookup tables load in one statement
+function mockDatabase() {
+  vi.mocked(query).mockImplementation(async (text: string, params?: any[]) => {
+    if (text.includes('json_agg')) {
+      return { rows: [lookupRow] } as any;
+    }
+    if (text.includes('FROM patients WHERE id')) {
+      return { rows: [{ id: 7, phone_number: '1122334455' }] } as any;
+    }
+    if (text.includes('SELECT id FROM appointments')) {
+      return { rows: [] } as any;
+    }
+    if (text.includes('INSERT INTO appointments')) {
+      return {
+        rowCount: 1,
+        rows: [{
+          id: params?.[0],
+          patient_name: 'Perez, Ana',
+          consult_type_id: params?.[4],
+          visit_type_id: params?.[5],
+          practice_type_id: params?.[6]
+        }]
+      } as any;
+    }
+    return { rows: [] } as any;
+  });
+}
+
+describe('POST /api/appointments', () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+    vi.useFakeTimers({ toFake: ['Date'] });
+    expireLookupTables();
+    mockDatabase();
+  });
+
+  afterEach(() => {
+    vi.useRealTimers();
+  });
+
+  it('should resolve type names and shape the response from the lookup cache', async () => {
+    const body = {
+      patient_id: 7,
+      date: '2030-01-08',
+      time: '09:20',
+      visit_type: 'Practica',
+      consult_type: 'Primera vez',
+      practice_type: 'Control'
+    };
+
+    const first = await POST(createRequest(body));
+    const data = await first.json();
+
+    expect(first.status).toBe(201);
+    expect(data.appointment).toMatchObject({
+      visit_type_name: 'Practica',
+      consult_type_name: 'Primera vez',
+      practice_type_name: 'Control'
+    });
+
+    const insertParams = vi.mocked(query).mock.calls.find(([text]) => text.includes('INSERT INTO appointments'))?.[1];
+    expect(insertParams?.slice(4, 7)).toEqual([3, 2, 4]);
+
+    // A second booking reuses the cached tables: no further lookup queries
+    await POST(createRequest({ ...body, time: '09:40' }));
+    const lookupQueries = vi.mocked(query).mock.calls.filter(([text]) => text.includes('json_agg'));
+    expect(lookupQueries).toHaveLength(1);
+    expect(vi.mocked(query).mock.calls.filter(([text]) => text.includes('FROM visit_types WHERE name'))).toHaveLength(0);
+  });
+
+  it('should return 404 for an unknown visit type name', async () => {
+    const response = await POST(createRequest({
+      patient_id: 7,
+      date: '2030-01-08',
+      time: '09:20',
+      visit_type: 'Desconocido'
+    }));
+
+    expect(response.status).toBe(404);
+  });
+});
@@ -1,6 +1,7 @@
 import { describe, it, expect, beforeEach, afterEach, vi } from 'vitest';
 import { GET } from '@/app/api/available-times/[date]/route';
 import { query } from '@/lib/db';
+import { invalidateAllAvailability } from '@/lib/availability';
 
 // Mock the database query function
 vi.mock('@/lib/db', () => ({
@@ -21,44 +22,42 @@ function createTestDates(count: number = 100) {
   return dates;
 }
 
-// Helper function to create mock database responses
-function createMockWorkSchedule(dayOfWeek: number, isWorkingDay: boolean = true) {
+// Helper function to create the single-row response of the availability query
+function createMockDay({
+  isWorkingDay = true,
+  isDayOff = false,
+  defaultWindows = [{ start_time: '09:00:00', end_time: '10:00:00' }],
+  customWindows = null,
+  customIsWorkingDay = null,
+  bookedTimes = []
+}: {
+  isWorkingDay?: boolean | null;
+  isDayOff?: boolean;
+  defaultWindows?: { start_time: string; end_time: string }[] | null;
+  customWindows?: { start_time: string; end_time: string }[] | null;
+  customIsWorkingDay?: boolean | null;
+  bookedTimes?: string[];
+} = {}) {
   return {
     rows: [{
-      start_time: '09:00',
-      end_time: '17:00',
+      date: '2024-01-01',
       is_working_day: isWorkingDay,
-      day_of_week: dayOfWeek
+      is_day_off: isDayOff,
+      default_windows: defaultWindows,
+      custom_windows: customWindows,
+      custom_is_working_day: customIsWorkingDay,
+      booked_times: bookedTimes
     }]
   };
 }
 
-function createMockUnavailableTimeFrames(date: string) {
-  return {
-    rows: [{
-      is_working_day: true,
-      start_time: '09:00',
-      end_time: '17:00',
-      is_confirmed: false
-    }]
-  };
-}
-
-function createMockAppointments(date: string, times: string[] = []) {
-  return {
-    rows: times.map(time => ({
-      appointment_date: date,
-      appointment_time: time
-    }))
-  };
-}
-
 describe('Available Times API Comprehensive Tests', () => {
   let mockQuery: any;
 
   beforeEach(() => {
     mockQuery = vi.mocked(query);
     vi.clearAllMocks();
+    invalidateAllAvailability();
   });
 
   afterEach(() => {
@@ -68,33 +67,57 @@ describe('Available Times API Comprehensive Tests', () => {
   describe('Default Schedule Tests', () => {
     it('should return available slots for Monday', async () => {
       const date = '2024-01-01'; // Monday
-      const dayOfWeek = 1;
-      
-      mockQuery
-        .mockResolvedValueOnce(createMockUnavailableTimeFrames(date)) // No custom schedule
-        .mockResolvedValueOnce(createMockWorkSchedule(dayOfWeek)) // Default schedule
-        .mockResolvedValueOnce(createMockAppointments(date)); // No appointments
+
+      mockQuery.mockResolvedValueOnce(createMockDay({
+        defaultWindows: [{ start_time: '09:00:00', end_time: '10:20:00' }]
+      }));
 
       const request = new Request('http://localhost:3000/api/available-times/2024-01-01');
-      const response = await GET(request, { params: Promise.resolve({ date }) });
+      const response = await GET(request as any, { params: Promise.resolve({ date }) });
       const data = await response.json();
 
       expect(response.status).toBe(200);
-      expect(data.type).toBe('default_schedule');
-      expect(data.availableSlots).toBeDefined();
-      expect(data.appointmentTimes).toEqual([]);
+      expect(data).toEqual(['09:00', '09:20', '09:40', '10:00']);
+    });
+
+    it('should return slots from every work window of the day', async () => {
+      const date = '2024-01-01'; // Monday: 09-12 and 13-17 in the seed schedule
+
+      mockQuery.mockResolvedValueOnce(createMockDay({
+        defaultWindows: [
+          { start_time: '09:00:00', end_time: '10:00:00' },
+          { start_time: '13:00:00', end_time: '14:00:00' }
+        ],
+        bookedTimes: ['09:20', '13:40']
+      }));
+
+      const request = new Request('http://localhost:3000/api/available-times/2024-01-01');
+      const response = await GET(request as any, { params: Promise.resolve({ date }) });
+      const data = await response.json();
+
+      expect(response.status).toBe(200);
+      expect(data).toEqual(['09:00', '09:40', '13:00', '13:20']);
+    });
+
+    it('should resolve everything in a single query', async () => {
+      const date = '2024-01-01';
+
+      mockQuery.mockResolvedValueOnce(createMockDay());
+
+      const request = new Request('http://localhost:3000/api/available-times/2024-01-01');
+      await GET(request as any, { params: Promise.resolve({ date }) });
+
+      expect(mockQuery).toHaveBeenCalledTimes(1);
+      expect(mockQuery.mock.calls[0][1]).toEqual([date, date]);
     });
 
     it('should return available slots for Sunday (non-working day)', async () => {
       const date = '2024-01-07'; // Sunday
-      const dayOfWeek = 0;
-      
-      mockQuery
-        .mockResolvedValueOnce(createMockUnavailableTimeFrames(date)) // No custom schedule
-        .mockResolvedValueOnce(createMockWorkSchedule(dayOfWeek, false)); // Non-working day
+
+      mockQuery.mockResolvedValueOnce(createMockDay({ isWorkingDay: false }));
 
       const request = new Request('http://localhost:3000/api/available-times/2024-01-07');
-      const response = await GET(request, { params: Promise.resolve({ date }) });
+      const response = await GET(request as any, { params: Promise.resolve({ date }) });
       const data = await response.json();
 
       expect(response.status).toBe(404);
@@ -103,38 +126,22 @@ describe('Available Times API Comprehensive Tests', () => {
 
     it('should handle 100+ different dates correctly', async () => {
       const testDates = createTestDates(100);
-      
-      for (const date of testDates) {
-        const dateObj = new Date(date);
+
+      for (const dateObj of testDates) {
+        const date = dateObj.toISOString().split('T')[0];
         const dayOfWeek = dateObj.getDay();
-        
-        // Mock different responses based on day of week
-        if (dayOfWeek === 0) { // Sunday
-          mockQuery
-            .mockResolvedValueOnce(createMockUnavailableTimeFrames(date))
-            .mockResolvedValueOnce(createMockWorkSchedule(dayOfWeek, false));
-        } else if (dayOfWeek === 6) { // Saturday
-          mockQuery
-            .mockResolvedValueOnce(createMockUnavailableTimeFrames(date))
-            .mockResolvedValueOnce(createMockWorkSchedule(dayOfWeek, true))
-            .mockResolvedValueOnce(createMockAppointments(date));
-        } else { // Weekdays
-          mockQuery
-            .mockResolvedValueOnce(createMockUnavailableTimeFrames(date))
-            .mockResolvedValueOnce(createMockWorkSchedule(dayOfWeek, true))
-            .mockResolvedValueOnce(createMockAppointments(date));
-        }
+
+        mockQuery.mockResolvedValueOnce(createMockDay({ isWorkingDay: dayOfWeek !== 0 }));
 
         const request = new Request(`http://localhost:3000/api/available-times/${date}`);
-        const response = await GET(request, { params: Promise.resolve({ date }) });
-        
+        const response = await GET(request as any, { params: Promise.resolve({ date }) });
+
         if (dayOfWeek === 0) {
           expect(response.status).toBe(404);
         } else {
           expect(response.status).toBe(200);
           const data = await response.json();
-          expect(data.type).toBe('default_schedule');
-          expect(data.availableSlots).toBeDefined();
+          expect(Array.isArray(data)).toBe(true);
         }
       }
     });
@@ -143,39 +150,31 @@ describe('Available Times API Comprehensive Tests', () => {
   describe('Custom Schedule Tests', () => {
     it('should return custom schedule when available', async () => {
       const date = '2024-01-01';
-      
-      mockQuery.mockResolvedValueOnce({
-        rows: [{
-          is_working_day: true,
-          start_time: '10:00',
-          end_time: '16:00',
-          is_confirmed: false
-        }]
-      });
+
+      mockQuery.mockResolvedValueOnce(createMockDay({
+        customWindows: [{ start_time: '10:00:00', end_time: '11:00:00' }],
+        customIsWorkingDay: true
+      }));
 
       const request = new Request('http://localhost:3000/api/available-times/2024-01-01');
-      const response = await GET(request, { params: Promise.resolve({ date }) });
+      const response = await GET(request as any, { params: Promise.resolve({ date }) });
       const data = await response.json();
 
       expect(response.status).toBe(200);
-      expect(data.type).toBe('custom_schedule');
-      expect(data.availableSlots).toBeDefined();
+      expect(data).toEqual(['10:00', '10:20', '10:40']);
     });
 
     it('should return unavailable when custom schedule is confirmed', async () => {
       const date = '2024-01-01';
-      
-      mockQuery.mockResolvedValueOnce({
-        rows: [{
-          is_working_day: true,
-          start_time: '10:00',
-          end_time: '16:00',
-          is_confirmed: true
-        }]
-      });
+
+      mockQuery.mockResolvedValueOnce(createMockDay({
+        customWindows: [{ start_time: '10:00:00', end_time: '16:00:00' }],
+        customIsWorkingDay: true,
+        isDayOff: true
+      }));
 
       const request = new Request('http://localhost:3000/api/available-times/2024-01-01');
-      const response = await GET(request, { params: Promise.resolve({ date }) });
+      const response = await GET(request as any, { params: Promise.resolve({ date }) });
       const data = await response.json();
 
       expect(response.status).toBe(404);
@@ -185,18 +184,14 @@ describe('Available Times API Comprehensive Tests', () => {
 
     it('should return unavailable when custom schedule is not a working day', async () => {
       const date = '2024-01-01';
-      
-      mockQuery.mockResolvedValueOnce({
-        rows: [{
-          is_working_day: false,
-          start_time: '10:00',
-          end_time: '16:00',
-          is_confirmed: false
-        }]
-      });
+
+      mockQuery.mockResolvedValueOnce(createMockDay({
+        customWindows: [{ start_time: '10:00:00', end_time: '16:00:00' }],
+        customIsWorkingDay: false
+      }));
 
       const request = new Request('http://localhost:3000/api/available-times/2024-01-01');
-      const response = await GET(request, { params: Promise.resolve({ date }) });
+      const response = await GET(request as any, { params: Promise.resolve({ date }) });
       const data = await response.json();
 
       expect(response.status).toBe(404);
@@ -206,49 +201,42 @@ describe('Available Times API Comprehensive Tests', () => {
   });
 
   describe('Appointment Integration Tests', () => {
-    it('should return existing appointments for the date', async () => {
+    it('should return only the slots left free by existing appointments', async () => {
       const date = '2024-01-01';
-      const appointmentTimes = ['10:00', '14:00', '16:00'];
-      
-      mockQuery
-        .mockResolvedValueOnce(createMockUnavailableTimeFrames(date))
-        .mockResolvedValueOnce(createMockWorkSchedule(1, true))
-        .mockResolvedValueOnce(createMockAppointments(date, appointmentTimes));
+
+      mockQuery.mockResolvedValueOnce(createMockDay({
+        defaultWindows: [{ start_time: '09:00:00', end_time: '10:40:00' }],
+        bookedTimes: ['09:20', '10:00']
+      }));
 
       const request = new Request('http://localhost:3000/api/available-times/2024-01-01');
-      const response = await GET(request, { params: Promise.resolve({ date }) });
+      const response = await GET(request as any, { params: Promise.resolve({ date }) });
       const data = await response.json();
 
       expect(response.status).toBe(200);
-      expect(data.appointmentTimes).toEqual(appointmentTimes);
+      expect(data).toEqual(['09:00', '09:40', '10:20']);
     });
 
-    it('should handle dates with many appointments', async () => {
+    it('should handle fully booked dates', async () => {
       const date = '2024-01-01';
-      const appointmentTimes = Array.from({ length: 20 }, (_, i) => 
-        `${9 + Math.floor(i / 3)}:${(i % 3) * 20 === 0 ? '00' : (i % 3) * 20}`
-      );
-      
-      mockQuery
-        .mockResolvedValueOnce(createMockUnavailableTimeFrames(date))
-        .mockResolvedValueOnce(createMockWorkSchedule(1, true))
-        .mockResolvedValueOnce(createMockAppointments(date, appointmentTimes));
+
+      mockQuery.mockResolvedValueOnce(createMockDay({ bookedTimes: ['09:00', '09:20', '09:40'] }));
 
       const request = new Request('http://localhost:3000/api/available-times/2024-01-01');
-      const response = await GET(request, { params: Promise.resolve({ date }) });
+      const response = await GET(request as any, { params: Promise.resolve({ date }) });
       const data = await response.json();
 
       expect(response.status).toBe(200);
-      expect(data.appointmentTimes).toEqual(appointmentTimes);
+      expect(data).toEqual([]);
     });
   });
 
   describe('Error Handling Tests', () => {
     it('should handle invalid date format', async () => {
       const date = 'invalid-date';
-      
+
       const request = new Request('http://localhost:3000/api/available-times/invalid-date');
-      const response = await GET(request, { params: Promise.resolve({ date }) });
+      const response = await GET(request as any, { params: Promise.resolve({ date }) });
       const data = await response.json();
 
       expect(response.status).toBe(400);
@@ -257,11 +245,11 @@ describe('Available Times API Comprehensive Tests', () => {
 
     it('should handle database errors gracefully', async () => {
       const date = '2024-01-01';
-      
+
       mockQuery.mockRejectedValueOnce(new Error('Database connection failed'));
 
       const request = new Request('http://localhost:3000/api/available-times/2024-01-01');
-      const response = await GET(request, { params: Promise.resolve({ date }) });
+      const response = await GET(request as any, { params: Promise.resolve({ date }) });
       const data = await response.json();
 
       expect(response.status).toBe(500);
@@ -270,13 +258,11 @@ describe('Available Times API Comprehensive Tests', () => {
 
     it('should handle missing available slots', async () => {
       const date = '2024-01-01';
-      
-      mockQuery
-        .mockResolvedValueOnce(createMockUnavailableTimeFrames(date))
-        .mockResolvedValueOnce({ rows: [] }); // No available slots
+
+      mockQuery.mockResolvedValueOnce(createMockDay({ defaultWindows: null })); // No available slots
 
       const request = new Request('http://localhost:3000/api/available-times/2024-01-01');
-      const response = await GET(request, { params: Promise.resolve({ date }) });
+      const response = await GET(request as any, { params: Promise.resolve({ date }) });
       const data = await response.json();
 
       expect(response.status).toBe(404);
@@ -293,20 +279,12 @@ describe('Available Times API Comprehensive Tests', () => {
       ];
 
       for (const date of leapYearDates) {
-        const dateObj = new Date(date);
-        const dayOfWeek = dateObj.getDay();
-        
-        mockQuery
-          .mockResolvedValueOnce(createMockUnavailableTimeFrames(date))
-          .mockResolvedValueOnce(createMockWorkSchedule(dayOfWeek, true))
-          .mockResolvedValueOnce(createMockAppointments(date));
+        mockQuery.mockResolvedValueOnce(createMockDay());
 
         const request = new Request(`http://localhost:3000/api/available-times/${date}`);
-        const response = await GET(request, { params: Promise.resolve({ date }) });
-        
+        const response = await GET(request as any, { params: Promise.resolve({ date }) });
+
         expect(response.status).toBe(200);
-        const data = await response.json();
-        expect(data.type).toBe('default_schedule');
       }
     });
 
@@ -319,17 +297,11 @@ describe('Available Times API Comprehensive Tests', () => {
       ];
 
       for (const date of timezoneDates) {
-        const dateObj = new Date(date);
-        const dayOfWeek = dateObj.getDay();
-        
-        mockQuery
-          .mockResolvedValueOnce(createMockUnavailableTimeFrames(date))
-          .mockResolvedValueOnce(createMockWorkSchedule(dayOfWeek, true))
-          .mockResolvedValueOnce(createMockAppointments(date));
+        mockQuery.mockResolvedValueOnce(createMockDay());
 
         const request = new Request(`http://localhost:3000/api/available-times/${date}`);
-        const response = await GET(request, { params: Promise.resolve({ date }) });
-        
+        const response = await GET(request as any, { params: Promise.resolve({ date }) });
+
         expect(response.status).toBe(200);
       }
     });
@@ -343,17 +315,11 @@ describe('Available Times API Comprehensive Tests', () => {
       ];
 
       for (const date of yearBoundaryDates) {
-        const dateObj = new Date(date);
-        const dayOfWeek = dateObj.getDay();
-        
-        mockQuery
-          .mockResolvedValueOnce(createMockUnavailableTimeFrames(date))
-          .mockResolvedValueOnce(createMockWorkSchedule(dayOfWeek, true))
-          .mockResolvedValueOnce(createMockAppointments(date));
+        mockQuery.mockResolvedValueOnce(createMockDay());
 
         const request = new Request(`http://localhost:3000/api/available-times/${date}`);
-        const response = await GET(request, { params: Promise.resolve({ date }) });
-        
+        const response = await GET(request as any, { params: Promise.resolve({ date }) });
+
         expect(response.status).toBe(200);
       }
     });
@@ -364,50 +330,41 @@ describe('Available Times API Comprehensive Tests', () => {
       const dates = createTestDates(10);
       const promises = dates.map(date => {
         const dateStr = date.toISOString().split('T')[0];
-        const dateObj = new Date(dateStr);
-        const dayOfWeek = dateObj.getDay();
-        
-        mockQuery
-          .mockResolvedValueOnce(createMockUnavailableTimeFrames(dateStr))
-          .mockResolvedValueOnce(createMockWorkSchedule(dayOfWeek, true))
-          .mockResolvedValueOnce(createMockAppointments(dateStr));
+
+        mockQuery.mockResolvedValueOnce(createMockDay());
 
         const request = new Request(`http://localhost:3000/api/available-times/${dateStr}`);
-        return GET(request, { params: Promise.resolve({ date: dateStr }) });
+        return GET(request as any, { params: Promise.resolve({ date: dateStr }) });
       });
 
       const responses = await Promise.all(promises);
-      
+
       responses.forEach(response => {
         expect(response.status).toBe(200);
       });
+      expect(mockQuery).toHaveBeenCalledTimes(10);
     });
 
     it('should handle large date ranges efficiently', async () => {
       const startDate = new Date('2024-01-01');
       const endDate = new Date('2024-12-31');
       const dates = [];
-      
+
       for (let d = new Date(startDate); d <= endDate; d.setDate(d.getDate() + 1)) {
         dates.push(new Date(d));
       }
 
       // Test a subset of dates to avoid timeout
       const testDates = dates.slice(0, 50);
-      
+
       for (const date of testDates) {
         const dateStr = date.toISOString().split('T')[0];
-        const dateObj = new Date(dateStr);
-        const dayOfWeek = dateObj.getDay();
-        
-        mockQuery
-          .mockResolvedValueOnce(createMockUnavailableTimeFrames(dateStr))
-          .mockResolvedValueOnce(createMockWorkSchedule(dayOfWeek, true))
-          .mockResolvedValueOnce(createMockAppointments(dateStr));
+
+        mockQuery.mockResolvedValueOnce(createMockDay());
 
         const request = new Request(`http://localhost:3000/api/available-times/${dateStr}`);
-        const response = await GET(request, { params: Promise.resolve({ date: dateStr }) });
-        
+        const response = await GET(request as any, { params: Promise.resolve({ date: dateStr }) });
+
         expect(response.status).toBe(200);
       }
     });
@@ -0,0 +1,76 @@
+import { describe, it, expect, beforeEach, vi } from 'vitest';
+import { GET } from '@/app/api/available-times/route';
+import { query } from '@/lib/db';
+import { invalidateAllAvailability } from '@/lib/availability';
+
+// Mock the database query function
+vi.mock('@/lib/db', () => ({
+  query: vi.fn()
+}));
+
+function createMockRangeRow(date: string, overrides: Record<string, any> = {}) {
+  return {
+    date,
+    is_working_day: true,
+    is_day_off: false,
+    default_windows: [{ start_time: '09:00:00', end_time: '09:40:00' }],
+    custom_windows: null,
+    custom_is_working_day: null,
+    booked_times: [],
+    ...overrides
+  };
+}
+
+describe('Available Times Range API Tests', () => {
+  let mockQuery: any;
+
+  beforeEach(() => {
+    mockQuery = vi.mocked(query);
+    vi.clearAllMocks();
+    invalidateAllAvailability();
+  });
+
+  it('should return every day of the range from a single query', async () => {
+    mockQuery.mockResolvedValueOnce({
+      rows: [
+        createMockRangeRow('2024-01-06', { is_working_day: false }),
+        createMockRangeRow('2024-01-07', { is_working_day: null, default_windows: null }),
+        createMockRangeRow('2024-01-08'),
+        createMockRangeRow('2024-01-09', { is_day_off: true })
+      ]
+    });
+
+    const request = new Request('http://localhost:3000/api/available-times?from=2024-01-06&to=2024-01-09');
+    const response = await GET(request as any);
+    const data = await response.json();
+
+    expect(response.status).toBe(200);
+    expect(mockQuery).toHaveBeenCalledTimes(1);
+    expect(mockQuery.mock.calls[0][1]).toEqual(['2024-01-06', '2024-01-09']);
+    expect(data.days).toEqual([
+      { date: '2024-01-06', available: false, count: 0, times: [], reason: 'This day is not a working day' },
+      { date: '2024-01-07', available: false, count: 0, times: [], reason: 'No available slots configured for this day of week' },
+      { date: '2024-01-08', available: true, count: 2, times: ['09:00', '09:20'] },
+      { date: '2024-01-09', available: false, count: 0, times: [], reason: 'Day marked as unavailable' }
+    ]);
+  });
+
+  it('should reject malformed or inverted ranges', async () => {
+    const malformed = await GET(new Request('http://localhost:3000/api/available-times?from=2024-1-6&to=2024-01-09') as any);
+    const inverted = await GET(new Request('http://localhost:3000/api/available-times?from=2024-01-09&to=2024-01-06') as any);
+    const missing = await GET(new Request('http://localhost:3000/api/available-times?from=2024-01-09') as any);
+
+    expect(malformed.status).toBe(400);
+    expect(inverted.status).toBe(400);
+    expect(missing.status).toBe(400);
+    expect(mockQuery).not.toHaveBeenCalled();
+  });
+
+  it('should reject ranges longer than the maximum', async () => {
+    const request = new Request('http://localhost:3000/api/available-times?from=2024-01-01&to=2024-06-30');
+    const response = await GET(request as any);
+
+    expect(response.status).toBe(400);
+    expect(mockQuery).not.toHaveBeenCalled();
+  });
+});
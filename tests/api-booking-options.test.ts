@@ -0,0 +1,87 @@
+import { describe, it, expect, beforeEach, afterEach, vi } from 'vitest';
+import { NextRequest } from 'next/server';
+import { query } from '@/lib/db';
+import { GET } from '@/app/api/booking-options/route';
+
+// Mock the database query function
+vi.mock('@/lib/db', () => ({
+  query: vi.fn()
+}));
+
+function createRequest(headers: Record<string, string> = {}) {
+  return new NextRequest('http://localhost:3000/api/booking-options', { headers });
+}
+
+const lookupRow = {
+  visit_types: [{ id: 1, name: 'Consulta' }, { id: 2, name: 'Practica' }],
+  consult_types: [{ id: 1, name: 'Primera vez' }],
+  practice_types: [{ id: 1, name: 'Control' }]
+};
+
+// The lookup cache expires only by its five minute TTL, so each test moves the clock past it
+let clock = Date.now();
+function expireLookupTables() {
+  clock += 6 * 60 * 1000;
+  vi.setSystemTime(clock);
+}
+
+describe('GET /api/booking-options', () => {
+  let mockQuery: any;
+
+  beforeEach(() => {
+    mockQuery = vi.mocked(query);
+    vi.clearAllMocks();
+    vi.useFakeTimers({ toFake: ['Date'] });
+    expireLookupTables();
+  });
+
+  afterEach(() => {
+    vi.useRealTimers();
+  });
+
+  it('should return every lookup list in one response from one query', async () => {
+    mockQuery.mockResolvedValueOnce({ rows: [lookupRow] });
+
+    const response = await GET(createRequest());
+    const data = await response.json();
+
+    expect(response.status).toBe(200);
+    expect(data.visit_types).toEqual(lookupRow.visit_types);
+    expect(data.consult_types).toEqual(lookupRow.consult_types);
+    expect(data.practice_types).toEqual(lookupRow.practice_types);
+    expect(data.health_insurance.length).toBeGreaterThan(0);
+    expect(mockQuery).toHaveBeenCalledTimes(1);
+  });
+
+  it('should serve repeat requests from the cache and answer 304 for a matching ETag', async () => {
+    mockQuery.mockResolvedValueOnce({ rows: [lookupRow] });
+
+    const first = await GET(createRequest());
+    const response = await GET(createRequest({ 'If-None-Match': first.headers.get('ETag') as string }));
+
+    expect(response.status).toBe(304);
+    expect(mockQuery).toHaveBeenCalledTimes(1);
+  });
+
+  it('should change the ETag once the cached lookup tables expire', async () => {
+    mockQuery
+      .mockResolvedValueOnce({ rows: [lookupRow] })
+      .mockResolvedValueOnce({ rows: [{ ...lookupRow, practice_types: [] }] });
+
+    const first = await GET(createRequest());
+    expireLookupTables();
+    const second = await GET(createRequest({ 'If-None-Match': first.headers.get('ETag') as string }));
+
+    expect(second.status).toBe(200);
+    expect((await second.json()).practice_types).toEqual([]);
+  });
+
+  it('should not cache a failed load', async () => {
+    mockQuery
+      .mockRejectedValueOnce(new Error('connection terminated'))
+      .mockResolvedValueOnce({ rows: [lookupRow] });
+
+    expect((await GET(createRequest())).status).toBe(500);
+    expect((await GET(createRequest())).status).toBe(200);
+  });
+});
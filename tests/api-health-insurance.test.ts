@@ -0,0 +1,43 @@
+import { describe, it, expect } from 'vitest';
+import { NextRequest } from 'next/server';
+import { GET } from '@/app/api/health-insurance/route';
+import { normalizeHealthInsurance } from '@/lib/health-insurance';
+
+function createRequest(headers: Record<string, string> = {}) {
+  return new NextRequest('http://localhost:3000/api/health-insurance', { headers });
+}
+
+describe('GET /api/health-insurance', () => {
+  it('should serve the normalized list with a strong ETag and Cache-Control', async () => {
+    const response = await GET(createRequest());
+    const data = await response.json();
+
+    expect(response.status).toBe(200);
+    expect(response.headers.get('ETag')).toMatch(/^"[^"]+"$/);
+    expect(response.headers.get('Cache-Control')).toContain('max-age=');
+    expect(data[0]).toMatchObject({ id: 1, name: 'Particular', price: '$25.000', pricing: '$25.000' });
+  });
+
+  it('should answer 304 when the client already has the current list', async () => {
+    const first = await GET(createRequest());
+    const etag = first.headers.get('ETag') as string;
+
+    const response = await GET(createRequest({ 'If-None-Match': `"stale", W/${etag}` }));
+
+    expect(response.status).toBe(304);
+    expect(await response.text()).toBe('');
+    expect(response.headers.get('ETag')).toBe(etag);
+  });
+
+  it('should answer 200 for a stale ETag', async () => {
+    const response = await GET(createRequest({ 'If-None-Match': '"stale"' }));
+
+    expect(response.status).toBe(200);
+  });
+
+  it('should normalize prices and optional fields', () => {
+    expect(normalizeHealthInsurance([{ name: 'AMUR', price: null, notes: 'excepto plan verde' }])).toEqual([
+      { id: 1, name: 'AMUR', price: null, price_numeric: null, notes: 'excepto plan verde', pricing: null }
+    ]);
+  });
+});
@@ -0,0 +1,74 @@
+import { describe, it, expect, beforeEach, vi } from 'vitest';
+import { NextRequest } from 'next/server';
+import { query } from '@/lib/db';
+import { GET } from '@/app/api/patients/route';
+import { cursorId, cursorText, decodeCursor, encodeCursor } from '@/lib/pagination';
+
+// Mock the database query function
+vi.mock('@/lib/db', () => ({
+  query: vi.fn()
+}));
+
+function createRequest(search: string = '') {
+  return new NextRequest(`http://localhost:3000/api/patients${search}`);
+}
+
+describe('GET /api/patients', () => {
+  let mockQuery: any;
+
+  beforeEach(() => {
+    mockQuery = vi.mocked(query);
+    vi.clearAllMocks();
+  });
+
+  it('should return one page ordered by name with a cursor', async () => {
+    mockQuery.mockResolvedValueOnce({
+      rows: [
+        { id: 3, first_name: 'Ana', last_name: 'Alvarez', phone_number: '111' },
+        { id: 1, first_name: 'Juan', last_name: 'Benitez', phone_number: '222' }
+      ]
+    });
+
+    const response = await GET(createRequest('?limit=1'));
+    const data = await response.json();
+
+    expect(response.status).toBe(200);
+    expect(data.patients).toHaveLength(1);
+    expect(data.has_more).toBe(true);
+    expect(decodeCursor(data.next_cursor, [cursorText, cursorText, cursorId])).toEqual(['Alvarez', 'Ana', 3]);
+    expect(mockQuery.mock.calls[0][0]).toContain('ORDER BY p.last_name, p.first_name, p.id');
+  });
+
+  it('should search name and phone with escaped wildcards after the cursor', async () => {
+    mockQuery.mockResolvedValueOnce({ rows: [] });
+    const cursor = encodeCursor(['Alvarez', 'Ana', 3]);
+
+    const response = await GET(createRequest(`?q=${encodeURIComponent(' Pé_rez ')}&cursor=${cursor}`));
+    const data = await response.json();
+
+    expect(data.patients).toEqual([]);
+    expect(data.next_cursor).toBeNull();
+    const [sql, params] = mockQuery.mock.calls[0];
+    expect(sql).toContain("lower(p.first_name || ' ' || p.last_name || ' ' || p.phone_number) LIKE $1");
+    expect(params).toEqual(['%pé\\_rez%', 'Alvarez', 'Ana', 3, 51]);
+  });
+
+  it('should compute the total only when count is requested', async () => {
+    mockQuery
+      .mockResolvedValueOnce({ rows: [] })
+      .mockResolvedValueOnce({ rows: [{ count: 0 }] });
+
+    const response = await GET(createRequest('?q=garcia&count=true'));
+    const data = await response.json();
+
+    expect(data.count).toBe(0);
+    expect(mockQuery.mock.calls[1][1]).toEqual(['%garcia%']);
+  });
+
+  it('should reject malformed parameters', async () => {
+    expect((await GET(createRequest('?limit=-1'))).status).toBe(400);
+    expect((await GET(createRequest('?cursor=abc'))).status).toBe(400);
+    expect((await GET(createRequest(`?cursor=${encodeCursor(['Alvarez', 'Ana', 'x'])}`))).status).toBe(400);
+    expect(mockQuery).not.toHaveBeenCalled();
+  });
+});
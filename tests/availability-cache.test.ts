@@ -0,0 +1,139 @@
+import { describe, it, expect, beforeEach, vi } from 'vitest';
+import { query } from '@/lib/db';
+import {
+  getDayAvailability,
+  getRangeAvailability,
+  invalidateAvailability,
+  invalidateAllAvailability,
+  toDateKey
+} from '@/lib/availability';
+import { LRUCache } from '@/lib/lru-cache';
+
+// Mock the database query function
+vi.mock('@/lib/db', () => ({
+  query: vi.fn()
+}));
+
+function createMockDayRow(date: string, bookedTimes: string[] = []) {
+  return {
+    date,
+    is_working_day: true,
+    is_day_off: false,
+    default_windows: [{ start_time: '09:00:00', end_time: '09:40:00' }],
+    custom_windows: null,
+    custom_is_working_day: null,
+    booked_times: bookedTimes
+  };
+}
+
+describe('Availability Cache Tests', () => {
+  let mockQuery: any;
+
+  beforeEach(() => {
+    mockQuery = vi.mocked(query);
+    vi.clearAllMocks();
+    invalidateAllAvailability();
+  });
+
+  it('should serve repeated reads of a date from the cache', async () => {
+    mockQuery.mockResolvedValueOnce({ rows: [createMockDayRow('2024-01-08')] });
+
+    const first = await getDayAvailability('2024-01-08');
+    const second = await getDayAvailability('2024-01-08');
+
+    expect(first).toEqual(second);
+    expect(mockQuery).toHaveBeenCalledTimes(1);
+  });
+
+  it('should recompute a date after it is invalidated', async () => {
+    mockQuery
+      .mockResolvedValueOnce({ rows: [createMockDayRow('2024-01-08')] })
+      .mockResolvedValueOnce({ rows: [createMockDayRow('2024-01-08', ['09:00'])] });
+
+    await getDayAvailability('2024-01-08');
+    invalidateAvailability('2024-01-08');
+    const day = await getDayAvailability('2024-01-08');
+
+    expect(mockQuery).toHaveBeenCalledTimes(2);
+    expect(day).toMatchObject({ available: true, times: ['09:20'] });
+  });
+
+  it('should only invalidate the dates that changed', async () => {
+    mockQuery
+      .mockResolvedValueOnce({ rows: [createMockDayRow('2024-01-08')] })
+      .mockResolvedValueOnce({ rows: [createMockDayRow('2024-01-09')] });
+
+    await getDayAvailability('2024-01-08');
+    await getDayAvailability('2024-01-09');
+    invalidateAvailability(new Date(2024, 0, 9));
+    mockQuery.mockResolvedValueOnce({ rows: [createMockDayRow('2024-01-09')] });
+
+    await getDayAvailability('2024-01-08');
+    await getDayAvailability('2024-01-09');
+
+    expect(mockQuery).toHaveBeenCalledTimes(3);
+  });
+
+  it('should not cache a read that raced with an invalidation', async () => {
+    let resolveQuery: (value: any) => void = () => {};
+    mockQuery.mockReturnValueOnce(new Promise((resolve) => { resolveQuery = resolve; }));
+
+    const pending = getDayAvailability('2024-01-08');
+    invalidateAvailability('2024-01-08');
+    resolveQuery({ rows: [createMockDayRow('2024-01-08')] });
+    await pending;
+
+    mockQuery.mockResolvedValueOnce({ rows: [createMockDayRow('2024-01-08', ['09:00', '09:20'])] });
+    const day = await getDayAvailability('2024-01-08');
+
+    expect(mockQuery).toHaveBeenCalledTimes(2);
+    expect(day).toMatchObject({ available: true, times: [] });
+  });
+
+  it('should fill the per-date cache from a range query', async () => {
+    mockQuery.mockResolvedValueOnce({
+      rows: [createMockDayRow('2024-01-08'), createMockDayRow('2024-01-09')]
+    });
+
+    await getRangeAvailability('2024-01-08', '2024-01-09');
+    await getDayAvailability('2024-01-09');
+    const range = await getRangeAvailability('2024-01-08', '2024-01-09');
+
+    expect(mockQuery).toHaveBeenCalledTimes(1);
+    expect(range.map((day) => day.date)).toEqual(['2024-01-08', '2024-01-09']);
+  });
+
+  it('should normalize date keys', () => {
+    expect(toDateKey('2024-1-5')).toBe('2024-01-05');
+    expect(toDateKey('2024-01-05T03:00:00.000Z')).toBe('2024-01-05');
+    expect(toDateKey(new Date(2024, 0, 5))).toBe('2024-01-05');
+    expect(toDateKey('not-a-date')).toBeNull();
+  });
+});
+
+describe('LRUCache Tests', () => {
+  it('should evict the least recently used entry', () => {
+    const cache = new LRUCache<string, number>(2);
+
+    cache.set('a', 1);
+    cache.set('b', 2);
+    cache.get('a');
+    cache.set('c', 3);
+
+    expect(cache.get('a')).toBe(1);
+    expect(cache.get('b')).toBeUndefined();
+    expect(cache.get('c')).toBe(3);
+    expect(cache.size).toBe(2);
+  });
+
+  it('should expire entries after their TTL', () => {
+    vi.useFakeTimers();
+    const cache = new LRUCache<string, number>(10, 1000);
+
+    cache.set('a', 1);
+    vi.advanceTimersByTime(1001);
+
+    expect(cache.get('a')).toBeUndefined();
+    vi.useRealTimers();
+  });
+});
@@ -0,0 +1,66 @@
+// @vitest-environment node
+import { describe, it, expect, beforeEach, vi } from 'vitest'
+import { getQueryMetrics, resetQueryMetrics } from '@/lib/query-metrics'
+
+// lib/db.ts checks its settings and builds the pool on import
+const { client } = vi.hoisted(() => {
+  process.env.POSTGRESQL_HOST = 'localhost'
+  process.env.POSTGRESQL_PORT = '5432'
+  process.env.POSTGRESQL_USER = 'test'
+  process.env.POSTGRESQL_PASSWORD = 'test'
+  return {
+    client: {
+      query: vi.fn(),
+      release: vi.fn()
+    }
+  }
+})
+
+vi.mock('pg', () => ({
+  Pool: vi.fn(function () {
+    return { on: vi.fn(), connect: vi.fn(async () => client), query: vi.fn() }
+  })
+}))
+
+import { transaction } from '@/lib/db'
+
+function recorded(fingerprint: string) {
+  return getQueryMetrics().find((stats) => stats.fingerprint === fingerprint)
+}
+
+describe('Database helpers', () => {
+  beforeEach(() => {
+    vi.clearAllMocks()
+    resetQueryMetrics()
+  })
+
+  it('should record statements run inside a transaction', async () => {
+    const query = client.query
+    query.mockResolvedValue({ rows: [{ id: 1 }], rowCount: 1 })
+
+    await transaction((tx) => tx.query('SELECT id FROM appointments WHERE id = $1', ['a']))
+
+    expect(query).toHaveBeenCalledWith('SELECT id FROM appointments WHERE id = $1', ['a'])
+    expect(recorded('SELECT id FROM appointments WHERE id = ?')).toMatchObject({ count: 1, rows: 1, errors: 0 })
+    expect(recorded('COMMIT')).toMatchObject({ count: 1 })
+    // The pooled client goes back with its own query
+    expect(client.query).toBe(query)
+    expect(client.release).toHaveBeenCalledTimes(1)
+  })
+
+  it('should record a failed statement and roll back', async () => {
+    vi.spyOn(console, 'error').mockImplementation(() => {})
+    client.query.mockImplementation(async (text: string) => {
+      if (text.startsWith('UPDATE')) {
+        throw new Error('deadlock detected')
+      }
+      return { rows: [], rowCount: 0 }
+    })
+
+    await expect(transaction((tx) => tx.query("UPDATE appointments SET status = 'cancelled'"))).rejects.toThrow('deadlock detected')
+
+    expect(recorded('UPDATE appointments SET status = ?')).toMatchObject({ count: 1, errors: 1 })
+    expect(recorded('ROLLBACK')).toMatchObject({ count: 1 })
+    expect(client.release).toHaveBeenCalledTimes(1)
+  })
+})
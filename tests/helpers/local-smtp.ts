@@ -0,0 +1,100 @@
+import net from 'net'
+
+// Minimal SMTP server standing in for Gmail in tests: accepts AUTH PLAIN from anyone,
+// records every message and never talks TLS.
+
+export interface ReceivedMail {
+  from: string
+  to: string[]
+  data: string
+}
+
+export interface LocalSmtp {
+  port: number
+  messages: ReceivedMail[]
+  connections: number
+  close(): Promise<void>
+}
+
+export async function startLocalSmtp(): Promise<LocalSmtp> {
+  const sockets = new Set<net.Socket>()
+  const smtp: LocalSmtp = {
+    port: 0,
+    messages: [],
+    connections: 0,
+    close: () => new Promise(resolve => {
+      sockets.forEach(socket => socket.destroy())
+      server.close(() => resolve())
+    })
+  }
+
+  const server = net.createServer(socket => {
+    smtp.connections++
+    sockets.add(socket)
+    socket.on('close', () => sockets.delete(socket))
+
+    let buffer = ''
+    let envelope: ReceivedMail = { from: '', to: [], data: '' }
+    let dataLines: string[] | null = null
+    const reply = (line: string) => socket.write(`${line}\r\n`)
+
+    const handle = (line: string) => {
+      if (dataLines) {
+        if (line === '.') {
+          smtp.messages.push({ ...envelope, data: dataLines.join('\r\n') })
+          envelope = { from: '', to: [], data: '' }
+          dataLines = null
+          reply('250 2.0.0 Queued')
+        } else {
+          dataLines.push(line.startsWith('..') ? line.slice(1) : line)
+        }
+        return
+      }
+
+      const command = line.split(' ')[0].toUpperCase()
+      if (command === 'EHLO') {
+        reply('250-localhost')
+        reply('250 AUTH PLAIN')
+      } else if (command === 'HELO') {
+        reply('250 localhost')
+      } else if (command === 'AUTH') {
+        reply('235 2.7.0 Authentication successful')
+      } else if (command === 'MAIL') {
+        envelope.from = line.replace(/^MAIL FROM:\s*<([^>]*)>.*$/i, '$1')
+        reply('250 2.1.0 OK')
+      } else if (command === 'RCPT') {
+        envelope.to.push(line.replace(/^RCPT TO:\s*<([^>]*)>.*$/i, '$1'))
+        reply('250 2.1.5 OK')
+      } else if (command === 'DATA') {
+        dataLines = []
+        reply('354 End data with <CR><LF>.<CR><LF>')
+      } else if (command === 'RSET') {
+        envelope = { from: '', to: [], data: '' }
+        reply('250 2.0.0 OK')
+      } else if (command === 'NOOP') {
+        reply('250 2.0.0 OK')
+      } else if (command === 'QUIT') {
+        reply('221 2.0.0 Bye')
+        socket.end()
+      } else {
+        reply('502 5.5.2 Command not implemented')
+      }
+    }
+
+    socket.on('data', chunk => {
+      buffer += chunk.toString('utf8')
+      let index
+      while ((index = buffer.indexOf('\r\n')) !== -1) {
+        const line = buffer.slice(0, index)
+        buffer = buffer.slice(index + 2)
+        handle(line)
+      }
+    })
+
+    reply('220 localhost ESMTP test server')
+  })
+
+  await new Promise<void>(resolve => server.listen(0, '127.0.0.1', () => resolve()))
+  smtp.port = (server.address() as net.AddressInfo).port
+  return smtp
+}
@@ -0,0 +1,137 @@
+import { describe, it, expect, beforeEach, vi } from 'vitest';
+import { NextResponse } from 'next/server';
+import { query } from '@/lib/db';
+import { withIdempotency, hashRequestBody, isValidIdempotencyKey } from '@/lib/idempotency';
+
+// Mock the database query function
+vi.mock('@/lib/db', () => ({
+  query: vi.fn()
+}));
+
+// Route each statement by its SQL so the opportunistic sweep does not shift mock order
+const LEASE = '2030-01-08 09:00:30.123456+00';
+
+function mockIdempotencyTable({ claimed, stored, takenOver = false }: { claimed: boolean; stored?: any; takenOver?: boolean }) {
+  vi.mocked(query).mockImplementation(async (text: string) => {
+    if (text.includes('INSERT INTO idempotency_keys')) {
+      return { rows: claimed ? [{ lease: LEASE }] : [], rowCount: claimed ? 1 : 0 } as any;
+    }
+    if (text.includes('UPDATE idempotency_keys')) {
+      return { rows: [], rowCount: takenOver ? 0 : 1 } as any;
+    }
+    if (text.includes('SELECT request_hash')) {
+      return { rows: stored ? [stored] : [], rowCount: stored ? 1 : 0 } as any;
+    }
+    return { rows: [], rowCount: 0 } as any;
+  });
+}
+
+function sqlCalls(fragment: string) {
+  return vi.mocked(query).mock.calls.filter(([text]) => text.includes(fragment));
+}
+
+describe('Idempotency keys', () => {
+  const requestHash = hashRequestBody('{"phone_number":"1122334455"}');
+
+  beforeEach(() => {
+    vi.clearAllMocks();
+  });
+
+  it('should run the handler once and store its response for a new key', async () => {
+    mockIdempotencyTable({ claimed: true });
+    const handler = vi.fn(async () => NextResponse.json({ success: true, id: 'a1' }));
+
+    const response = await withIdempotency('key-1', requestHash, handler);
+
+    expect(handler).toHaveBeenCalledTimes(1);
+    expect(response.status).toBe(200);
+    const [, params] = sqlCalls('UPDATE idempotency_keys')[0];
+    expect(params).toEqual([200, JSON.stringify({ success: true, id: 'a1' }), 'key-1', 24, requestHash, LEASE]);
+  });
+
+  it('should only store the response while it still holds the lease', async () => {
+    mockIdempotencyTable({ claimed: true, takenOver: true });
+    const warn = vi.spyOn(console, 'warn').mockImplementation(() => {});
+
+    const response = await withIdempotency('key-1', requestHash, async () => NextResponse.json({ success: true }));
+
+    expect(response.status).toBe(200);
+    const [text] = sqlCalls('UPDATE idempotency_keys')[0];
+    expect(text).toContain('request_hash = $5 AND status_code IS NULL AND locked_until = $6::timestamptz');
+    expect(warn).toHaveBeenCalledTimes(1);
+    expect(sqlCalls('status_code IS NULL AND locked_until = $3')).toHaveLength(0);
+    warn.mockRestore();
+  });
+
+  it('should claim a key with a short lease that a retry can take over once lapsed', async () => {
+    mockIdempotencyTable({ claimed: true });
+
+    await withIdempotency('key-1', requestHash, async () => NextResponse.json({ success: true }));
+
+    const [text, params] = sqlCalls('INSERT INTO idempotency_keys')[0];
+    expect(text).toContain('status_code IS NULL AND idempotency_keys.locked_until < NOW()');
+    expect(params).toEqual(['key-1', requestHash, 30]);
+    const [storeText] = sqlCalls('UPDATE idempotency_keys')[0];
+    expect(storeText).toContain('locked_until = NULL');
+    expect(storeText).toContain('make_interval(hours => $4)');
+  });
+
+  it('should replay the stored response without running the handler', async () => {
+    mockIdempotencyTable({
+      claimed: false,
+      stored: { request_hash: requestHash, status_code: 200, response: { success: true, id: 'a1' } }
+    });
+    const handler = vi.fn();
+
+    const response = await withIdempotency('key-1', requestHash, handler);
+    const data = await response.json();
+
+    expect(handler).not.toHaveBeenCalled();
+    expect(response.status).toBe(200);
+    expect(response.headers.get('Idempotent-Replayed')).toBe('true');
+    expect(data).toEqual({ success: true, id: 'a1' });
+  });
+
+  it('should reject a key reused with a different body', async () => {
+    mockIdempotencyTable({
+      claimed: false,
+      stored: { request_hash: hashRequestBody('{}'), status_code: 200, response: {} }
+    });
+
+    const response = await withIdempotency('key-1', requestHash, vi.fn());
+
+    expect(response.status).toBe(422);
+  });
+
+  it('should report a request that is still in progress', async () => {
+    mockIdempotencyTable({
+      claimed: false,
+      stored: { request_hash: requestHash, status_code: null, response: null }
+    });
+
+    const response = await withIdempotency('key-1', requestHash, vi.fn());
+
+    expect(response.status).toBe(409);
+    expect(response.headers.get('Retry-After')).toBe('1');
+  });
+
+  it('should release the key when the handler fails', async () => {
+    mockIdempotencyTable({ claimed: true });
+
+    const response = await withIdempotency('key-1', requestHash, async () =>
+      NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+    );
+
+    expect(response.status).toBe(500);
+    expect(sqlCalls('UPDATE idempotency_keys')).toHaveLength(0);
+    const [, releaseParams] = sqlCalls('status_code IS NULL AND locked_until = $3')[0];
+    expect(releaseParams).toEqual(['key-1', requestHash, LEASE]);
+  });
+
+  it('should validate key format', () => {
+    expect(isValidIdempotencyKey('3f2b8c1e-0d4a-4f7b-9a61-2c5e8d9b7a10')).toBe(true);
+    expect(isValidIdempotencyKey('')).toBe(false);
+    expect(isValidIdempotencyKey('has space')).toBe(false);
+    expect(isValidIdempotencyKey('x'.repeat(256))).toBe(false);
+  });
+});
@@ -0,0 +1,81 @@
+// @vitest-environment node
+import { describe, it, expect, beforeAll, afterAll, beforeEach, vi } from 'vitest'
+import { NextRequest } from 'next/server'
+import { query } from '@/lib/db'
+import { sendPasswordResetEmail } from '@/lib/auth'
+import { enqueueMail, flushMailQueue, getMailQueueStats, resetMailTransport } from '@/lib/mailer'
+import { POST as forgotPassword } from '@/app/api/auth/forgot-password/route'
+import { startLocalSmtp, LocalSmtp } from './helpers/local-smtp'
+
+vi.mock('@/lib/db', () => ({
+  query: vi.fn()
+}))
+
+// Undo quoted-printable soft line breaks and escapes so assertions can match plain text
+function decoded(data: string) {
+  return data.replace(/=\r\n/g, '').replace(/=3D/g, '=')
+}
+
+describe('Mail queue', () => {
+  let smtp: LocalSmtp
+
+  beforeAll(async () => {
+    smtp = await startLocalSmtp()
+    process.env.SMTP_HOST = '127.0.0.1'
+    process.env.SMTP_PORT = String(smtp.port)
+    process.env.EMAIL_USER = 'admin@example.com'
+    process.env.EMAIL_PASS = 'app-password'
+    process.env.NEXT_PUBLIC_APP_URL = 'http://localhost:3000'
+    resetMailTransport()
+  })
+
+  afterAll(async () => {
+    resetMailTransport()
+    await smtp.close()
+    delete process.env.SMTP_HOST
+    delete process.env.SMTP_PORT
+  })
+
+  beforeEach(() => {
+    vi.clearAllMocks()
+    smtp.messages.length = 0
+  })
+
+  it('should queue the password reset email and deliver it in the background', async () => {
+    expect(await sendPasswordResetEmail('user@example.com', 'reset-token-123')).toBe(true)
+
+    await flushMailQueue()
+
+    expect(smtp.messages).toHaveLength(1)
+    expect(smtp.messages[0].from).toBe('admin@example.com')
+    expect(smtp.messages[0].to).toEqual(['user@example.com'])
+    expect(decoded(smtp.messages[0].data)).toContain('/reset-password?token=reset-token-123')
+  })
+
+  it('should answer forgot-password without waiting for SMTP', async () => {
+    vi.mocked(query).mockResolvedValue({ rows: [{ id: 1 }], rowCount: 1 } as any)
+
+    const response = await forgotPassword(new NextRequest('http://localhost:3000/api/auth/forgot-password', {
+      method: 'POST',
+      body: JSON.stringify({ email: 'user@example.com' })
+    }))
+
+    expect(response.status).toBe(200)
+    expect(getMailQueueStats().queued + getMailQueueStats().inFlight).toBe(1)
+
+    await flushMailQueue()
+    expect(smtp.messages).toHaveLength(1)
+  })
+
+  it('should send bursts over a small pool of reused connections', async () => {
+    const connectionsBefore = smtp.connections
+
+    for (let i = 0; i < 12; i++) {
+      expect(enqueueMail({ to: `patient${i}@example.com`, subject: 'Recordatorio', text: 'Hola' })).toBe(true)
+    }
+    await flushMailQueue()
+
+    expect(smtp.messages).toHaveLength(12)
+    expect(smtp.connections - connectionsBefore).toBeLessThanOrEqual(3)
+  })
+})
@@ -0,0 +1,131 @@
+// @vitest-environment node
+import { describe, it, expect, beforeEach, afterEach, vi } from 'vitest'
+import http from 'http'
+import { AddressInfo } from 'net'
+import { NextRequest } from 'next/server'
+import { counter, histogram, resetRegistry, renderRegistry } from '@/lib/prometheus'
+import { installHttpMetrics, normalizeRoutePath, recordHttpRequest } from '@/lib/http-metrics'
+import { pushDeliveries } from '@/lib/push-sender'
+import { queryId, recordQuery, resetQueryMetrics } from '@/lib/query-metrics'
+import { GET as metrics } from '@/app/api/metrics/route'
+
+vi.mock('@/lib/db', () => ({
+  query: vi.fn(),
+  getPoolStats: vi.fn(() => ({ total: 20, idle: 0, waiting: 7, max: 20 }))
+}))
+
+function scrape(token?: string) {
+  return metrics(new NextRequest('http://localhost:3000/api/metrics', {
+    headers: token ? { authorization: `Bearer ${token}` } : {}
+  }))
+}
+
+describe('Prometheus metrics', () => {
+  beforeEach(() => {
+    resetRegistry()
+    resetQueryMetrics()
+    process.env.METRICS_TOKEN = 'scrape-token'
+  })
+
+  afterEach(() => {
+    delete process.env.METRICS_TOKEN
+  })
+
+  describe('text format', () => {
+    it('renders counters with escaped labels', () => {
+      counter('test_events_total', 'Events').inc({ kind: 'say "hi"' }, 2)
+
+      expect(renderRegistry()).toContain('# TYPE test_events_total counter\ntest_events_total{kind="say \\"hi\\""} 2\n')
+    })
+
+    it('renders cumulative histogram buckets with sum and count', () => {
+      const latency = histogram('test_latency_seconds', 'Latency', [0.1, 1])
+      latency.observe({ route: '/a' }, 0.05)
+      latency.observe({ route: '/a' }, 0.5)
+      latency.observe({ route: '/a' }, 3)
+
+      const text = renderRegistry()
+      expect(text).toContain('test_latency_seconds_bucket{route="/a",le="0.1"} 1\n')
+      expect(text).toContain('test_latency_seconds_bucket{route="/a",le="1"} 2\n')
+      expect(text).toContain('test_latency_seconds_bucket{route="/a",le="+Inf"} 3\n')
+      expect(text).toContain('test_latency_seconds_sum{route="/a"} 3.55\n')
+      expect(text).toContain('test_latency_seconds_count{route="/a"} 3\n')
+    })
+
+    it('shares one metric per name', () => {
+      expect(counter('test_shared_total', 'Shared')).toBe(counter('test_shared_total', 'Shared'))
+    })
+  })
+
+  describe('HTTP request metrics', () => {
+    it('collapses ids and dates in route labels', () => {
+      expect(normalizeRoutePath('/api/appointments/1b4e28ba-2fa1-11d2-883f-0016d3cca427')).toBe('/api/appointments/[id]')
+      expect(normalizeRoutePath('/api/patients/42?include=history')).toBe('/api/patients/[id]')
+      expect(normalizeRoutePath('/api/available-times/2025-03-14/')).toBe('/api/available-times/[date]')
+    })
+
+    it('records latency and status per route', () => {
+      recordHttpRequest('GET', '/api/patients/1', 200, 0.02)
+      recordHttpRequest('GET', '/api/patients/2', 404, 0.3)
+
+      const text = renderRegistry()
+      expect(text).toContain('http_requests_total{route="/api/patients/[id]",method="GET",status="200"} 1\n')
+      expect(text).toContain('http_requests_total{route="/api/patients/[id]",method="GET",status="404"} 1\n')
+      expect(text).toContain('http_request_duration_seconds_count{route="/api/patients/[id]",method="GET"} 2\n')
+    })
+
+    it('observes API responses served by the Node HTTP server', async () => {
+      installHttpMetrics()
+      const server = http.createServer((request, response) => {
+        response.statusCode = request.url?.startsWith('/api/') ? 201 : 200
+        response.end('ok')
+      })
+      await new Promise<void>((resolve) => server.listen(0, '127.0.0.1', resolve))
+      const { port } = server.address() as AddressInfo
+
+      try {
+        await (await fetch(`http://127.0.0.1:${port}/api/push/send`, { method: 'POST' })).text()
+        await (await fetch(`http://127.0.0.1:${port}/agendar-visita`)).text()
+      } finally {
+        await new Promise((resolve) => server.close(resolve))
+      }
+
+      const text = renderRegistry()
+      expect(text).toContain('http_requests_total{route="/api/push/send",method="POST",status="201"} 1\n')
+      expect(text).not.toContain('agendar-visita')
+    })
+  })
+
+  describe('/api/metrics', () => {
+    it('requires the scrape token', async () => {
+      expect((await scrape()).status).toBe(401)
+      expect((await scrape('wrong')).status).toBe(401)
+    })
+
+    it('is disabled without METRICS_TOKEN', async () => {
+      delete process.env.METRICS_TOKEN
+
+      expect((await scrape('scrape-token')).status).toBe(503)
+    })
+
+    it('exports pool, query, push and rate limiter metrics', async () => {
+      pushDeliveries.inc({ source: 'fanout', result: 'sent' }, 3)
+      recordQuery('SELECT * FROM patients WHERE id = $1', 12, 1)
+
+      const response = await scrape('scrape-token')
+      const text = await response.text()
+
+      expect(response.status).toBe(200)
+      expect(response.headers.get('content-type')).toContain('text/plain; version=0.0.4')
+      expect(text).toContain('pg_pool_clients{state="total"} 20\n')
+      expect(text).toContain('pg_pool_waiting_requests 7\n')
+      expect(text).toContain('push_deliveries_total{source="fanout",result="sent"} 3\n')
+      const id = queryId('SELECT * FROM patients WHERE id = ?')
+      expect(id).toMatch(/^[0-9a-f]{12}$/)
+      expect(text).toContain(`db_query_duration_seconds_count{query_id="${id}"} 1\n`)
+      expect(text).not.toContain('SELECT')
+      expect(text).toMatch(/rate_limiter_keys\{limiter="memory"\} \d+\n/)
+      expect(text).toContain('# TYPE mail_queue_messages gauge\n')
+    })
+  })
+})
@@ -0,0 +1,128 @@
+import { describe, it, expect, beforeEach, vi } from 'vitest'
+import webpush from 'web-push'
+import { query } from '@/lib/db'
+import { dispatchPushOutbox, enqueueAppointmentNotice, enqueueNotification, retryDelaySeconds } from '@/lib/push-outbox'
+
+vi.mock('@/lib/db', () => ({
+  query: vi.fn()
+}))
+
+vi.mock('web-push', () => ({
+  default: {
+    setVapidDetails: vi.fn(),
+    sendNotification: vi.fn()
+  }
+}))
+
+function delivery(id: number, overrides: any = {}) {
+  return {
+    id,
+    endpoint: `https://push.example.com/${id}`,
+    payload: '{"title":"Cita"}',
+    attempts: 1,
+    subscription_id: id,
+    p256dh_key: 'p256dh',
+    auth_key: 'auth',
+    active: true,
+    ...overrides
+  }
+}
+
+function mockOutbox(deliveries: any[], failureCount: number = 1) {
+  vi.mocked(query).mockImplementation(async (text: string) => {
+    if (text.includes('WITH claimed')) {
+      return { rows: deliveries, rowCount: deliveries.length } as any
+    }
+    if (text.includes('failure_count = failure_count + 1')) {
+      return { rows: [{ failure_count: failureCount }], rowCount: 1 } as any
+    }
+    if (text.includes("status = 'dead'") && text.includes('endpoint = ANY($1)')) {
+      return { rows: [], rowCount: 1 } as any
+    }
+    return { rows: [], rowCount: 0 } as any
+  })
+}
+
+function callsMatching(fragment: string) {
+  return vi.mocked(query).mock.calls.filter(([text]) => text.includes(fragment))
+}
+
+describe('Push outbox', () => {
+  beforeEach(() => {
+    vi.clearAllMocks()
+    process.env.NEXT_PUBLIC_VAPID_PUBLIC_KEY = 'public-key'
+    process.env.VAPID_PRIVATE_KEY = 'private-key'
+  })
+
+  it('should queue one row per matching subscription on the event transaction', async () => {
+    const client = { query: vi.fn().mockResolvedValue({ rows: [], rowCount: 2 }) }
+
+    const queued = await enqueueNotification({ patientId: 7 }, { title: 'Cita', body: 'Confirmada' }, client as any)
+
+    expect(queued).toBe(2)
+    expect(query).not.toHaveBeenCalled()
+    const [text, params] = client.query.mock.calls[0]
+    expect(text).toContain('INSERT INTO push_outbox')
+    expect(text).toContain('patient_id = $2')
+    expect(JSON.parse(params[0]).title).toBe('Cita')
+    expect(params[1]).toBe(7)
+  })
+
+  // Runs before any test configures web push; the VAPID setup is kept once it succeeds
+  it('should not queue appointment notices while web push is not configured', async () => {
+    delete process.env.VAPID_PRIVATE_KEY
+    const client = { query: vi.fn() }
+
+    const queued = await enqueueAppointmentNotice(client as any, 'confirmation', {
+      id: '6f1c1f0e-7a52-4c8e-9a51-0f3c8a1b2c3d',
+      patient_id: 7,
+      date: '2030-01-09',
+      time: '10:20'
+    })
+
+    expect(queued).toBe(0)
+    expect(client.query).not.toHaveBeenCalled()
+  })
+
+  it('should settle a batch: sent, expired endpoints retired, inactive rows dead-lettered', async () => {
+    mockOutbox([delivery(1), delivery(2), delivery(3, { active: false })])
+    vi.mocked(webpush.sendNotification).mockImplementation(async (sub: any) => {
+      if (sub.endpoint.endsWith('/2')) {
+        throw Object.assign(new Error('Gone'), { statusCode: 410 })
+      }
+      return {} as any
+    })
+
+    const summary = await dispatchPushOutbox({ batchSize: 10 })
+
+    expect(summary).toEqual({ sent: 1, retried: 0, dead: 2 })
+    expect(callsMatching('WITH claimed')[0][0]).toContain('FOR UPDATE SKIP LOCKED')
+    expect(webpush.sendNotification).toHaveBeenCalledTimes(2)
+    expect(callsMatching("status = 'sent'")[0][1]).toEqual([[1]])
+    expect(callsMatching('SET active = false')[0][1]).toEqual([['https://push.example.com/2']])
+    expect(callsMatching("status = 'dead', last_error = $2 WHERE id = ANY($1)")[0][1]).toEqual([[3], 'Subscription inactive'])
+  })
+
+  it('should back off exponentially after a transient failure', async () => {
+    mockOutbox([delivery(4, { attempts: 3 })], 2)
+    vi.mocked(webpush.sendNotification).mockRejectedValue(Object.assign(new Error('Unavailable'), { statusCode: 503 }))
+
+    const summary = await dispatchPushOutbox({ batchSize: 10 })
+
+    expect(summary).toEqual({ sent: 0, retried: 1, dead: 0 })
+    const [, params] = callsMatching('next_attempt_at = NOW() + make_interval(secs => $2::int), last_error')[0]
+    expect(params).toEqual([4, 120, 'Unavailable'])
+    expect(retryDelaySeconds(1)).toBe(30)
+    expect(retryDelaySeconds(30)).toBe(6 * 60 * 60)
+  })
+
+  it('should retire an endpoint once its failure budget is spent', async () => {
+    mockOutbox([delivery(5)], 10)
+    vi.mocked(webpush.sendNotification).mockRejectedValue(Object.assign(new Error('Unavailable'), { statusCode: 503 }))
+
+    const summary = await dispatchPushOutbox({ batchSize: 10 })
+
+    expect(summary).toEqual({ sent: 0, retried: 0, dead: 1 })
+    expect(callsMatching('SET active = false')[0][1]).toEqual([['https://push.example.com/5']])
+  })
+})
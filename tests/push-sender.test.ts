@@ -0,0 +1,95 @@
+import { describe, it, expect, beforeEach, vi } from 'vitest'
+import webpush from 'web-push'
+import { query } from '@/lib/db'
+import { activeSubscriptions, fanOutPush } from '@/lib/push-sender'
+
+vi.mock('@/lib/db', () => ({
+  query: vi.fn()
+}))
+
+vi.mock('web-push', () => ({
+  default: {
+    setVapidDetails: vi.fn(),
+    sendNotification: vi.fn()
+  }
+}))
+
+function subscription(id: number) {
+  return { id, endpoint: `https://push.example.com/${id}`, p256dh_key: 'p256dh', auth_key: 'auth' }
+}
+
+describe('Push fan-out', () => {
+  beforeEach(() => {
+    vi.clearAllMocks()
+    vi.mocked(query).mockResolvedValue({ rows: [], rowCount: 0 } as any)
+  })
+
+  it('should never have more than the configured number of sends in flight', async () => {
+    let inFlight = 0
+    let peak = 0
+    vi.mocked(webpush.sendNotification).mockImplementation(async () => {
+      inFlight++
+      peak = Math.max(peak, inFlight)
+      await new Promise(resolve => setTimeout(resolve, 5))
+      inFlight--
+      return {} as any
+    })
+
+    const summary = await fanOutPush(Array.from({ length: 20 }, (_, i) => subscription(i + 1)), '{}', { concurrency: 3 })
+
+    expect(summary).toEqual({ sent: 20, failed: 0, expired: 0 })
+    expect(peak).toBe(3)
+  })
+
+  it('should deactivate expired endpoints with one batched update', async () => {
+    vi.mocked(webpush.sendNotification).mockImplementation(async (sub: any) => {
+      if (sub.endpoint.endsWith('/2') || sub.endpoint.endsWith('/4')) {
+        throw Object.assign(new Error('Gone'), { statusCode: 410 })
+      }
+      if (sub.endpoint.endsWith('/3')) {
+        throw Object.assign(new Error('Server error'), { statusCode: 500 })
+      }
+      return {} as any
+    })
+    const progress: boolean[] = []
+
+    const summary = await fanOutPush([1, 2, 3, 4, 5].map(subscription), '{}', {
+      onResult: result => { progress.push(result.success) }
+    })
+
+    expect(summary).toEqual({ sent: 2, failed: 3, expired: 2 })
+    expect(progress).toHaveLength(5)
+    const updates = vi.mocked(query).mock.calls.filter(([text]) => text.includes('UPDATE push_subscriptions'))
+    expect(updates).toHaveLength(1)
+    expect(updates[0][0]).toContain('endpoint = ANY($1)')
+    expect(updates[0][1]).toEqual([['https://push.example.com/2', 'https://push.example.com/4']])
+  })
+
+  it('should page through active subscriptions by id', async () => {
+    vi.mocked(query)
+      .mockResolvedValueOnce({ rows: [subscription(1), subscription(2)] } as any)
+      .mockResolvedValueOnce({ rows: [subscription(3)] } as any)
+
+    const rows = []
+    for await (const row of activeSubscriptions({ pageSize: 2 })) {
+      rows.push(row.id)
+    }
+
+    expect(rows).toEqual([1, 2, 3])
+    expect(vi.mocked(query).mock.calls.map(([, params]) => params)).toEqual([[0, 2], [2, 2]])
+  })
+
+  it('should read only one patient\'s subscriptions for targeted sends', async () => {
+    vi.mocked(query).mockResolvedValueOnce({ rows: [subscription(8)] } as any)
+
+    const rows = []
+    for await (const row of activeSubscriptions({ patientId: 42 })) {
+      rows.push(row.id)
+    }
+
+    expect(rows).toEqual([8])
+    const [text, params] = vi.mocked(query).mock.calls[0]
+    expect(text).toContain('patient_id = $3')
+    expect(params).toEqual([0, 500, 42])
+  })
+})
@@ -0,0 +1,108 @@
+import { describe, it, expect, beforeEach, afterEach, vi } from 'vitest'
+import {
+  fingerprintQuery,
+  getQueryHistograms,
+  getQueryMetrics,
+  getSlowQueries,
+  recordQuery,
+  resetQueryMetrics
+} from '@/lib/query-metrics'
+
+describe('Query metrics', () => {
+  beforeEach(() => {
+    resetQueryMetrics()
+    vi.spyOn(console, 'warn').mockImplementation(() => {})
+  })
+
+  afterEach(() => {
+    vi.restoreAllMocks()
+  })
+
+  describe('fingerprintQuery', () => {
+    it('replaces parameters and literals and collapses whitespace', () => {
+      expect(fingerprintQuery(`SELECT * FROM users
+        WHERE email = $1 AND   status = 'active' LIMIT 10`))
+        .toBe('SELECT * FROM users WHERE email = ? AND status = ? LIMIT ?')
+    })
+
+    it('collapses value lists and strips comments', () => {
+      expect(fingerprintQuery("SELECT id FROM slots WHERE id IN (1, 2, 3) -- hot path"))
+        .toBe('SELECT id FROM slots WHERE id IN (?)')
+    })
+
+    it('strips block comments', () => {
+      expect(fingerprintQuery("/* booking */ SELECT id FROM appointments /* multi\n line */ WHERE id = $1"))
+        .toBe('SELECT id FROM appointments WHERE id = ?')
+    })
+
+    it('leaves identifiers containing digits alone', () => {
+      expect(fingerprintQuery('SELECT p256dh_key FROM push_subscriptions'))
+        .toBe('SELECT p256dh_key FROM push_subscriptions')
+    })
+  })
+
+  it('groups statements that differ only in their literals', () => {
+    recordQuery("SELECT * FROM patients WHERE id = 1", 2, 1)
+    recordQuery("SELECT * FROM patients WHERE id = 2", 4, 1)
+    recordQuery("SELECT * FROM patients WHERE id = 3", 6, 0)
+
+    const [stats] = getQueryMetrics()
+    expect(getQueryMetrics()).toHaveLength(1)
+    expect(stats.fingerprint).toBe('SELECT * FROM patients WHERE id = ?')
+    expect(stats.id).toMatch(/^[0-9a-f]{12}$/)
+    expect(stats.count).toBe(3)
+    expect(stats.rows).toBe(2)
+    expect(stats.totalMs).toBe(12)
+    expect(stats.meanMs).toBe(4)
+    expect(stats.maxMs).toBe(6)
+  })
+
+  it('estimates percentiles from the histogram buckets', () => {
+    for (let i = 0; i < 98; i++) {
+      recordQuery('SELECT 1', 3, 1)
+    }
+    recordQuery('SELECT 1', 40, 1)
+    recordQuery('SELECT 1', 80, 1)
+
+    const [stats] = getQueryMetrics()
+    expect(stats.p50Ms).toBeGreaterThan(2)
+    expect(stats.p50Ms).toBeLessThanOrEqual(5)
+    expect(stats.p99Ms).toBeGreaterThan(25)
+    expect(stats.p99Ms).toBeLessThanOrEqual(80)
+    expect(stats.maxMs).toBe(80)
+
+    const [histogram] = getQueryHistograms()
+    expect(histogram.buckets.reduce((sum, n) => sum + n, 0)).toBe(100)
+  })
+
+  it('orders statements by total time', () => {
+    recordQuery('SELECT * FROM a', 1, 0)
+    recordQuery('SELECT * FROM b', 50, 0)
+
+    expect(getQueryMetrics().map((stats) => stats.fingerprint)).toEqual(['SELECT * FROM b', 'SELECT * FROM a'])
+  })
+
+  it('counts errors', () => {
+    recordQuery('SELECT * FROM missing', 1, 0, new Error('relation does not exist'))
+
+    expect(getQueryMetrics()[0].errors).toBe(1)
+  })
+
+  it('keeps every slow query but logs each statement at most once per interval', () => {
+    recordQuery('SELECT pg_sleep($1)', 500, 1)
+    recordQuery('SELECT pg_sleep($1)', 700, 1)
+    recordQuery('SELECT 1', 5, 1)
+
+    const slow = getSlowQueries()
+    expect(slow).toHaveLength(2)
+    expect(slow[0]).toMatchObject({ fingerprint: 'SELECT pg_sleep(?)', durationMs: 500, rows: 1 })
+    expect(console.warn).toHaveBeenCalledTimes(1)
+  })
+
+  it('does not log fast queries', () => {
+    recordQuery('SELECT 1', 5, 1)
+
+    expect(getSlowQueries()).toHaveLength(0)
+    expect(console.warn).not.toHaveBeenCalled()
+  })
+})
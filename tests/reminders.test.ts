@@ -0,0 +1,108 @@
+import { describe, it, expect, beforeEach, vi } from 'vitest'
+import webpush from 'web-push'
+import { query } from '@/lib/db'
+import { runReminderJobs } from '@/lib/reminders'
+
+vi.mock('@/lib/db', () => ({
+  query: vi.fn()
+}))
+
+vi.mock('web-push', () => ({
+  default: {
+    setVapidDetails: vi.fn(),
+    sendNotification: vi.fn()
+  }
+}))
+
+const dueJob = {
+  id: 1,
+  appointment_id: '6f1c1f0e-7a52-4c8e-9a51-0f3c8a1b2c3d',
+  attempts: 1,
+  patient_id: 42,
+  first_name: 'Ana',
+  appointment_date: '2030-01-09',
+  appointment_time: '10:20',
+  still_due: true
+}
+
+// A job whose appointment was cancelled or rescheduled after it was enqueued
+const staleJob = { ...dueJob, id: 2, appointment_id: '0b9f4e2a-1c3d-4e5f-8a9b-7c6d5e4f3a2b', still_due: false }
+
+function callsMatching(fragment: string) {
+  return vi.mocked(query).mock.calls.filter(([text]) => text.includes(fragment))
+}
+
+describe('Appointment reminder jobs', () => {
+  beforeEach(() => {
+    vi.clearAllMocks()
+    process.env.NEXT_PUBLIC_VAPID_PUBLIC_KEY = 'public-key'
+    process.env.VAPID_PRIVATE_KEY = 'private-key'
+    vi.mocked(query).mockImplementation(async (text: string) => {
+      if (text.includes('INSERT INTO reminder_jobs')) {
+        return { rows: [], rowCount: 2 } as any
+      }
+      if (text.includes('WITH claimed')) {
+        return { rows: [dueJob, staleJob], rowCount: 2 } as any
+      }
+      if (text.includes('FROM push_subscriptions')) {
+        return { rows: [{ id: 7, endpoint: 'https://push.example.com/7', p256dh_key: 'p', auth_key: 'a' }] } as any
+      }
+      return { rows: [], rowCount: 0 } as any
+    })
+  })
+
+  it('should enqueue, claim with SKIP LOCKED and send only still-due reminders', async () => {
+    vi.mocked(webpush.sendNotification).mockResolvedValue({} as any)
+
+    const summary = await runReminderJobs({ batchSize: 10 })
+
+    expect(summary).toEqual({ enqueued: 2, sent: 1, skipped: 1, retried: 0, failed: 0 })
+    expect(callsMatching('WITH claimed')[0][0]).toContain('FOR UPDATE SKIP LOCKED')
+    expect(callsMatching('FROM push_subscriptions')[0][1]).toEqual([0, 500, 42])
+    expect(webpush.sendNotification).toHaveBeenCalledTimes(1)
+
+    const finished = callsMatching('WHERE id = ANY($1)').map(([, params]) => params)
+    expect(finished).toEqual([[[1], 'done'], [[2], 'skipped']])
+  })
+
+  it('should cast the HH:MM appointment_time before using it as a time', async () => {
+    vi.mocked(webpush.sendNotification).mockResolvedValue({} as any)
+
+    await runReminderJobs({ batchSize: 10 })
+
+    const [enqueueSql] = callsMatching('INSERT INTO reminder_jobs')[0]
+    const [claimSql] = callsMatching('WITH claimed')[0]
+    expect(enqueueSql).toContain('a.appointment_date + a.appointment_time::time')
+    expect(claimSql).toContain('left(a.appointment_time::text, 5) AS appointment_time')
+    expect(claimSql).not.toContain('to_char')
+    expect(claimSql).not.toMatch(/appointment_time(?!::)\s*[-+=>]/)
+  })
+
+  it('should back off and retry a reminder that could not be delivered', async () => {
+    vi.mocked(webpush.sendNotification).mockRejectedValue(Object.assign(new Error('Unavailable'), { statusCode: 503 }))
+
+    const summary = await runReminderJobs({ batchSize: 10 })
+
+    expect(summary).toMatchObject({ sent: 0, retried: 1, failed: 0 })
+    const [, params] = callsMatching('make_interval(secs => $2::int), last_error')[0]
+    expect(params).toEqual([1, 60, '1 deliveries failed'])
+  })
+
+  it('should give up after the last attempt', async () => {
+    vi.mocked(webpush.sendNotification).mockRejectedValue(Object.assign(new Error('Unavailable'), { statusCode: 503 }))
+    vi.mocked(query).mockImplementation(async (text: string) => {
+      if (text.includes('WITH claimed')) {
+        return { rows: [{ ...dueJob, attempts: 5 }], rowCount: 1 } as any
+      }
+      if (text.includes('FROM push_subscriptions')) {
+        return { rows: [{ id: 7, endpoint: 'https://push.example.com/7', p256dh_key: 'p', auth_key: 'a' }] } as any
+      }
+      return { rows: [], rowCount: 0 } as any
+    })
+
+    const summary = await runReminderJobs({ batchSize: 10 })
+
+    expect(summary).toMatchObject({ retried: 0, failed: 1 })
+    expect(callsMatching("status = 'failed'")).toHaveLength(1)
+  })
+})
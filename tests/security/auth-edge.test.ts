@@ -0,0 +1,63 @@
+// @vitest-environment node
+import { describe, it, expect, beforeEach, afterEach, vi } from 'vitest'
+import jwt from 'jsonwebtoken'
+import { verifyToken, generateToken } from '../../lib/auth-edge'
+
+const SECRET = 'test-secret-key-that-is-long-enough-for-security'
+const user = { id: 7, email: 'admin@example.com', role: 'admin', full_name: 'Admin User' }
+
+describe('Edge JWT verification', () => {
+  beforeEach(() => {
+    process.env.JWT_SECRET = SECRET
+  })
+
+  afterEach(() => {
+    vi.useRealTimers()
+  })
+
+  it('should accept tokens issued by jsonwebtoken', async () => {
+    const token = jwt.sign(user, SECRET, { expiresIn: '24h' })
+
+    expect(await verifyToken(token)).toMatchObject(user)
+    // Served from the verified-token cache the second time
+    expect(await verifyToken(token)).toMatchObject(user)
+  })
+
+  it('should issue tokens jsonwebtoken can verify', async () => {
+    const token = await generateToken(user)
+
+    expect(jwt.verify(token, SECRET)).toMatchObject(user)
+  })
+
+  it('should reject tampered, foreign and unsigned tokens', async () => {
+    const token = jwt.sign(user, SECRET, { expiresIn: '1h' })
+    await verifyToken(token)
+    const [header, , signature] = token.split('.')
+    const forgedPayload = Buffer.from(JSON.stringify({ ...user, id: 1 })).toString('base64url')
+
+    expect(await verifyToken(`${header}.${forgedPayload}.${signature}`)).toBeNull()
+    expect(await verifyToken(jwt.sign(user, 'another-secret-that-is-long-enough-too', { expiresIn: '1h' }))).toBeNull()
+    expect(await verifyToken(jwt.sign(user, SECRET, { algorithm: 'HS512', expiresIn: '1h' }))).toBeNull()
+    expect(await verifyToken(`${Buffer.from('{"alg":"none"}').toString('base64url')}.${forgedPayload}.`)).toBeNull()
+    expect(await verifyToken('not-a-token')).toBeNull()
+  })
+
+  it('should stop trusting a cached token once it expires', async () => {
+    vi.useFakeTimers()
+    vi.setSystemTime(new Date('2030-01-08T09:00:00.000Z'))
+    const token = jwt.sign(user, SECRET, { expiresIn: 60 })
+
+    expect(await verifyToken(token)).not.toBeNull()
+
+    vi.advanceTimersByTime(61000)
+    expect(await verifyToken(token)).toBeNull()
+  })
+
+  it('should drop cached tokens when the secret changes', async () => {
+    const token = jwt.sign(user, SECRET, { expiresIn: '1h' })
+    expect(await verifyToken(token)).not.toBeNull()
+
+    process.env.JWT_SECRET = 'a-rotated-secret-that-is-long-enough-too'
+    expect(await verifyToken(token)).toBeNull()
+  })
+})
@@ -185,14 +185,14 @@ describe('Authentication Security Tests', () => {
   })
 
   describe('Middleware Security', () => {
-    it('should protect admin routes without token', () => {
+    it('should protect admin routes without token', async () => {
       const request = new NextRequest('http://localhost:3000/admin')
       
       // Mock NextResponse.redirect
       const mockRedirect = vi.fn()
       vi.mocked(require('next/server').NextResponse.redirect).mockImplementation(mockRedirect)
       
-      middleware(request)
+      await middleware(request)
       
       expect(mockRedirect).toHaveBeenCalledWith(
         expect.objectContaining({
@@ -201,7 +201,7 @@ describe('Authentication Security Tests', () => {
       )
     })
 
-    it('should protect admin API routes without token', () => {
+    it('should protect admin API routes without token', async () => {
       const request = new NextRequest('http://localhost:3000/api/admin/users', {
         method: 'GET'
       })
@@ -210,7 +210,7 @@ describe('Authentication Security Tests', () => {
       const mockJson = vi.fn()
       vi.mocked(require('next/server').NextResponse.json).mockImplementation(mockJson)
       
-      middleware(request)
+      await middleware(request)
       
       expect(mockJson).toHaveBeenCalledWith(
         { error: 'Unauthorized - No token provided' },
@@ -218,7 +218,7 @@ describe('Authentication Security Tests', () => {
       )
     })
 
-    it('should allow access with valid token', () => {
+    it('should allow access with valid token', async () => {
       const user = {
         id: 1,
         full_name: 'Test User',
@@ -239,7 +239,7 @@ describe('Authentication Security Tests', () => {
       const mockNext = vi.fn()
       vi.mocked(require('next/server').NextResponse.next).mockImplementation(mockNext)
       
-      middleware(request)
+      await middleware(request)
       
       expect(mockNext).toHaveBeenCalled()
     })
@@ -0,0 +1,39 @@
+// @vitest-environment node
+import { describe, it, expect } from 'vitest'
+import { BcryptPool, getBcryptPoolStats } from '../../lib/bcrypt-pool'
+import { hashPassword, verifyPassword } from '../../lib/auth'
+
+describe('bcrypt worker pool', () => {
+  it('should hash and verify passwords off the main thread', async () => {
+    const hashed = await hashPassword('correct horse battery staple')
+
+    expect(hashed).toMatch(/^\$2[aby]\$12\$/)
+    expect(await verifyPassword('correct horse battery staple', hashed)).toBe(true)
+    expect(await verifyPassword('wrong password', hashed)).toBe(false)
+
+    const stats = getBcryptPoolStats()
+    expect(stats.size).toBeGreaterThan(0)
+    expect(stats.completed).toBeGreaterThanOrEqual(3)
+  }, 30000)
+
+  it('should queue work beyond the pool size and report the depth', async () => {
+    const pool = new BcryptPool(1, 10)
+    const tasks = [1, 2, 3].map(i => pool.run({ op: 'hash', args: [`password-${i}`, 4] }))
+
+    expect(pool.stats()).toMatchObject({ size: 1, busy: 1, queueDepth: 2 })
+
+    const hashes = await Promise.all(tasks)
+    expect(new Set(hashes).size).toBe(3)
+    expect(pool.stats()).toMatchObject({ busy: 0, queueDepth: 0, completed: 3 })
+  }, 30000)
+
+  it('should shed load once the queue is full', async () => {
+    const pool = new BcryptPool(1, 1)
+    const running = pool.run({ op: 'hash', args: ['a', 4] })
+    const queued = pool.run({ op: 'hash', args: ['b', 4] })
+
+    await expect(pool.run({ op: 'hash', args: ['c', 4] })).rejects.toThrow('Password hashing queue is full')
+    expect(pool.stats().rejected).toBe(1)
+    await Promise.all([running, queued])
+  }, 30000)
+})
@@ -0,0 +1,36 @@
+// @vitest-environment node
+import { describe, it, expect, afterEach } from 'vitest'
+import { NextRequest } from 'next/server'
+import { authorizeCronRequest } from '../../lib/cron'
+import { tokensMatch } from '../../lib/secure-compare'
+
+function cronRequest(authorization?: string) {
+  return new NextRequest('http://localhost:3000/api/cron/reminders', {
+    method: 'POST',
+    headers: authorization ? { authorization } : {}
+  })
+}
+
+describe('Cron authorization', () => {
+  afterEach(() => {
+    delete process.env.CRON_SECRET
+  })
+
+  it('should be disabled without CRON_SECRET', () => {
+    expect(authorizeCronRequest(cronRequest('Bearer anything'))?.status).toBe(503)
+  })
+
+  it('should accept only the exact bearer secret', () => {
+    process.env.CRON_SECRET = 'cron-secret'
+
+    expect(authorizeCronRequest(cronRequest('Bearer cron-secret'))).toBeNull()
+    expect(authorizeCronRequest(cronRequest('Bearer cron-secre'))?.status).toBe(401)
+    expect(authorizeCronRequest(cronRequest('Bearer cron-secret-and-more'))?.status).toBe(401)
+    expect(authorizeCronRequest(cronRequest())?.status).toBe(401)
+  })
+
+  it('should compare tokens of different lengths without throwing', () => {
+    expect(tokensMatch('short', 'a much longer expected token')).toBe(false)
+    expect(tokensMatch('same', 'same')).toBe(true)
+  })
+})
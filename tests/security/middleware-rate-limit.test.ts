@@ -0,0 +1,64 @@
+import { describe, it, expect } from 'vitest'
+import { NextRequest } from 'next/server'
+import { middleware } from '../../middleware'
+import { createRateLimitResponse, findRateLimitPolicy } from '../../lib/rate-limit'
+
+function createRequest(path: string, ip: string, method: string = 'GET') {
+  return new NextRequest(`http://localhost:3000${path}`, {
+    method,
+    headers: { 'x-forwarded-for': ip }
+  })
+}
+
+describe('Middleware rate limiting', () => {
+  it('should add X-RateLimit headers from the matching policy', async () => {
+    const response = await middleware(createRequest('/api/available-times/2030-01-08', '198.51.100.1'))
+
+    expect(response.status).toBe(200)
+    expect(response.headers.get('X-RateLimit-Limit')).toBe('120')
+    expect(response.headers.get('X-RateLimit-Remaining')).toBe('119')
+    expect(response.headers.get('X-RateLimit-Reset')).toBeTruthy()
+  })
+
+  it('should shed a client that exceeds the booking limit', async () => {
+    const ip = '198.51.100.2'
+    const responses = []
+    for (let i = 0; i < 11; i++) {
+      responses.push(await middleware(createRequest('/api/appointments/create', ip, 'POST')))
+    }
+
+    expect(responses.slice(0, 10).every(r => r.status === 200)).toBe(true)
+    const blocked = responses[10]
+    expect(blocked.status).toBe(429)
+    expect(blocked.headers.get('X-RateLimit-Limit')).toBe('10')
+    expect(blocked.headers.get('X-RateLimit-Remaining')).toBe('0')
+    expect(blocked.headers.get('Retry-After')).toBeTruthy()
+
+    // Other clients and other routes keep their own budgets
+    expect((await middleware(createRequest('/api/appointments/create', '198.51.100.3', 'POST'))).status).toBe(200)
+    expect((await middleware(createRequest('/api/available-times/2030-01-08', ip))).status).toBe(200)
+  })
+
+  it('should leave routes without a policy untouched', async () => {
+    const response = await middleware(createRequest('/admin', '198.51.100.4'))
+
+    expect(response.headers.get('X-RateLimit-Limit')).toBeNull()
+  })
+
+  it('should match policies by path and method', () => {
+    const policies = [
+      { name: 'create', pattern: /^\/api\/appointments\/create$/, methods: ['POST'], limit: 1, windowMs: 1000 },
+      { name: 'all', pattern: /^\/api\//, limit: 2, windowMs: 1000 }
+    ]
+
+    expect(findRateLimitPolicy(policies, '/api/appointments/create', 'POST')?.name).toBe('create')
+    expect(findRateLimitPolicy(policies, '/api/appointments/create', 'GET')?.name).toBe('all')
+    expect(findRateLimitPolicy(policies, '/admin', 'GET')).toBeUndefined()
+  })
+
+  it('should report the actual limit in 429 responses', () => {
+    const response = createRateLimitResponse(0, Date.now() + 60000, 120)
+
+    expect(response.headers.get('X-RateLimit-Limit')).toBe('120')
+  })
+})
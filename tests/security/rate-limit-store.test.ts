@@ -0,0 +1,115 @@
+import { describe, it, expect, beforeEach, afterEach, vi } from 'vitest'
+import { query } from '../../lib/db'
+import { MemoryRateLimitStore, RateLimiter } from '../../lib/rate-limit'
+import { PostgresRateLimitStore, getRateLimitStore, setRateLimitStore } from '../../lib/rate-limit-store'
+
+// Mock the database query function
+vi.mock('../../lib/db', () => ({
+  query: vi.fn()
+}))
+
+function upsertCalls() {
+  return vi.mocked(query).mock.calls.filter(([text]) => text.includes('INSERT INTO rate_limits'))
+}
+
+describe('Rate limit stores', () => {
+  beforeEach(() => {
+    vi.clearAllMocks()
+    vi.useFakeTimers()
+    vi.setSystemTime(new Date('2030-01-08T09:00:30.000Z'))
+  })
+
+  afterEach(() => {
+    vi.useRealTimers()
+    setRateLimitStore(null)
+  })
+
+  describe('PostgresRateLimitStore', () => {
+    it('should count a fixed window with one upsert per hit', async () => {
+      const store = new PostgresRateLimitStore()
+      const now = Date.now()
+      vi.mocked(query).mockImplementation(async (text: string) => {
+        if (text.includes('INSERT INTO rate_limits')) {
+          return { rows: [{ count: 6, previous_count: 0, window_start: String(now - 1000), allowed: true }] } as any
+        }
+        return { rows: [], rowCount: 0 } as any
+      })
+
+      const result = await store.check('login:203.0.113.1', { limit: 5, windowMs: 60000 })
+
+      expect(result).toEqual({ success: false, remaining: 0, resetTime: now - 1000 + 60000, limit: 5 })
+      expect(upsertCalls()).toHaveLength(1)
+      expect(upsertCalls()[0][1]).toEqual(['fixed-window:login:203.0.113.1', 60000, now])
+    })
+
+    it('should weight the previous window for sliding-window limits', async () => {
+      const store = new PostgresRateLimitStore()
+      const windowStart = Date.now() - 30000
+      vi.mocked(query).mockImplementation(async () => ({
+        rows: [{ count: 2, previous_count: 4, window_start: windowStart, allowed: true }]
+      }) as any)
+
+      // Half of the previous window still overlaps: 4 * 0.5 + 2 = 4
+      const result = await store.check('ip', { limit: 5, windowMs: 60000, policy: 'sliding-window' })
+
+      expect(result.success).toBe(true)
+      expect(result.remaining).toBe(1)
+      expect(upsertCalls()[0][1]).toEqual(['sliding-window:ip', 60000, windowStart])
+    })
+
+    it('should report token-bucket outcomes from the stored flag', async () => {
+      const store = new PostgresRateLimitStore()
+      vi.mocked(query).mockImplementation(async () => ({
+        rows: [{ count: 0.5, previous_count: 0, window_start: Date.now(), allowed: false }]
+      }) as any)
+
+      const result = await store.check('ip', { limit: 3, windowMs: 3000, policy: 'token-bucket' })
+
+      expect(result.success).toBe(false)
+      expect(result.resetTime - Date.now()).toBe(500)
+    })
+
+    it('should fail open when the database is unavailable', async () => {
+      const store = new PostgresRateLimitStore()
+      vi.mocked(query).mockRejectedValue(new Error('connection terminated'))
+
+      const result = await store.check('ip', { limit: 5, windowMs: 60000 })
+
+      expect(result.success).toBe(true)
+    })
+
+    it('should reset only the exact keys of an identifier', async () => {
+      const store = new PostgresRateLimitStore()
+      vi.mocked(query).mockResolvedValue({ rows: [], rowCount: 0 } as any)
+
+      await store.reset('203.0.113.1')
+
+      expect(vi.mocked(query)).toHaveBeenCalledWith('DELETE FROM rate_limits WHERE key = ANY($1)', [[
+        'fixed-window:203.0.113.1',
+        'sliding-window:203.0.113.1',
+        'token-bucket:203.0.113.1'
+      ]])
+    })
+  })
+
+  describe('Shared state', () => {
+    it('should enforce one limit across instances that share a store', async () => {
+      // Two app instances pointed at the same backend
+      const shared = new MemoryRateLimitStore(new RateLimiter())
+      const instanceA = shared
+      const instanceB = shared
+      const options = { limit: 2, windowMs: 60000 }
+
+      expect((await instanceA.check('login:ip', options)).success).toBe(true)
+      expect((await instanceB.check('login:ip', options)).success).toBe(true)
+      expect((await instanceA.check('login:ip', options)).success).toBe(false)
+    })
+
+    it('should let tests swap in a local store', async () => {
+      const standIn = new MemoryRateLimitStore()
+      setRateLimitStore(standIn)
+
+      expect(getRateLimitStore()).toBe(standIn)
+    })
+  })
+})
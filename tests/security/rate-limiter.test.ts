@@ -0,0 +1,107 @@
+import { describe, it, expect, beforeEach, afterEach, vi } from 'vitest'
+import { RateLimiter } from '../../lib/rate-limit'
+
+describe('RateLimiter', () => {
+  beforeEach(() => {
+    vi.useFakeTimers()
+    vi.setSystemTime(new Date('2030-01-08T09:00:00.000Z'))
+  })
+
+  afterEach(() => {
+    vi.useRealTimers()
+  })
+
+  describe('Fixed window', () => {
+    it('should allow limit requests per window and reset after it', () => {
+      const limiter = new RateLimiter()
+      const options = { limit: 3, windowMs: 60000 }
+
+      const results = [1, 2, 3, 4].map(() => limiter.check('ip', options))
+      expect(results.map(r => r.success)).toEqual([true, true, true, false])
+      expect(results.map(r => r.remaining)).toEqual([2, 1, 0, 0])
+      expect(results[3].limit).toBe(3)
+
+      vi.advanceTimersByTime(60001)
+      expect(limiter.check('ip', options).success).toBe(true)
+    })
+  })
+
+  describe('Sliding window', () => {
+    it('should weight the previous window by its remaining overlap', () => {
+      const limiter = new RateLimiter()
+      const options = { limit: 4, windowMs: 1000, policy: 'sliding-window' as const }
+
+      expect([1, 2, 3, 4, 5].map(() => limiter.check('ip', options).success)).toEqual([true, true, true, true, false])
+
+      // Halfway through the next window half of the previous 4 requests still count
+      vi.advanceTimersByTime(1500)
+      expect([1, 2, 3].map(() => limiter.check('ip', options).success)).toEqual([true, true, false])
+    })
+  })
+
+  describe('Token bucket', () => {
+    it('should allow a burst of limit requests and refill steadily', () => {
+      const limiter = new RateLimiter()
+      const options = { limit: 3, windowMs: 3000, policy: 'token-bucket' as const }
+
+      expect([1, 2, 3, 4].map(() => limiter.check('ip', options).success)).toEqual([true, true, true, false])
+
+      // One token every second
+      vi.advanceTimersByTime(1000)
+      expect(limiter.check('ip', options).success).toBe(true)
+      const blocked = limiter.check('ip', options)
+      expect(blocked.success).toBe(false)
+      expect(blocked.resetTime - Date.now()).toBe(1000)
+    })
+
+    it('should reject everything with a zero limit', () => {
+      const limiter = new RateLimiter()
+      expect(limiter.check('ip', { limit: 0, windowMs: 1000, policy: 'token-bucket' }).success).toBe(false)
+    })
+  })
+
+  describe('Memory bounds', () => {
+    it('should evict the least recently used identifier past maxKeys', () => {
+      const limiter = new RateLimiter({ maxKeys: 2 })
+      const options = { limit: 1, windowMs: 60000 }
+
+      limiter.check('a', options)
+      limiter.check('b', options)
+      limiter.check('a', options)
+      limiter.check('c', options)
+
+      expect(limiter.size).toBe(2)
+      // 'a' was touched after 'b', so 'b' was evicted and starts over
+      expect(limiter.check('a', options).success).toBe(false)
+      expect(limiter.check('b', options).success).toBe(true)
+    })
+
+    it('should drop expired identifiers without scanning live ones', () => {
+      const limiter = new RateLimiter({ bucketMs: 1000 })
+
+      for (let i = 0; i < 100; i++) {
+        limiter.check(`burst-${i}`, { limit: 5, windowMs: 1000 })
+      }
+      limiter.check('long-lived', { limit: 5, windowMs: 60000 })
+      expect(limiter.size).toBe(101)
+
+      vi.advanceTimersByTime(3000)
+      limiter.check('next', { limit: 5, windowMs: 1000 })
+
+      expect(limiter.size).toBe(2)
+    })
+  })
+
+  it('should reset one identifier or all of them', () => {
+    const limiter = new RateLimiter()
+    const options = { limit: 1, windowMs: 60000 }
+
+    limiter.check('a', options)
+    limiter.check('b', options)
+    limiter.reset('a')
+    expect(limiter.check('a', options).success).toBe(true)
+
+    limiter.reset()
+    expect(limiter.size).toBe(0)
+  })
+})
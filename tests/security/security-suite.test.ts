@@ -60,7 +60,7 @@ describe('Comprehensive Security Test Suite', () => {
       const mockNext = vi.fn()
       vi.mocked(require('next/server').NextResponse.next).mockImplementation(mockNext)
       
-      middleware(request)
+      await middleware(request)
       expect(mockNext).toHaveBeenCalled()
     })
 
@@ -92,7 +92,7 @@ describe('Comprehensive Security Test Suite', () => {
       const mockRedirect = vi.fn()
       vi.mocked(require('next/server').NextResponse.redirect).mockImplementation(mockRedirect)
       
-      middleware(request)
+      await middleware(request)
       expect(mockRedirect).toHaveBeenCalled()
     })
   })
@@ -314,7 +314,7 @@ describe('Comprehensive Security Test Suite', () => {
   })
 
   describe('API Endpoint Security', () => {
-    it('should protect sensitive endpoints', () => {
+    it('should protect sensitive endpoints', async () => {
       const protectedEndpoints = [
         '/api/admin/users',
         '/api/admin/appointments',
@@ -323,7 +323,7 @@ describe('Comprehensive Security Test Suite', () => {
         '/admin/settings'
       ]
 
-      protectedEndpoints.forEach(endpoint => {
+      for (const endpoint of protectedEndpoints) {
         const request = new NextRequest(`http://localhost:3000${endpoint}`)
         
         // Mock NextResponse.redirect for admin routes
@@ -334,7 +334,7 @@ describe('Comprehensive Security Test Suite', () => {
         const mockJson = vi.fn()
         vi.mocked(require('next/server').NextResponse.json).mockImplementation(mockJson)
         
-        middleware(request)
+        await middleware(request)
         
         if (endpoint.startsWith('/admin')) {
           expect(mockRedirect).toHaveBeenCalled()
@@ -344,7 +344,7 @@ describe('Comprehensive Security Test Suite', () => {
             { status: 401 }
           )
         }
-      })
+      }
     })
   })
 })
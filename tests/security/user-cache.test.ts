@@ -0,0 +1,77 @@
+import { describe, it, expect, beforeEach, afterEach, vi } from 'vitest'
+import { query } from '../../lib/db'
+import { getUserById, invalidateUser, resetPasswordWithToken } from '../../lib/auth'
+
+// Mock the database query function
+vi.mock('../../lib/db', () => ({
+  query: vi.fn()
+}))
+
+const admin = {
+  id: 1,
+  full_name: 'Admin User',
+  email: 'admin@example.com',
+  role: 'admin',
+  created_at: new Date('2030-01-01T00:00:00.000Z'),
+  updated_at: new Date('2030-01-01T00:00:00.000Z')
+}
+
+function userLookups() {
+  return vi.mocked(query).mock.calls.filter(([text]) => text.includes('FROM users WHERE id'))
+}
+
+describe('User cache', () => {
+  beforeEach(() => {
+    vi.clearAllMocks()
+    invalidateUser()
+    vi.useFakeTimers()
+    vi.setSystemTime(new Date('2030-01-08T09:00:00.000Z'))
+    vi.mocked(query).mockImplementation(async (text: string) => {
+      if (text.includes('FROM users WHERE id')) {
+        return { rows: [admin], rowCount: 1 } as any
+      }
+      if (text.includes('UPDATE users')) {
+        return { rows: [{ id: 1 }], rowCount: 1 } as any
+      }
+      return { rows: [], rowCount: 0 } as any
+    })
+  })
+
+  afterEach(() => {
+    vi.useRealTimers()
+  })
+
+  it('should serve repeated lookups without querying the database', async () => {
+    expect(await getUserById(1)).toEqual(admin)
+    expect(await getUserById(1)).toEqual(admin)
+
+    expect(userLookups()).toHaveLength(1)
+  })
+
+  it('should reload a user once the TTL passes', async () => {
+    await getUserById(1)
+    vi.advanceTimersByTime(61000)
+    await getUserById(1)
+
+    expect(userLookups()).toHaveLength(2)
+  })
+
+  it('should drop the cached user on password reset or explicit invalidation', async () => {
+    await getUserById(1)
+    expect(await resetPasswordWithToken('reset-token', 'NewPassw0rd')).toBe(true)
+    await getUserById(1)
+    expect(userLookups()).toHaveLength(2)
+
+    invalidateUser(1)
+    await getUserById(1)
+    expect(userLookups()).toHaveLength(3)
+  }, 30000)
+
+  it('should not cache missing users', async () => {
+    vi.mocked(query).mockResolvedValue({ rows: [], rowCount: 0 } as any)
+
+    expect(await getUserById(2)).toBeNull()
+    expect(await getUserById(2)).toBeNull()
+    expect(userLookups()).toHaveLength(2)
+  })
+})
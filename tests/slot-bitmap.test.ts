@@ -0,0 +1,88 @@
+import { describe, it, expect } from 'vitest';
+import { SlotBitmap, computeFreeSlots, timeToMinutes } from '@/lib/slot-bitmap';
+
+describe('Slot Bitmap Tests', () => {
+  it('should generate 20-minute slots for a single window', () => {
+    const times = computeFreeSlots([{ start_time: '09:00', end_time: '10:00' }]);
+
+    expect(times).toEqual(['09:00', '09:20', '09:40']);
+  });
+
+  it('should union every work window of the day', () => {
+    // Seed schedule for Monday: 09-12 and 13-17
+    const times = computeFreeSlots([
+      { start_time: '09:00:00', end_time: '12:00:00' },
+      { start_time: '13:00:00', end_time: '17:00:00' }
+    ]);
+
+    expect(times).toHaveLength(9 + 12);
+    expect(times[0]).toBe('09:00');
+    expect(times).toContain('11:40');
+    expect(times).not.toContain('12:00');
+    expect(times).toContain('13:00');
+    expect(times[times.length - 1]).toBe('16:40');
+  });
+
+  it('should merge overlapping windows without duplicates', () => {
+    const times = computeFreeSlots([
+      { start_time: '09:00', end_time: '10:00' },
+      { start_time: '09:40', end_time: '10:40' }
+    ]);
+
+    expect(times).toEqual(['09:00', '09:20', '09:40', '10:00', '10:20']);
+  });
+
+  it('should remove booked times in either HH:MM or HH:MM:SS form', () => {
+    const times = computeFreeSlots(
+      [{ start_time: '09:00', end_time: '10:00' }],
+      ['09:20', '09:40:00']
+    );
+
+    expect(times).toEqual(['09:00']);
+  });
+
+  it('should block every slot overlapped by an off-grid booking', () => {
+    const times = computeFreeSlots(
+      [{ start_time: '09:00', end_time: '10:00' }],
+      ['09:10']
+    );
+
+    expect(times).toEqual(['09:40']);
+  });
+
+  it('should step slots from an unaligned window start', () => {
+    const times = computeFreeSlots([{ start_time: '09:10', end_time: '10:05' }]);
+
+    // 09:50 would end at 10:10, past the window
+    expect(times).toEqual(['09:10', '09:30']);
+  });
+
+  it('should clear unaligned slots overlapped by a booking', () => {
+    const times = computeFreeSlots(
+      [{ start_time: '09:10', end_time: '10:30' }],
+      ['09:30']
+    );
+
+    expect(times).toEqual(['09:10', '09:50', '10:10']);
+  });
+
+  it('should handle slots across 32-bit word boundaries', () => {
+    const bitmap = new SlotBitmap().addWindow('00:00', '24:00');
+
+    const times = bitmap.toTimes();
+
+    expect(times).toHaveLength(72);
+    expect(times[32]).toBe('10:40');
+    expect(times[71]).toBe('23:40');
+    expect(bitmap.isFree('10:20')).toBe(true);
+    bitmap.removeWindow('10:20', '11:00');
+    expect(bitmap.isFree('10:20')).toBe(false);
+    expect(bitmap.isFree('10:40')).toBe(false);
+    expect(bitmap.isFree('11:00')).toBe(true);
+  });
+
+  it('should ignore values that are not times', () => {
+    expect(timeToMinutes('not-a-time')).toBeNull();
+    expect(computeFreeSlots([{ start_time: 'x', end_time: '10:00' }])).toEqual([]);
+  });
+});
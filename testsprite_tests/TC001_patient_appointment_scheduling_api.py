@@ -16,22 +16,18 @@ def test_patient_appointment_scheduling_api():
     # Step 1: Retrieve required options for visit types, consult types, practice types, health insurance
     # Assuming these endpoints exist according to PRD files
 
-    # Get visit types
-    visit_types_resp = requests.get(f"{BASE_URL}/api/visit-types", auth=AUTH, headers=headers, timeout=TIMEOUT)
-    assert visit_types_resp.status_code == 200, f"Failed to get visit types: {visit_types_resp.text}"
-    visit_types = visit_types_resp.json()
+    # Get visit types, consult types, practice types and health insurances in one request
+    options_resp = requests.get(f"{BASE_URL}/api/booking-options", auth=AUTH, headers=headers, timeout=TIMEOUT)
+    assert options_resp.status_code == 200, f"Failed to get booking options: {options_resp.text}"
+    options = options_resp.json()
+
+    visit_types = options["visit_types"]
     assert isinstance(visit_types, list) and len(visit_types) > 0, "Visit types list is empty"
 
-    # Get consult types
-    consult_types_resp = requests.get(f"{BASE_URL}/api/consult-types", auth=AUTH, headers=headers, timeout=TIMEOUT)
-    assert consult_types_resp.status_code == 200, f"Failed to get consult types: {consult_types_resp.text}"
-    consult_types = consult_types_resp.json()
+    consult_types = options["consult_types"]
     assert isinstance(consult_types, list) and len(consult_types) > 0, "Consult types list is empty"
 
-    # Get health insurances
-    health_insurances_resp = requests.get(f"{BASE_URL}/api/health-insurance", auth=AUTH, headers=headers, timeout=TIMEOUT)
-    assert health_insurances_resp.status_code == 200, f"Failed to get health insurance options: {health_insurances_resp.text}"
-    health_insurances = health_insurances_resp.json()
+    health_insurances = options["health_insurance"]
     assert isinstance(health_insurances, list) and len(health_insurances) > 0, "Health insurance list is empty"
 
     # Select valid ids from options for payload
@@ -44,23 +40,24 @@ def test_patient_appointment_scheduling_api():
     # Using a placeholder practice_type string:
     practice_type = "Consulta"  # example value, adjust if needed
 
-    # Generate a valid appointment date: at least tomorrow, not weekend, within 30 days range, excluding holidays (simplified here)
-    def get_valid_appointment_date():
+    # Find the first bookable date and time within the next 30 days
+    def get_valid_appointment_slot():
+        # One range request covers the next 30 days instead of probing each date
         today = datetime.date.today()
-        for delta in range(1, 31):
-            candidate = today + datetime.timedelta(days=delta)
-            if candidate.weekday() < 5:  # Monday=0, Sunday=6 (exclude weekends)
-                return candidate.isoformat()
-        raise RuntimeError("No valid appointment date found in next 30 days excluding weekends")
-
-    appointment_date = get_valid_appointment_date()
-
-    # Retrieve available time slots for that appointment date
-    available_times_resp = requests.get(f"{BASE_URL}/api/available-times/{appointment_date}", auth=AUTH, headers=headers, timeout=TIMEOUT)
-    assert available_times_resp.status_code == 200, f"Failed to get available times: {available_times_resp.text}"
-    available_times = available_times_resp.json()
-    assert isinstance(available_times, list) and len(available_times) > 0, "No available time slots for the selected date"
-    appointment_time = available_times[0]
+        range_from = (today + datetime.timedelta(days=1)).isoformat()
+        range_to = (today + datetime.timedelta(days=30)).isoformat()
+        range_resp = requests.get(
+            f"{BASE_URL}/api/available-times",
+            params={"from": range_from, "to": range_to},
+            auth=AUTH, headers=headers, timeout=TIMEOUT
+        )
+        assert range_resp.status_code == 200, f"Failed to get available times: {range_resp.text}"
+        for day in range_resp.json()["days"]:
+            if day["available"] and day["count"] > 0:
+                return day["date"], day["times"][0]
+        raise RuntimeError("No valid appointment date found in next 30 days")
+
+    appointment_date, appointment_time = get_valid_appointment_slot()
 
     # Prepare patient information
     unique_identifier = str(uuid.uuid4())[:8]
@@ -31,28 +31,21 @@ def test_appointment_cancellation_with_token_verification():
         patient = patient_resp.json()
         patient_id = patient.get("id") or patient.get("patient_id") or patient.get("id".lower())
 
-        # Step 2: Retrieve visit types (should be array)
-        visit_types_resp = requests.get(f"{BASE_URL}/visit-types", auth=AUTH, timeout=TIMEOUT)
-        assert visit_types_resp.status_code == 200, "Failed to get visit types"
-        visit_types = visit_types_resp.json()
+        # Steps 2-5: Retrieve visit, consult and practice types and health insurance options in one request
+        options_resp = requests.get(f"{BASE_URL}/booking-options", auth=AUTH, timeout=TIMEOUT)
+        assert options_resp.status_code == 200, "Failed to get booking options"
+        options = options_resp.json()
+
+        visit_types = options.get("visit_types")
         assert isinstance(visit_types, list) and len(visit_types) > 0, "Visit types response invalid"
 
-        # Step 3: Retrieve consult types (should be array)
-        consult_types_resp = requests.get(f"{BASE_URL}/consult-types", auth=AUTH, timeout=TIMEOUT)
-        assert consult_types_resp.status_code == 200, "Failed to get consult types"
-        consult_types = consult_types_resp.json()
+        consult_types = options.get("consult_types")
         assert isinstance(consult_types, list) and len(consult_types) > 0, "Consult types response invalid"
 
-        # Step 4: Retrieve practice types (should be array, required for appointment creation)
-        practice_types_resp = requests.get(f"{BASE_URL}/practice-types", auth=AUTH, timeout=TIMEOUT)
-        assert practice_types_resp.status_code == 200, "Failed to get practice types"
-        practice_types = practice_types_resp.json()
+        practice_types = options.get("practice_types")
         assert isinstance(practice_types, list) and len(practice_types) > 0, "Practice types response invalid"
 
-        # Step 5: Retrieve health insurance options (assumed needed)
-        health_ins_resp = requests.get(f"{BASE_URL}/health-insurance", auth=AUTH, timeout=TIMEOUT)
-        assert health_ins_resp.status_code == 200, "Failed to get health insurance options"
-        health_ins_options = health_ins_resp.json()
+        health_ins_options = options.get("health_insurance")
         assert isinstance(health_ins_options, list) and len(health_ins_options) > 0, "Health insurance response invalid"
 
         # Step 6: Schedule an appointment more than 24h in the future to meet cancellation policy